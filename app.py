@@ -0,0 +1,37 @@
+"""
+應用程式模組
+包含 BookCollectionApp 類別 (wxPython 應用程式)
+"""
+
+import wx
+from startup import StartupProfile
+
+
+class BookCollectionApp(wx.App):
+    """應用程式主類別"""
+    
+    def __init__(self, profile: StartupProfile = None):
+        """
+        初始化應用程式
+        
+        Args:
+            profile: 啟動計時 (None 表示不輸出耗時明細)
+        """
+        # wx.App 的建構子會呼叫 OnInit，須先設定屬性
+        self.profile = profile if profile is not None else StartupProfile()
+        super().__init__()
+    
+    def OnInit(self):
+        """應用程式初始化"""
+        try:
+            # 主視窗模組 (及其相依模組) 在 wx 初始化後才載入
+            from main_window import MainFrame
+            self.profile.mark("載入主視窗模組")
+            
+            frame = MainFrame(self.profile)
+            frame.Show()
+            self.profile.mark("顯示主視窗")
+            return True
+        except Exception as e:
+            wx.MessageBox(f"應用程式啟動失敗：{str(e)}", "錯誤", wx.OK | wx.ICON_ERROR)
+            return False
@@ -0,0 +1,151 @@
+"""
+非同步資料存取模組
+包含 AsyncDatabase 類別，在背景執行緒執行 DatabaseManager 的操作並回傳 Future
+(不依賴 wx，結果回呼透過 dispatcher 轉交呼叫端，例如 wx.CallAfter)
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """非同步資料存取層 - 單一寫入執行緒負責所有寫入，讀取則由執行緒池平行處理"""
+    
+    # 會修改資料庫、必須交給寫入執行緒依序執行的方法
+    WRITE_METHODS = frozenset({
+        "add_book", "update_book", "delete_book",
+        "add_books", "update_books", "upsert_books", "delete_books",
+        "reserve_id_block", "rebuild_search_index", "run_pending_backfills",
+        "prune_changes", "vacuum",
+    })
+    
+    def __init__(self, db_manager, readers: int = 2,
+                 dispatcher: Optional[Callable] = None,
+                 on_busy: Optional[Callable[[int], None]] = None):
+        """
+        初始化非同步資料存取層
+        
+        Args:
+            db_manager: 資料庫管理器 (每個執行緒使用自己的連線；可先傳入 None，
+                        以 run(..., write=True) 在寫入執行緒開啟資料庫後再設定)
+            readers: 讀取執行緒數量
+            dispatcher: 將回呼轉交到呼叫端執行緒的函式 dispatcher(函式, *參數)，
+                        None 表示直接在背景執行緒呼叫
+            on_busy: 進行中的操作數量改變時呼叫 on_busy(數量) (經由 dispatcher)
+        """
+        self.db_manager = db_manager
+        self.dispatcher = dispatcher
+        self.on_busy = on_busy
+        
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+        self._lock = threading.Lock()
+        self._pending = 0
+    
+    @property
+    def pending(self) -> int:
+        """進行中的操作數量"""
+        return self._pending
+    
+    def _dispatch(self, func: Callable, *args):
+        if self.dispatcher is None:
+            func(*args)
+        else:
+            self.dispatcher(func, *args)
+    
+    def _track(self, delta: int):
+        # 在鎖內轉交，確保狀態通知的順序與計數一致
+        with self._lock:
+            self._pending += delta
+            if self.on_busy is not None:
+                self._dispatch(self.on_busy, self._pending)
+    
+    def _submit(self, executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Future:
+        self._track(1)
+        future = executor.submit(func, *args, **kwargs)
+        future.add_done_callback(lambda _: self._track(-1))
+        return future
+    
+    def read(self, method: str, *args, **kwargs) -> Future:
+        """
+        在讀取執行緒池執行 DatabaseManager 的方法
+        
+        Args:
+            method: 方法名稱，例如 "get_book_by_id"
+        
+        Returns:
+            Future: 方法的回傳值
+        """
+        return self._submit(self._readers, getattr(self.db_manager, method), *args, **kwargs)
+    
+    def write(self, method: str, *args, **kwargs) -> Future:
+        """
+        在寫入執行緒執行 DatabaseManager 的方法 (所有寫入依提交順序執行)
+        
+        Args:
+            method: 方法名稱，例如 "add_book"
+        
+        Returns:
+            Future: 方法的回傳值
+        """
+        return self._submit(self._writer, getattr(self.db_manager, method), *args, **kwargs)
+    
+    def call(self, method: str, *args, **kwargs) -> Future:
+        """依方法名稱自動選擇寫入執行緒或讀取執行緒池"""
+        if method in self.WRITE_METHODS:
+            return self.write(method, *args, **kwargs)
+        return self.read(method, *args, **kwargs)
+    
+    def run(self, func: Callable, *args, write: bool = False, **kwargs) -> Future:
+        """
+        在背景執行任意函式 (例如需要多次查詢的組合操作)
+        
+        Args:
+            func: 要執行的函式
+            write: 是否會寫入資料庫 (True 時交給寫入執行緒)
+        
+        Returns:
+            Future: 函式的回傳值
+        """
+        executor = self._writer if write else self._readers
+        return self._submit(executor, func, *args, **kwargs)
+    
+    def then(self, future: Future, on_success: Callable, on_error: Optional[Callable] = None) -> Future:
+        """
+        操作完成後透過 dispatcher 呼叫回呼
+        
+        操作被取消 (例如 shutdown 時尚未開始的讀取) 時兩個回呼都不呼叫。
+        
+        Args:
+            future: 操作的 Future
+            on_success: 成功時呼叫 on_success(回傳值)
+            on_error: 發生例外時呼叫 on_error(例外)
+        
+        Returns:
+            Future: 原本的 Future
+        """
+        def done(completed: Future):
+            if completed.cancelled():
+                logger.debug("背景資料庫操作已取消")
+                return
+            error = completed.exception()
+            if error is None:
+                self._dispatch(on_success, completed.result())
+            elif on_error is not None:
+                self._dispatch(on_error, error)
+            else:
+                logger.error("背景資料庫操作失敗: %s", error)
+        
+        future.add_done_callback(done)
+        return future
+    
+    def shutdown(self, wait: bool = True):
+        """停止背景執行緒 (預設等待已提交的寫入與執行中的讀取完成；尚未開始的讀取會取消)"""
+        self._readers.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(wait=wait)
+        if wait:
+            self._readers.shutdown(wait=True)
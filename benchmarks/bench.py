@@ -0,0 +1,335 @@
+"""
+效能基準測試
+以合成書籍資料庫量測 DatabaseManager 各操作的吞吐量與延遲百分位數，以及表格載入的時間，
+結果輸出為 JSON，並可與儲存的基準結果比較以標示效能退步
+
+用法 (在專案根目錄執行):
+    python benchmarks/bench.py --sizes 1k 100k --output results.json
+    python benchmarks/bench.py --sizes 1k 100k --save-baseline benchmarks/baseline.json
+    python benchmarks/bench.py --sizes 1k 100k --baseline benchmarks/baseline.json --threshold 0.2
+
+表格量測預設直接呼叫 BookGridTable 使用的 format_cell 與 cell_style (不需 wx)；
+在有 wxPython 的環境可加上 --grid wx 量測整個 BookGridTable (無螢幕時以 xvfb-run 執行)。
+有效能退步時結束代碼為 1。
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book_sources import PagedBookSource, cell_style, format_cell  # noqa: E402
+from database import DatabaseManager  # noqa: E402
+from exporters import CsvExporter  # noqa: E402
+from models import Book, STATUS_CHOICES  # noqa: E402
+from synthetic import DEFAULT_SEED, generate_books, search_keywords  # noqa: E402
+
+# 每個延遲量測的預設次數
+DEFAULT_SAMPLES = {"add_book": 200, "update_book": 200, "delete_book": 200, "search": 60, "grid_scroll": 60}
+# 主視窗表格一次可見的列數
+VISIBLE_ROWS = 30
+# 退步判斷的預設門檻 (20%)
+DEFAULT_THRESHOLD = 0.2
+# 比較的指標 (p99 與最大值受單次磁碟同步影響太大，只列在結果中)
+COMPARED_METRICS = ("p50_ms", "p95_ms", "ops_per_sec", "rows_per_sec")
+# 延遲至少增加這麼多毫秒才算退步 (避免次毫秒操作的計時誤差)
+MIN_LATENCY_DELTA_MS = 0.05
+
+
+def parse_size(text: str) -> int:
+    """解析書籍數量，例如 1000、100k、1m"""
+    text = text.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def size_label(size: int) -> str:
+    if size % 1000000 == 0:
+        return f"{size // 1000000}m"
+    if size % 1000 == 0:
+        return f"{size // 1000}k"
+    return str(size)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近序位法的百分位數 (sorted_values 須已排序)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(samples: List[float]) -> dict:
+    """將每次操作的秒數整理為吞吐量與延遲百分位數 (毫秒)"""
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "ops_per_sec": round(len(samples) / total, 1) if total else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+    }
+
+
+def throughput_summary(rows: int, seconds: List[float]) -> dict:
+    """將整批操作的秒數整理為每秒筆數 (取多次中的最佳值)"""
+    best = min(seconds)
+    return {
+        "rows": rows,
+        "runs": len(seconds),
+        "best_s": round(best, 4),
+        "rows_per_sec": round(rows / best, 1) if best else 0.0,
+    }
+
+
+def timed(func: Callable, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+class CellTable:
+    """不需 wx 的表格 - 直接呼叫 BookGridTable 取值與取屬性時使用的 format_cell 與 cell_style"""
+    
+    def __init__(self, source):
+        self.source = source
+    
+    def GetValue(self, row, col):
+        return format_cell(self.source, row, col)
+    
+    def GetAttr(self, row, col, kind):
+        return cell_style(self.source, row, col)
+
+
+def make_table_factory(mode: str) -> Callable:
+    """依模式回傳建立表格的函式 (wx 模式需要 wxPython 與顯示環境)"""
+    if mode == "cells":
+        return CellTable
+    import wx
+    from grid_table import BookGridTable
+    make_table_factory.app = wx.App(False)  # 保留參考，表格屬性需要 wx.App
+    return BookGridTable
+
+
+def paint_rows(table, first_row: int, rows: int = VISIBLE_ROWS):
+    """模擬表格繪製可見範圍：每個儲存格取值與屬性"""
+    for row in range(first_row, first_row + rows):
+        for col in range(6):
+            table.GetValue(row, col)
+            table.GetAttr(row, col, 0)
+
+
+class Benchmark:
+    """一個資料量的基準測試 - 建立合成資料庫並依序量測各操作"""
+    
+    def __init__(self, size: int, work_dir: str, seed: int = DEFAULT_SEED,
+                 repeat: int = 3, table_factory: Callable = CellTable):
+        """
+        初始化基準測試
+        
+        Args:
+            size: 書籍數量
+            work_dir: 放置暫存資料庫的目錄
+            seed: 亂數種子 (相同種子產生相同的資料與操作順序)
+            repeat: 整批操作 (讀取全部、匯出、表格載入) 的重複次數
+            table_factory: 建立表格的函式 table_factory(資料來源)
+        """
+        self.size = size
+        self.db_path = os.path.join(work_dir, f"bench_{size}.db")
+        self.seed = seed
+        self.repeat = repeat
+        self.table_factory = table_factory
+        self.rng = random.Random(seed)
+        self.results: Dict[str, dict] = {}
+    
+    def run(self) -> Dict[str, dict]:
+        """執行全部量測，回傳 {量測名稱: 結果}"""
+        db_manager = DatabaseManager(self.db_path)
+        try:
+            self.bench_bulk_load(db_manager)
+            self.bench_add(db_manager)
+            self.bench_update(db_manager)
+            self.bench_search(db_manager)
+            self.bench_get_all(db_manager)
+            self.bench_export(db_manager)
+            self.bench_grid(db_manager)
+            self.bench_delete(db_manager)
+        finally:
+            db_manager.close()
+        return self.results
+    
+    def _random_ids(self, db_manager: DatabaseManager, count: int) -> List[int]:
+        ids = db_manager.get_book_ids()
+        return [ids[self.rng.randrange(len(ids))] for _ in range(count)] if len(ids) else []
+    
+    def bench_bulk_load(self, db_manager: DatabaseManager):
+        seconds = timed(db_manager.add_books, generate_books(self.size, self.seed),
+                        chunk_size=5000, validated=True)
+        self.results["bulk_load"] = throughput_summary(self.size, [seconds])
+    
+    def bench_add(self, db_manager: DatabaseManager):
+        books = list(generate_books(DEFAULT_SAMPLES["add_book"], self.seed + 2))
+        self.results["add_book"] = latency_summary(
+            [timed(db_manager.add_book, book, validated=True) for book in books])
+    
+    def bench_update(self, db_manager: DatabaseManager):
+        samples = []
+        for book_id in self._random_ids(db_manager, DEFAULT_SAMPLES["update_book"]):
+            book = Book(f"更新 {book_id}", "Benchmark", 2000, self.rng.choice(STATUS_CHOICES),
+                        self.rng.randint(0, 5), book_id)
+            samples.append(timed(db_manager.update_book, book, validated=True))
+        self.results["update_book"] = latency_summary(samples)
+    
+    def bench_search(self, db_manager: DatabaseManager):
+        keywords = search_keywords(DEFAULT_SAMPLES["search"], self.seed)
+        self.results["search"] = latency_summary(
+            [timed(db_manager.search_books, keyword) for keyword in keywords])
+    
+    def bench_get_all(self, db_manager: DatabaseManager):
+        count = db_manager.get_book_count()
+        self.results["get_all_books"] = throughput_summary(
+            count, [timed(db_manager.get_all_books) for _ in range(self.repeat)])
+        self.results["get_all_books_batch"] = throughput_summary(
+            count, [timed(db_manager.get_all_books, as_batch=True) for _ in range(self.repeat)])
+    
+    def bench_export(self, db_manager: DatabaseManager):
+        path = self.db_path + ".csv"
+        exporter = CsvExporter(db_manager)
+        seconds = [timed(exporter.export, path) for _ in range(self.repeat)]
+        os.remove(path)
+        self.results["export_csv"] = throughput_summary(db_manager.get_book_count(), seconds)
+    
+    def bench_grid(self, db_manager: DatabaseManager):
+        # 表格載入：與 MainFrame.build_paged_source 相同 (狀態計數 + 第一頁)，再繪製第一個畫面
+        def first_paint():
+            source = PagedBookSource(db_manager)
+            source.preload(0)
+            paint_rows(self.table_factory(source), 0)
+            return source
+        
+        seconds = [timed(first_paint) for _ in range(self.repeat)]
+        self.results["grid_first_paint"] = latency_summary(seconds)
+        
+        # 捲動到任意位置：每次都需要載入新的頁面
+        source = first_paint()
+        table = self.table_factory(source)
+        last_row = max(0, len(source) - VISIBLE_ROWS)
+        self.results["grid_scroll"] = latency_summary(
+            [timed(paint_rows, table, self.rng.randint(0, last_row))
+             for _ in range(DEFAULT_SAMPLES["grid_scroll"])])
+    
+    def bench_delete(self, db_manager: DatabaseManager):
+        ids = list(dict.fromkeys(self._random_ids(db_manager, DEFAULT_SAMPLES["delete_book"])))
+        self.results["delete_book"] = latency_summary([timed(db_manager.delete_book, book_id) for book_id in ids])
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    與基準結果比較
+    
+    延遲 (p50/p95) 增加或吞吐量減少超過門檻時視為退步；只比較兩邊都有的資料量與量測。
+    延遲增加不到 MIN_LATENCY_DELTA_MS 時視為計時誤差。
+    
+    Args:
+        results: 本次結果
+        baseline: 基準結果
+        threshold: 門檻比例 (0.2 表示 20%)
+    
+    Returns:
+        List[str]: 退步項目的說明
+    """
+    regressions = []
+    for size, cases in results["results"].items():
+        for case, metrics in cases.items():
+            base_metrics = baseline.get("results", {}).get(size, {}).get(case)
+            if not base_metrics:
+                continue
+            for metric, value in metrics.items():
+                base = base_metrics.get(metric)
+                if metric not in COMPARED_METRICS or not base:
+                    continue
+                if metric.endswith("_ms"):
+                    regressed = value > base * (1 + threshold) and value - base >= MIN_LATENCY_DELTA_MS
+                elif metric.endswith("_per_sec"):
+                    regressed = value < base * (1 - threshold)
+                else:
+                    continue
+                if regressed:
+                    regressions.append(f"{size} {case}.{metric}: {base} -> {value} ({value / base - 1:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="書籍收藏效能基準測試")
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k"], help="書籍數量，例如 1k 100k 1m")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="亂數種子")
+    parser.add_argument("--repeat", type=int, default=3, help="整批操作的重複次數 (取最佳值)")
+    parser.add_argument("--grid", choices=("cells", "wx"), default="cells", help="表格量測方式")
+    parser.add_argument("--output", help="結果 JSON 檔案 (預設輸出到標準輸出)")
+    parser.add_argument("--save-baseline", help="將結果另存為基準檔")
+    parser.add_argument("--baseline", help="要比較的基準檔")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="退步判斷門檻比例")
+    parser.add_argument("--work-dir", help="暫存資料庫目錄 (預設為系統暫存目錄)")
+    args = parser.parse_args(argv)
+    
+    # 只顯示錯誤 (大量寫入時的慢查詢警告不列入輸出)
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    table_factory = make_table_factory(args.grid)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "grid": args.grid,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    
+    work_dir = tempfile.mkdtemp(prefix="book_bench_", dir=args.work_dir)
+    try:
+        for size in map(parse_size, args.sizes):
+            print(f"量測 {size_label(size)} 本書籍...", file=sys.stderr)
+            results = Benchmark(size, work_dir, args.seed, args.repeat, table_factory).run()
+            report["results"][size_label(size)] = results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print("效能退步:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("與基準相比沒有超過門檻的退步", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
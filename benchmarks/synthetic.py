@@ -0,0 +1,106 @@
+"""
+合成資料模組
+以固定亂數種子產生中英文混合的書籍資料與搜尋關鍵字，相同參數每次產生相同的結果
+"""
+
+import random
+from typing import Iterator, List
+from models import Book, STATUS_CHOICES
+
+# 書名用的常用字與英文單字 (中文書名由字元組成，英文書名由單字組成)
+CJK_CHARS = (
+    "的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動同工也能下過子說"
+    "產種面而方後多定行學法所民得經三之進著等部度家電力裡如水化高自理起小物現實加量都兩體制機當使點從"
+    "業本去把性好應開它合還因由其些然前外天政四日那社義事平形相全表間樣與關各重新線內數正心反明看原又"
+    "利比或但質氣第向道命此變條只沒結解問意建月公無系軍很情者最立代想已通並提直題程展五果料象員革位入"
+    "常文總次品式活設及管特件長求老頭基資邊流路級少圖山統接知較將組見計別手角期根論運農指幾九區強放決"
+    "西被幹做必戰先回則任取據處隊南給色光門即保治北造百規熱領七海口東導器壓志世金增爭濟階油思術極交受"
+    "聯什認六共權收證改清己美再採轉更單風切打白教速花帶安場身車例真務具萬每目至達走積示議聲報鬥完類八"
+    "離華名確才科張信馬節話米整空元況今集溫傳土許步群廣石記需段研界拉林律叫且究觀越織裝影算低持音眾書"
+)
+LATIN_WORDS = (
+    "the of and a in silent river night city garden house light shadow winter summer stone glass"
+    " memory letter journey secret island forest mountain ocean dream story history war peace love"
+    " empire machine star moon sun road bridge tower kingdom crown song book last first lost hidden"
+    " golden broken little great old new dark bright wild quiet long short red blue green black white"
+).split()
+CJK_SURNAMES = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何高林羅鄭梁謝宋唐許韓馮鄧曹彭曾蕭田董袁潘蔡蔣余"
+LATIN_FIRST_NAMES = ("Anna", "Ben", "Clara", "David", "Emma", "Frank", "Grace", "Henry", "Iris", "Jack",
+                     "Kate", "Leo", "Mia", "Noah", "Olivia", "Paul", "Rose", "Sam", "Tom", "Vera")
+LATIN_LAST_NAMES = ("Smith", "Brown", "Taylor", "Wilson", "Evans", "Walker", "Wright", "Hall", "Green",
+                    "Baker", "Hill", "Clark", "Lewis", "Young", "King", "Scott", "Adams", "Moore")
+
+DEFAULT_SEED = 20240101
+
+
+def _cjk_text(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choice(CJK_CHARS) for _ in range(rng.randint(low, high)))
+
+
+def _latin_text(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(low, high))).title()
+
+
+def make_title(rng: random.Random) -> str:
+    """產生書名 (約 45% 中文、45% 英文、10% 中英混合)"""
+    kind = rng.random()
+    if kind < 0.45:
+        return _cjk_text(rng, 3, 12)
+    if kind < 0.9:
+        return _latin_text(rng, 2, 6)
+    return f"{_cjk_text(rng, 2, 6)}：{_latin_text(rng, 1, 3)}"
+
+
+def make_author(rng: random.Random) -> str:
+    """產生作者名稱 (中文或英文姓名)"""
+    if rng.random() < 0.5:
+        return rng.choice(CJK_SURNAMES) + _cjk_text(rng, 1, 2)
+    return f"{rng.choice(LATIN_FIRST_NAMES)} {rng.choice(LATIN_LAST_NAMES)}"
+
+
+def make_book(rng: random.Random) -> Book:
+    """產生一本隨機書籍 (尚未存入資料庫)"""
+    return Book(
+        title=make_title(rng),
+        author=make_author(rng),
+        year=rng.randint(1900, 2025),
+        status=rng.choice(STATUS_CHOICES),
+        rating=rng.randint(0, 5),
+    )
+
+
+def generate_books(count: int, seed: int = DEFAULT_SEED) -> Iterator[Book]:
+    """
+    逐一產生合成書籍 (串流產生，不會一次佔用全部記憶體)
+    
+    Args:
+        count: 書籍數量
+        seed: 亂數種子
+    
+    Yields:
+        Book: 書籍物件
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield make_book(rng)
+
+
+def search_keywords(count: int, seed: int = DEFAULT_SEED) -> List[str]:
+    """
+    產生搜尋關鍵字：中文 2 字 (LIKE 查詢) 與 3 字 (全文索引)、英文單字、作者姓名
+    
+    Args:
+        count: 關鍵字數量
+        seed: 亂數種子
+    
+    Returns:
+        List[str]: 關鍵字
+    """
+    rng = random.Random(seed + 1)
+    makers = (
+        lambda: _cjk_text(rng, 2, 2),
+        lambda: _cjk_text(rng, 3, 3),
+        lambda: rng.choice(LATIN_WORDS[4:]),
+        lambda: rng.choice(LATIN_LAST_NAMES),
+    )
+    return [makers[i % len(makers)]() for i in range(count)]
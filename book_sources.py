@@ -0,0 +1,398 @@
+"""
+書籍資料來源模組
+包含 ListBookSource、PagedBookSource 與 LibraryBookSource 類別，提供表格依列號延遲取得書籍的介面
+(不依賴 wx，可在無圖形介面的環境使用)
+"""
+
+import logging
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from database import BookChange
+from models import Book
+
+logger = logging.getLogger(__name__)
+
+
+class ListBookSource:
+    """串列資料來源 - 用於已載入記憶體的書籍 (例如搜尋結果)"""
+    
+    # 書籍異動時可以局部更新 (重複套用同一事件結果不變)
+    patchable = True
+    
+    def __init__(self, books: List[Book]):
+        """
+        初始化串列資料來源
+        
+        Args:
+            books: 書籍列表
+        """
+        self.books = books
+    
+    def __len__(self) -> int:
+        return len(self.books)
+    
+    def get_book(self, row: int) -> Optional[Book]:
+        """獲取指定列的書籍"""
+        if 0 <= row < len(self.books):
+            return self.books[row]
+        return None
+    
+    def get_book_id(self, row: int) -> Optional[int]:
+        """獲取指定列的書籍ID"""
+        book = self.get_book(row)
+        return book.id if book else None
+    
+    def is_loading(self, row: int) -> bool:
+        """書籍是否仍在背景載入 (串列資料來源一律已載入)"""
+        return False
+    
+    def can_patch(self, change: BookChange) -> bool:
+        """書籍異動能否局部套用 (串列資料來源依書籍ID尋找，一律可以)"""
+        return self.patchable
+    
+    def _find_row(self, book_id: int) -> Optional[int]:
+        """找出書籍所在的列號"""
+        for row, book in enumerate(self.books):
+            if book.id == book_id:
+                return row
+        return None
+    
+    def upsert_book(self, book: Book) -> Tuple[Optional[int], bool]:
+        """
+        更新列表中的書籍 (搜尋結果不會加入新書籍)
+        
+        Args:
+            book: 新增或修改後的書籍
+        
+        Returns:
+            Tuple[Optional[int], bool]: (所在列號，不在列表中為 None, 是否新增了一列)
+        """
+        row = self._find_row(book.id)
+        if row is not None:
+            self.books[row] = book
+        return row, False
+    
+    def remove_book(self, book_id: int) -> Optional[int]:
+        """
+        從列表移除書籍
+        
+        Returns:
+            Optional[int]: 被移除的列號 (不在列表中為 None)
+        """
+        row = self._find_row(book_id)
+        if row is not None:
+            del self.books[row]
+        return row
+
+
+class PagedBookSource:
+    """分頁資料來源 - 列數取自計數表，書籍內容以 keyset 分頁按頁延遲載入
+    
+    每一頁以前一頁最後一本書的 (ID, 排序值) 作為游標讀取；前一頁的游標未知時 (例如直接拖曳捲軸)，
+    先以 get_page_cursor 查出該頁前一列的游標。建立資料來源 (重新整理) 只需讀取書籍數量與第一頁，
+    成本不隨書籍總數增加。
+    
+    提供 async_db 時，尚未載入的頁面 (與前後相鄰的頁面) 交給讀取執行緒池載入，
+    載入前 get_book 回傳 None (is_loading 為 True)，載入後經 dispatcher 呼叫 on_page_loaded(資料來源)；
+    否則在呼叫端執行緒同步載入。
+    """
+    
+    def __init__(self, db_manager, page_size: int = 200, max_pages: int = 32,
+                 order_by: str = "id", filters: Optional[dict] = None,
+                 async_db=None, on_page_loaded: Optional[Callable] = None, prefetch: int = 1):
+        """
+        初始化分頁資料來源
+        
+        Args:
+            db_manager: 資料庫管理器
+            page_size: 每頁筆數
+            max_pages: 記憶體中最多保留的頁數 (LRU)
+            order_by: 排序欄位
+            filters: 篩選條件
+            async_db: 背景載入頁面的 AsyncDatabase (需設定 dispatcher；None 表示同步載入)
+            on_page_loaded: 背景頁面載入完成時的回呼 on_page_loaded(資料來源)
+            prefetch: 背景載入時，前後各預先載入的頁數
+        """
+        self.db_manager = db_manager
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.order_by = order_by
+        self.filters = filters
+        self.count = db_manager.count_books(filters)
+        self._pages = OrderedDict()
+        # {頁碼: 該頁最後一本書的 (ID, 排序值)}，載入下一頁時作為游標 (頁面被淘汰後仍保留)
+        self._cursors = {}
+        # 依ID排序且沒有篩選時，書籍異動可以在已載入的頁面中算出所在列號 (其他排序須重新載入)
+        self.patchable = order_by == "id" and not filters
+        # 新增的書籍由 AUTOINCREMENT 配發遞增的ID，ID大於此值的書籍一定加在最後一列
+        self._last_id = db_manager.get_next_id() - 1 if self.patchable else None
+        # 已局部套用新增或刪除的書籍ID (同一事件再次送達時不重新載入)
+        self._patched_ids = set()
+        
+        self.async_db = async_db
+        self.on_page_loaded = on_page_loaded
+        self.prefetch = prefetch
+        self._pending = set()
+        self._last_page = None
+        # 列號位移時遞增，載入期間列號已改變的頁面結果不再使用
+        self._version = 0
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _load_page(self, page_no: int, after: Optional[Tuple[int, object]]) -> List[Book]:
+        """
+        以 keyset 分頁載入一頁書籍 (可在背景執行緒執行)
+        
+        Args:
+            page_no: 頁碼
+            after: 前一頁最後一本書的 (ID, 排序值)；第一頁以外為 None 時先依位置查詢游標
+        """
+        if page_no > 0 and after is None:
+            after = self.db_manager.get_page_cursor(page_no * self.page_size - 1, self.order_by, self.filters)
+            if after is None:
+                return []
+        after_id, after_value = after if after is not None else (None, None)
+        return self.db_manager.get_books_page(after_id, self.page_size, self.order_by, self.filters, after_value)
+    
+    def _store_page(self, page_no: int, page: List[Book]):
+        self._pages[page_no] = page
+        if len(page) == self.page_size:
+            last = page[-1]
+            self._cursors[page_no] = (last.id, getattr(last, self.order_by))
+        if len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+    
+    def preload(self, row: int):
+        """同步載入指定列所在的頁面 (在背景執行緒建立資料來源時使用，顯示第一頁不需等待)"""
+        if 0 <= row < self.count:
+            page_no = row // self.page_size
+            if page_no not in self._pages:
+                self._store_page(page_no, self._load_page(page_no, self._cursors.get(page_no - 1)))
+    
+    def get_book(self, row: int) -> Optional[Book]:
+        """獲取指定列的書籍 (必要時載入所在頁面；背景載入時尚未載入的列回傳 None)"""
+        if not 0 <= row < self.count:
+            return None
+        
+        page_no, offset = divmod(row, self.page_size)
+        if self.async_db is not None and page_no != self._last_page:
+            # 捲動到新的頁面時才檢查相鄰頁面，每個儲存格取值不需重複檢查
+            self._last_page = page_no
+            self._request_pages(page_no)
+        
+        page = self._pages.get(page_no)
+        if page is None:
+            if self.async_db is not None:
+                return None
+            page = self._load_page(page_no, self._cursors.get(page_no - 1))
+            self._store_page(page_no, page)
+        else:
+            self._pages.move_to_end(page_no)
+        # 讀取計數之後有書籍被刪除時，最後一頁可能較短
+        return page[offset] if offset < len(page) else None
+    
+    def is_loading(self, row: int) -> bool:
+        """指定列的頁面是否正在背景載入"""
+        return 0 <= row < self.count and row // self.page_size in self._pending
+    
+    def _request_pages(self, page_no: int):
+        """在讀取執行緒池載入指定頁面與前後相鄰的頁面 (已載入或載入中的頁面略過)"""
+        last_page = (self.count - 1) // self.page_size
+        for neighbour in range(max(page_no - self.prefetch, 0), min(page_no + self.prefetch, last_page) + 1):
+            if neighbour in self._pages or neighbour in self._pending:
+                continue
+            self._pending.add(neighbour)
+            future = self.async_db.run(self._load_page, neighbour, self._cursors.get(neighbour - 1))
+            self.async_db.then(
+                future,
+                lambda page, page_no=neighbour, version=self._version: self._page_loaded(page_no, version, page),
+                lambda error, page_no=neighbour: self._page_failed(page_no, error)
+            )
+    
+    def _page_loaded(self, page_no: int, version: int, page: List[Book]):
+        """背景頁面載入完成 (經 dispatcher 在呼叫端執行緒執行)"""
+        self._pending.discard(page_no)
+        if version != self._version:
+            # 載入期間列號已位移，下次取值時重新載入
+            self._last_page = None
+        else:
+            self._store_page(page_no, page)
+        if self.on_page_loaded is not None:
+            self.on_page_loaded(self)
+    
+    def _page_failed(self, page_no: int, error: Exception):
+        self._pending.discard(page_no)
+        logger.error("載入書籍頁面失敗: %s", error)
+    
+    def get_book_id(self, row: int) -> Optional[int]:
+        """獲取指定列的書籍ID (所在頁面尚未載入時為 None)"""
+        book = self.get_book(row)
+        return book.id if book else None
+    
+    def _drop_pages_from(self, row: int):
+        """列號位移後，捨棄該列所在頁面及之後的頁面與游標 (需要時重新載入)"""
+        first_page = row // self.page_size
+        for page_no in [page_no for page_no in self._pages if page_no >= first_page]:
+            del self._pages[page_no]
+        for page_no in [page_no for page_no in self._cursors if page_no >= first_page]:
+            del self._cursors[page_no]
+        self._version += 1
+        self._last_page = None
+    
+    def _locate(self, book_id: int) -> Tuple[Optional[int], bool]:
+        """
+        在已載入的頁面中找出書籍所在 (或依ID排序應插入) 的列號
+        
+        Returns:
+            Tuple[Optional[int], bool]: (列號，不在任何已載入頁面的範圍內為 None, 書籍是否已在頁面中)
+        """
+        for page_no, page in self._pages.items():
+            if not page:
+                continue
+            if page[0].id <= book_id <= page[-1].id or (page_no == 0 and book_id < page[0].id):
+                ids = [book.id for book in page]
+                offset = bisect_left(ids, book_id)
+                found = offset < len(ids) and ids[offset] == book_id
+                return page_no * self.page_size + offset, found
+        return None, False
+    
+    def can_patch(self, change: BookChange) -> bool:
+        """
+        書籍異動能否局部套用 (無法得知新增或刪除的書籍所在列號時，呼叫端應重新載入)
+        
+        Args:
+            change: 書籍異動事件
+        
+        Returns:
+            bool: 是否可以交給 upsert_book/remove_book
+        """
+        if not self.patchable:
+            return False
+        if change.kind == BookChange.UPDATED or change.book_id in self._patched_ids:
+            return True
+        if change.kind == BookChange.INSERTED and change.book_id > self._last_id:
+            return True
+        return self._locate(change.book_id)[0] is not None
+    
+    def upsert_book(self, book: Book) -> Tuple[Optional[int], bool]:
+        """
+        更新或插入書籍 (只更新已載入的頁面，未載入的頁面之後會讀到新資料)
+        
+        Args:
+            book: 新增或修改後的書籍
+        
+        Returns:
+            Tuple[Optional[int], bool]: (所在列號，不在已載入頁面中為 None, 是否新增了一列)
+        """
+        row, found = self._locate(book.id)
+        if found:
+            self._pages[row // self.page_size][row % self.page_size] = book
+            return row, False
+        if self._pending:
+            # 背景載入中的頁面可能包含修改前的資料
+            self._version += 1
+        
+        if book.id > self._last_id:
+            row = self.count
+            self._last_id = book.id
+        elif row is None or book.id in self._patched_ids:
+            return None, False
+        self._patched_ids.add(book.id)
+        self.count += 1
+        self._drop_pages_from(row)
+        return row, True
+    
+    def remove_book(self, book_id: int) -> Optional[int]:
+        """
+        移除書籍
+        
+        Returns:
+            Optional[int]: 被移除的列號 (不在已載入頁面中為 None)
+        """
+        row, found = self._locate(book_id)
+        if not found:
+            return None
+        self._patched_ids.add(book_id)
+        self.count -= 1
+        self._drop_pages_from(row)
+        return row
+
+
+class LibraryBookSource(ListBookSource):
+    """多館藏資料來源 - (館別名稱, 書籍) 串列 (合併檢視為唯讀，不做局部更新)"""
+    
+    patchable = False
+    
+    def __init__(self, entries: List[Tuple[str, Book]]):
+        """
+        初始化多館藏資料來源
+        
+        Args:
+            entries: LibrarySet 回傳的 (館別名稱, 書籍) 串列
+        """
+        super().__init__([book for _, book in entries])
+        self.libraries = [name for name, _ in entries]
+    
+    def get_library(self, row: int) -> Optional[str]:
+        """獲取指定列的館別名稱"""
+        if 0 <= row < len(self.libraries):
+            return self.libraries[row]
+        return None
+
+
+# 表格欄位依序為 ID、書名、作者、年份、狀態、評分
+STATUS_COLUMN = 4
+
+
+def format_cell(source, row: int, col: int) -> str:
+    """
+    表格儲存格顯示的文字 (BookGridTable.GetValue 與效能基準測試共用)
+    
+    Args:
+        source: 書籍資料來源
+        row: 列號
+        col: 欄號
+    
+    Returns:
+        str: 顯示的文字 (頁面載入中時只顯示已知的ID與「載入中...」)
+    """
+    book = source.get_book(row)
+    if book is None:
+        if col == 0:
+            book_id = source.get_book_id(row)
+            return str(book_id) if book_id is not None else ""
+        return "載入中..." if col == 1 and source.is_loading(row) else ""
+    if col == 0:
+        return str(book.id)
+    if col == 1:
+        return book.title
+    if col == 2:
+        return book.author
+    if col == 3:
+        return str(book.year)
+    if col == 4:
+        return book.status
+    return f"{book.rating}★" if book.rating > 0 else "未評分"
+
+
+def cell_style(source, row: int, col: int) -> Tuple[Optional[str], bool, bool]:
+    """
+    表格儲存格的樣式 (BookGridTable.GetAttr 依此選擇預先建立的屬性)
+    
+    Args:
+        source: 書籍資料來源
+        row: 列號
+        col: 欄號
+    
+    Returns:
+        Tuple[Optional[str], bool, bool]: (狀態欄的閱讀狀態或 None, 是否使用交替背景色, 是否靠左對齊)
+    """
+    status = None
+    if col == STATUS_COLUMN:
+        book = source.get_book(row)
+        if book is not None:
+            status = book.status
+    # 書名和作者靠左對齊，其他欄位置中；偶數列使用交替背景色
+    return status, row % 2 == 0, col in (1, 2)
@@ -0,0 +1,442 @@
+"""
+快取模組
+包含 CachedDatabaseManager 類別，在 DatabaseManager 前加上記憶體讀取快取 (書籍ID對照表與查詢結果)
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+from database import (CHANGE_FEED_MAX_ROWS, DEFAULT_PAGE_SIZE, SQL_CHANGE_VERSION,
+                      SQL_CHANGES_SINCE, SQL_OLDEST_CHANGE)
+from models import Book
+
+# 未指定時的快取上限
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_QUERIES = 64
+# 檢查其他連線寫入的最短間隔 (秒)
+DEFAULT_CHECK_INTERVAL = 0.5
+
+
+def _book_size(book: Book) -> int:
+    """估計一本書籍物件佔用的記憶體 (閱讀狀態為共用字串，不計入)"""
+    return sys.getsizeof(book) + sys.getsizeof(book.title) + sys.getsizeof(book.author)
+
+
+def _result_size(result) -> int:
+    """估計查詢結果佔用的記憶體"""
+    if isinstance(result, list):
+        return sys.getsizeof(result) + sum(_book_size(book) for book in result if isinstance(book, Book))
+    return sys.getsizeof(result)
+
+
+def _copy_result(result):
+    """回傳查詢結果的淺層複本，避免呼叫端修改快取中的串列"""
+    if isinstance(result, (list, array)):
+        return result[:]
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+def _filters_key(filters: Optional[dict]) -> tuple:
+    return tuple(sorted((filters or {}).items()))
+
+
+class CacheStats:
+    """快取統計 - 命中、未命中、淘汰與失效次數"""
+    
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def to_dict(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hit_rate, 4),
+        }
+
+
+class CachedDatabaseManager:
+    """快取資料庫管理器 - 讀取先查記憶體，寫入後使相關快取失效，其他方法直接轉交 DatabaseManager
+    
+    快取中的書籍物件會直接回傳給呼叫端 (查詢結果的串列會複製)，呼叫端應視為唯讀；
+    要修改書籍時請建立新的書籍物件再寫入。
+    """
+    
+    # 會改變資料、寫入後須清除查詢快取的方法 (依書籍ID失效的方法另外處理)
+    WRITE_METHODS = frozenset({"rebuild_search_index", "run_pending_backfills"})
+    
+    def __init__(self, db_manager, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: Optional[int] = None, max_queries: int = DEFAULT_MAX_QUERIES,
+                 check_interval: float = DEFAULT_CHECK_INTERVAL):
+        """
+        初始化快取資料庫管理器
+        
+        Args:
+            db_manager: 資料庫管理器
+            max_entries: 書籍ID對照表最多保留的書籍數量
+            max_bytes: 兩種快取合計的估計記憶體上限 (None 表示只以筆數限制)
+            max_queries: 最多保留的查詢結果數量
+            check_interval: 檢查其他連線或行程寫入的最短間隔 (秒，0 表示每次讀取都檢查)
+        """
+        self.db_manager = db_manager
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_queries = max_queries
+        
+        self._lock = threading.RLock()
+        self._books = OrderedDict()    # {書籍ID: (書籍, 估計大小)}
+        self._queries = OrderedDict()  # {查詢鍵: (結果, 估計大小)}
+        self._bytes = 0
+        # 每次失效加一；查詢前後世代不同時不寫入快取，避免存入寫入前讀到的舊資料
+        self._generation = 0
+        # 其他連線或行程的寫入以專用連線的 PRAGMA data_version 偵測 (數值只能與同一條連線比較)，
+        # 所有執行緒共用最後看到的版本，新的工作執行緒也不會讀到寫入前的快取；
+        # 版本改變時依異動紀錄表只讓被修改的書籍失效 (本行程的寫入也會出現在紀錄中，重複失效不影響正確性)
+        self.check_interval = check_interval
+        self._monitor = None
+        self._data_version = None
+        self._change_seq = 0
+        if db_manager.db_path != ":memory:":
+            self._monitor = sqlite3.connect(db_manager.db_path, isolation_level=None, check_same_thread=False)
+            self._data_version = self._monitor.execute("PRAGMA data_version").fetchone()[0]
+            row = self._monitor.execute(SQL_CHANGE_VERSION).fetchone()
+            self._change_seq = row[0] if row else 0
+        self._next_check = time.monotonic() + check_interval
+        
+        self.book_stats = CacheStats()
+        self.query_stats = CacheStats()
+        
+        # 訂閱依登記順序通知：快取先失效，之後登記的訂閱者 (例如主視窗) 重新讀取時不會拿到舊資料
+        db_manager.subscribe(self._on_changes)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def __getattr__(self, name):
+        attr = getattr(self.db_manager, name)
+        if name in self.WRITE_METHODS and callable(attr):
+            def write_through(*args, **kwargs):
+                try:
+                    return attr(*args, **kwargs)
+                finally:
+                    self.invalidate()
+            return write_through
+        return attr
+    
+    def close(self):
+        """關閉偵測用的連線與資料庫管理器"""
+        with self._lock:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+        self.db_manager.close()
+    
+    def _check_external_changes(self):
+        """其他連線 (包含其他執行緒與行程) 提交寫入後，使被修改的書籍與查詢快取失效 (每 check_interval 秒最多檢查一次)"""
+        now = time.monotonic()
+        if self._monitor is None or now < self._next_check:
+            return
+        with self._lock:
+            if self._monitor is None or now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            version = self._monitor.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return
+            self._data_version = version
+            book_ids = self._read_changed_ids()
+            if book_ids is None:
+                self.invalidate()
+            elif book_ids:
+                self.clear_queries()
+                self._forget_books(book_ids)
+    
+    def _read_changed_ids(self) -> Optional[set]:
+        """
+        讀取上次檢查之後異動紀錄表中的書籍ID (呼叫端須持有鎖)
+        
+        Returns:
+            Optional[set]: 被修改的書籍ID；紀錄過多、已被清除或資料庫被替換時回傳 None (應清除全部快取)
+        """
+        monitor = self._monitor
+        monitor.execute("BEGIN")
+        try:
+            row = monitor.execute(SQL_CHANGE_VERSION).fetchone()
+            latest = row[0] if row else 0
+            if latest == self._change_seq:
+                return set()
+            seq, self._change_seq = self._change_seq, latest
+            oldest = monitor.execute(SQL_OLDEST_CHANGE).fetchone()[0]
+            if latest < seq or oldest is None or seq < oldest - 1:
+                return None
+            rows = monitor.execute(SQL_CHANGES_SINCE, (seq, CHANGE_FEED_MAX_ROWS + 1)).fetchall()
+        finally:
+            monitor.execute("COMMIT")
+        if len(rows) > CHANGE_FEED_MAX_ROWS:
+            return None
+        return {book_id for _, book_id, _, _ in rows}
+    
+    def _evict(self):
+        """依筆數與記憶體上限淘汰最久未使用的項目 (呼叫端須持有鎖)"""
+        while len(self._books) > self.max_entries:
+            _, (_, size) = self._books.popitem(last=False)
+            self._bytes -= size
+            self.book_stats.evictions += 1
+        while len(self._queries) > self.max_queries:
+            _, (_, size) = self._queries.popitem(last=False)
+            self._bytes -= size
+            self.query_stats.evictions += 1
+        if self.max_bytes is None:
+            return
+        # 超過記憶體上限時先淘汰查詢結果 (通常較大)，再淘汰個別書籍
+        while self._bytes > self.max_bytes and self._queries:
+            _, (_, size) = self._queries.popitem(last=False)
+            self._bytes -= size
+            self.query_stats.evictions += 1
+        while self._bytes > self.max_bytes and self._books:
+            _, (_, size) = self._books.popitem(last=False)
+            self._bytes -= size
+            self.book_stats.evictions += 1
+    
+    def _store_books(self, books: Iterable[Book], generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            for book in books:
+                if book is None or book.id is None:
+                    continue
+                old = self._books.pop(book.id, None)
+                if old is not None:
+                    self._bytes -= old[1]
+                size = _book_size(book)
+                self._books[book.id] = (book, size)
+                self._bytes += size
+            self._evict()
+    
+    def _forget_books(self, book_ids: Iterable[int]):
+        with self._lock:
+            for book_id in book_ids:
+                old = self._books.pop(book_id, None)
+                if old is not None:
+                    self._bytes -= old[1]
+                    self.book_stats.invalidations += 1
+    
+    def _cached_query(self, key: tuple, load: Callable, cacheable: Callable = None):
+        """查詢結果快取：命中時回傳複本，未命中時執行 load 並 (在允許時) 存入快取"""
+        self._check_external_changes()
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is not None:
+                self._queries.move_to_end(key)
+                self.query_stats.hits += 1
+                return _copy_result(entry[0])
+            self.query_stats.misses += 1
+            generation = self._generation
+        
+        result = load()
+        if cacheable is not None and not cacheable():
+            return result
+        
+        with self._lock:
+            if generation == self._generation:
+                size = _result_size(result)
+                self._queries[key] = (result, size)
+                self._bytes += size
+                self._evict()
+        return _copy_result(result)
+    
+    def _on_changes(self, changes):
+        """書籍異動事件：使受影響的書籍與查詢快取失效"""
+        if any(change.book_id is None for change in changes):
+            self.invalidate()
+            return
+        self.clear_queries()
+        self._forget_books(change.book_id for change in changes)
+    
+    def clear_queries(self):
+        """清除所有查詢結果 (任何寫入都可能改變搜尋、分頁與統計結果)"""
+        with self._lock:
+            self._generation += 1
+            if self._queries:
+                self.query_stats.invalidations += len(self._queries)
+            for _, size in self._queries.values():
+                self._bytes -= size
+            self._queries.clear()
+    
+    def invalidate(self):
+        """清除全部快取"""
+        with self._lock:
+            self.clear_queries()
+            self.book_stats.invalidations += len(self._books)
+            self._books.clear()
+            self._bytes = 0
+    
+    def get_cache_stats(self) -> dict:
+        """
+        獲取快取統計
+        
+        Returns:
+            dict: 書籍與查詢快取的命中/未命中/淘汰/失效次數、目前筆數與估計記憶體
+        """
+        with self._lock:
+            return {
+                'books': dict(self.book_stats.to_dict(), entries=len(self._books)),
+                'queries': dict(self.query_stats.to_dict(), entries=len(self._queries)),
+                'bytes': self._bytes,
+            }
+    
+    def get_book_by_id(self, book_id: int) -> Optional[Book]:
+        """根據ID獲取書籍 (先查快取)"""
+        self._check_external_changes()
+        with self._lock:
+            entry = self._books.get(book_id)
+            if entry is not None:
+                self._books.move_to_end(book_id)
+                self.book_stats.hits += 1
+                return entry[0]
+            self.book_stats.misses += 1
+            generation = self._generation
+        
+        book = self.db_manager.get_book_by_id(book_id)
+        if book is not None:
+            self._store_books([book], generation)
+        return book
+    
+    def get_books_by_ids(self, book_ids: Iterable[int]) -> List[Book]:
+        """依ID批次獲取書籍 (只向資料庫查詢快取中沒有的書籍)"""
+        book_ids = list(book_ids)
+        self._check_external_changes()
+        found, missing = {}, []
+        with self._lock:
+            for book_id in book_ids:
+                entry = self._books.get(book_id)
+                if entry is not None:
+                    self._books.move_to_end(book_id)
+                    found[book_id] = entry[0]
+                else:
+                    missing.append(book_id)
+            self.book_stats.hits += len(found)
+            self.book_stats.misses += len(missing)
+            generation = self._generation
+        
+        if missing:
+            loaded = self.db_manager.get_books_by_ids(missing)
+            self._store_books(loaded, generation)
+            found.update((book.id, book) for book in loaded)
+        return [found[book_id] for book_id in book_ids if book_id in found]
+    
+    def get_all_books(self, as_batch: bool = False):
+        """獲取所有書籍 (結果快取)"""
+        return self._cached_query(("all", as_batch), lambda: self.db_manager.get_all_books(as_batch=as_batch))
+    
+    def search_books(self, keyword: str, should_cancel: Optional[Callable[[], bool]] = None,
+                     as_batch: bool = False, limit: Optional[int] = None):
+        """搜尋書籍 (依關鍵字快取結果；被取消的搜尋不會存入快取)"""
+        return self._cached_query(
+            ("search", keyword, as_batch, limit),
+            lambda: self.db_manager.search_books(keyword, should_cancel=should_cancel, as_batch=as_batch,
+                                                 limit=limit),
+            lambda: should_cancel is None or not should_cancel()
+        )
+    
+    def get_books_page(self, after_id: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       order_by: str = "id", filters: Optional[dict] = None,
+                       after_value=None) -> List[Book]:
+        """獲取一頁書籍 (結果快取)"""
+        return self._cached_query(
+            ("page", after_id, after_value, limit, order_by, _filters_key(filters)),
+            lambda: self.db_manager.get_books_page(after_id, limit, order_by, filters, after_value)
+        )
+    
+    def get_book_ids(self, order_by: str = "id", filters: Optional[dict] = None) -> array:
+        """依排序獲取書籍ID (結果快取)"""
+        return self._cached_query(
+            ("ids", order_by, _filters_key(filters)),
+            lambda: self.db_manager.get_book_ids(order_by, filters)
+        )
+    
+    def count_books(self, filters: Optional[dict] = None) -> int:
+        """獲取符合篩選條件的書籍數量 (結果快取)"""
+        return self._cached_query(("count", _filters_key(filters)), lambda: self.db_manager.count_books(filters))
+    
+    def get_status_counts(self) -> dict:
+        """獲取各閱讀狀態的書籍數量 (結果快取)"""
+        return self._cached_query(("status_counts",), self.db_manager.get_status_counts)
+    
+    def get_statistics(self) -> dict:
+        """獲取收藏統計 (結果快取)"""
+        return self._cached_query(("statistics",), self.db_manager.get_statistics)
+    
+    def get_book_count(self) -> int:
+        """獲取書籍總數"""
+        return sum(self.get_status_counts().values())
+    
+    def add_book(self, book: Book, validated: bool = False) -> bool:
+        """新增書籍 (成功後清除查詢快取)"""
+        success = self.db_manager.add_book(book, validated=validated)
+        if success:
+            self.clear_queries()
+        return success
+    
+    def update_book(self, book: Book, validated: bool = False) -> bool:
+        """更新書籍 (使該書籍與查詢快取失效)"""
+        try:
+            return self.db_manager.update_book(book, validated=validated)
+        finally:
+            self.clear_queries()
+            self._forget_books([book.id])
+    
+    def delete_book(self, book_id: int) -> bool:
+        """刪除書籍 (使該書籍與查詢快取失效)"""
+        try:
+            return self.db_manager.delete_book(book_id)
+        finally:
+            self.clear_queries()
+            self._forget_books([book_id])
+    
+    def add_books(self, books, *args, **kwargs):
+        """批次新增書籍 (完成後清除查詢快取)"""
+        try:
+            return self.db_manager.add_books(books, *args, **kwargs)
+        finally:
+            self.clear_queries()
+    
+    def update_books(self, books, *args, **kwargs):
+        """批次更新書籍 (完成後清除全部快取)"""
+        try:
+            return self.db_manager.update_books(books, *args, **kwargs)
+        finally:
+            self.invalidate()
+    
+    def upsert_books(self, books, *args, **kwargs):
+        """批次新增或更新書籍 (完成後清除全部快取)"""
+        try:
+            return self.db_manager.upsert_books(books, *args, **kwargs)
+        finally:
+            self.invalidate()
+    
+    def delete_books(self, book_ids, *args, **kwargs):
+        """批次刪除書籍 (完成後清除全部快取)"""
+        try:
+            return self.db_manager.delete_books(book_ids, *args, **kwargs)
+        finally:
+            self.invalidate()
@@ -0,0 +1,76 @@
+"""
+異動追蹤模組
+包含 ChangeFeed 類別，在背景執行緒輪詢資料庫，將其他連線或行程寫入的書籍異動交給呼叫端
+(不依賴 wx，異動透過回呼交給呼叫端，例如以 wx.CallAfter 轉回 UI 執行緒)
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Callable, List
+from database import BookChange
+
+logger = logging.getLogger(__name__)
+
+# 未指定時的輪詢間隔 (秒)
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class ChangeFeed:
+    """異動追蹤 - 以 PRAGMA data_version 偵測新的提交，有提交時才讀取異動紀錄表
+    
+    輪詢使用背景執行緒自己的連線，因此本行程其他連線的寫入也會收到；
+    同一筆異動可能已由 DatabaseManager.subscribe 的事件處理過，套用方式必須可重複套用。
+    """
+    
+    def __init__(self, db_manager, on_changes: Callable[[List[BookChange]], None],
+                 interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        初始化異動追蹤並開始輪詢
+        
+        Args:
+            db_manager: 資料庫管理器
+            on_changes: 有異動時的回呼 on_changes(BookChange 串列)，在背景執行緒呼叫
+            interval: 輪詢間隔 (秒)
+        """
+        self.db_manager = db_manager
+        self.on_changes = on_changes
+        self.interval = interval
+        # 只回報建立之後的異動
+        self.last_seq = db_manager.get_change_version()
+        
+        self._data_version = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ChangeFeed", daemon=True)
+        self._thread.start()
+    
+    def poll(self) -> List[BookChange]:
+        """
+        檢查一次新的異動 (由輪詢執行緒呼叫；沒有新提交時只執行一次 PRAGMA data_version)
+        
+        Returns:
+            List[BookChange]: 上次檢查之後的異動
+        """
+        version = self.db_manager.get_data_version()
+        if version == self._data_version:
+            return []
+        self._data_version = version
+        self.last_seq, changes = self.db_manager.get_changes_since(self.last_seq)
+        return changes
+    
+    def close(self):
+        """停止背景執行緒"""
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                changes = self.poll()
+            except sqlite3.Error as e:
+                # 例如資料庫暫時被鎖定，下次輪詢再試
+                logger.warning("讀取書籍異動失敗: %s", e)
+                self._data_version = None
+                continue
+            if changes:
+                self.on_changes(changes)
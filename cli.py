@@ -0,0 +1,217 @@
+"""
+命令列介面模組
+不需圖形介面的批次操作 (例如排程或伺服器)，直接使用 DatabaseManager，完全不匯入 wx
+
+用法: python cli.py [--db 資料庫] [--quiet] [--profile] [--trace-sql] 指令 [參數]
+    add      新增一本書籍 (輸出新書籍的ID)
+    search   搜尋書籍，結果以 CSV 或 JSON Lines 寫到標準輸出
+    import   由檔案或標準輸入 (-) 匯入 CSV / JSON Lines
+    export   匯出到檔案或標準輸出 (-)
+    stats    顯示統計資訊
+    vacuum   清除過舊的異動紀錄並重整資料庫檔案
+
+資料只寫到標準輸出；處理訊息 (logging) 與每個指令的執行時間寫到標準錯誤輸出，因此可以直接串接管線，例如:
+    python cli.py export - --format jsonl | python cli.py --db copy.db import - --format jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from database import DEFAULT_CHANGE_RETENTION, DatabaseManager
+from exporters import EXPORTERS, format_from_path, get_exporter
+from importers import IMPORT_MODES, IMPORTERS
+from instrumentation import Instrumentation
+from models import Book, STATUS_CHOICES
+
+# 可以寫到標準輸出或由標準輸入讀取的格式
+STREAM_FORMATS = ("csv", "jsonl")
+
+# 結束代碼：有資料列被拒絕的匯入以 EXIT_REJECTED 結束，方便排程判斷
+EXIT_OK, EXIT_ERROR, EXIT_REJECTED = 0, 1, 2
+
+
+def cmd_add(db_manager: DatabaseManager, args, out) -> int:
+    """新增一本書籍"""
+    book = Book(args.title, args.author, args.year, args.status, args.rating)
+    if not db_manager.add_book(book):
+        return EXIT_ERROR
+    out.write(f"{book.id}\n")
+    return EXIT_OK
+
+
+def cmd_search(db_manager: DatabaseManager, args, out) -> int:
+    """搜尋書籍並輸出結果"""
+    batch = db_manager.search_books(args.keyword, as_batch=True, limit=args.limit)
+    get_exporter(args.format, db_manager).export_stream(out, [list(batch.rows())])
+    return EXIT_OK
+
+
+def cmd_import(db_manager: DatabaseManager, args, out) -> int:
+    """由檔案或標準輸入匯入書籍"""
+    format_name = args.format
+    if format_name is None:
+        extension = os.path.splitext(args.file)[1].lstrip(".").lower()
+        format_name = next((cls.format for cls in IMPORTERS.values() if cls.extension == extension), "csv")
+    
+    importer = IMPORTERS[format_name](db_manager, args.mode, args.batch_size)
+    if args.file == "-":
+        result = importer.import_stream(sys.stdin.buffer, args.rejects or "stdin_rejects.csv")
+    else:
+        result = importer.import_file(args.file, args.rejects)
+    
+    if result.reject_path:
+        print(f"被拒絕的資料列已寫入: {result.reject_path}", file=sys.stderr)
+        return EXIT_REJECTED
+    return EXIT_OK
+
+
+def cmd_export(db_manager: DatabaseManager, args, out) -> int:
+    """匯出到檔案或標準輸出"""
+    if args.file == "-":
+        format_name = args.format or "csv"
+        if format_name not in STREAM_FORMATS:
+            print(f"標準輸出只支援 {', '.join(STREAM_FORMATS)} 格式", file=sys.stderr)
+            return EXIT_ERROR
+        count = get_exporter(format_name, db_manager, args.batch_size).export_stream(out)
+        print(f"已匯出 {count} 本書籍", file=sys.stderr)
+        return EXIT_OK
+    
+    format_name = args.format or format_from_path(args.file)
+    if format_name is None:
+        print("無法由副檔名判斷匯出格式，請指定 --format", file=sys.stderr)
+        return EXIT_ERROR
+    get_exporter(format_name, db_manager, args.batch_size).export(args.file)
+    return EXIT_OK
+
+
+def cmd_stats(db_manager: DatabaseManager, args, out) -> int:
+    """顯示統計資訊"""
+    statistics = db_manager.get_statistics()
+    if args.json:
+        out.write(json.dumps(statistics, ensure_ascii=False) + "\n")
+        return EXIT_OK
+    
+    status_counts = statistics['status_counts']
+    lines = [f"總書籍數: {statistics['total']}"]
+    lines += [f"{status}: {status_counts.get(status, 0)}" for status in STATUS_CHOICES]
+    lines.append(f"平均評分: {statistics['average_rating']}")
+    lines.append("評分分布: " + "，".join(
+        f"{rating}★ {count}" if rating else f"未評分 {count}"
+        for rating, count in sorted(statistics['rating_histogram'].items())))
+    out.write("\n".join(lines) + "\n")
+    return EXIT_OK
+
+
+def cmd_vacuum(db_manager: DatabaseManager, args, out) -> int:
+    """清除過舊的異動紀錄並重整資料庫檔案"""
+    size_before = os.path.getsize(args.db) if os.path.exists(args.db) else 0
+    pruned = db_manager.prune_changes(args.keep_days * 24 * 3600)
+    if not db_manager.vacuum():
+        return EXIT_ERROR
+    size_after = os.path.getsize(args.db) if os.path.exists(args.db) else 0
+    out.write(f"清除異動紀錄 {pruned} 筆，檔案大小: {size_before // 1024} KB -> {size_after // 1024} KB\n")
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """建立命令列參數解析器"""
+    parser = argparse.ArgumentParser(description="書籍收藏命令列工具 (不需圖形介面)")
+    parser.add_argument("--db", default="books.db", help="資料庫檔案路徑")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不顯示處理訊息 (錯誤與執行時間仍會顯示)")
+    parser.add_argument("--profile", action="store_true", help="結束時列出各資料庫方法的呼叫次數與耗時")
+    parser.add_argument("--trace-sql", action="store_true", help="列出執行的每個 SQL 敘述")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="指令")
+    
+    add = commands.add_parser("add", help="新增一本書籍")
+    add.add_argument("--title", required=True, help="書名")
+    add.add_argument("--author", required=True, help="作者")
+    add.add_argument("--year", type=int, required=True, help="出版年份")
+    add.add_argument("--status", choices=STATUS_CHOICES, default=STATUS_CHOICES[0], help="閱讀狀態")
+    add.add_argument("--rating", type=int, default=0, help="評分 (0-5，0 表示未評分)")
+    add.set_defaults(handler=cmd_add)
+    
+    search = commands.add_parser("search", help="搜尋書籍 (結果寫到標準輸出)")
+    search.add_argument("keyword", help="書名或作者關鍵字")
+    search.add_argument("--format", choices=STREAM_FORMATS, default="csv", help="輸出格式")
+    search.add_argument("--limit", type=int, help="最多輸出的筆數")
+    search.set_defaults(handler=cmd_search)
+    
+    import_ = commands.add_parser("import", help="匯入 CSV / JSON Lines")
+    import_.add_argument("file", help="來源檔案路徑 (- 表示標準輸入)")
+    import_.add_argument("--format", choices=sorted(IMPORTERS), help="來源格式 (預設由副檔名判斷，標準輸入為 csv)")
+    import_.add_argument("--mode", choices=sorted(IMPORT_MODES), default="append",
+                         help="匯入模式 (append 全部新增 / upsert 依ID更新或新增 / dedupe 略過重複書籍)")
+    import_.add_argument("--rejects", help="拒絕檔路徑")
+    import_.add_argument("--batch-size", type=int, default=5000, help="每批寫入的資料列數")
+    import_.set_defaults(handler=cmd_import)
+    
+    export = commands.add_parser("export", help="匯出到檔案或標準輸出")
+    export.add_argument("file", help="輸出檔案路徑 (- 表示標準輸出)")
+    export.add_argument("--format", choices=sorted(EXPORTERS), help="匯出格式 (預設由副檔名判斷，標準輸出為 csv)")
+    export.add_argument("--batch-size", type=int, default=2000, help="每批的資料列數")
+    export.set_defaults(handler=cmd_export)
+    
+    stats = commands.add_parser("stats", help="顯示統計資訊")
+    stats.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    stats.set_defaults(handler=cmd_stats)
+    
+    vacuum = commands.add_parser("vacuum", help="清除過舊的異動紀錄並重整資料庫檔案")
+    vacuum.add_argument("--keep-days", type=float, default=DEFAULT_CHANGE_RETENTION / 86400,
+                        help="異動紀錄保留天數")
+    vacuum.set_defaults(handler=cmd_vacuum)
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    命令列入口
+    
+    Args:
+        argv: 命令列參數 (None 表示 sys.argv)
+    
+    Returns:
+        int: 結束代碼
+    """
+    args = build_parser().parse_args(argv)
+    
+    # 資料一律以 UTF-8 寫到標準輸出；DatabaseManager 等模組的 logging 訊息寫到標準錯誤輸出
+    out = sys.stdout
+    if hasattr(out, "reconfigure"):
+        out.reconfigure(encoding="utf-8", newline="")
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO,
+                        format="%(message)s", stream=sys.stderr)
+    if args.trace_sql:
+        logging.getLogger("database.sql").setLevel(logging.DEBUG)
+    instrumentation = Instrumentation(trace_sql=args.trace_sql)
+    
+    start = time.perf_counter()
+    opened = None
+    code = EXIT_ERROR
+    try:
+        with DatabaseManager(args.db, instrumentation=instrumentation) as db_manager:
+            opened = time.perf_counter()
+            code = args.handler(db_manager, args, out)
+        out.flush()
+    except BrokenPipeError:
+        # 讀取端提前關閉 (例如接到 head)，不視為錯誤
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        code = EXIT_OK
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"錯誤: {e}", file=sys.stderr)
+    
+    if args.profile:
+        print(instrumentation.format_report(), file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    timing = f"{args.command}: {elapsed:.3f} 秒"
+    if opened is not None:
+        timing += f" (開啟資料庫 {opened - start:.3f} 秒)"
+    print(timing, file=sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,260 +3,1651 @@
 包含 DatabaseManager 類別，負責所有 SQLite 資料庫操作
 """
 
+import json
+import logging
+import os
 import sqlite3
-from typing import List, Optional
-from models import Book
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from instrumentation import Instrumentation, error_log_filter, instrumented
+from models import Book, BookBatch, book_row_factory, validate_batch
+from migrations import LATEST_VERSION, get_schema_version, migrate, run_backfills
+
+logger = logging.getLogger(__name__)
+logger.addFilter(error_log_filter)
+
+
+# 固定的 SQL 敘述 (相同字串可重複使用連線上的預備敘述快取)
+SQL_MAX_ID = 'SELECT MAX(id) FROM books'
+SQL_INSERT = '''
+    INSERT INTO books (title, author, year, status, rating)
+    VALUES (?, ?, ?, ?, ?)
+'''
+SQL_INSERT_WITH_ID = '''
+    INSERT INTO books (id, title, author, year, status, rating)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_UPDATE = '''
+    UPDATE books
+    SET title=?, author=?, year=?, status=?, rating=?
+    WHERE id=?
+'''
+SQL_UPSERT = '''
+    INSERT INTO books (id, title, author, year, status, rating)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        title=excluded.title, author=excluded.author, year=excluded.year,
+        status=excluded.status, rating=excluded.rating
+    WHERE (title, author, year, status, rating)
+        IS NOT (excluded.title, excluded.author, excluded.year, excluded.status, excluded.rating)
+'''
+SQL_DELETE = 'DELETE FROM books WHERE id=?'
+SQL_DELETE_RETURNING = 'DELETE FROM books WHERE id=? RETURNING id, title, author, year, status, rating'
+SQL_SELECT_ALL = 'SELECT id, title, author, year, status, rating FROM books ORDER BY id'
+SQL_SEARCH_LIKE = '''
+    SELECT id, title, author, year, status, rating
+    FROM books
+    WHERE title LIKE ? OR author LIKE ?
+    ORDER BY id
+'''
+SQL_SELECT_BY_ID = 'SELECT id, title, author, year, status, rating FROM books WHERE id=?'
+SQL_SEARCH_FTS = '''
+    SELECT b.id, b.title, b.author, b.year, b.status, b.rating
+    FROM books_fts
+    JOIN books AS b ON b.id = books_fts.rowid
+    WHERE books_fts MATCH ?
+    ORDER BY bm25(books_fts), b.id
+'''
+
+# 分頁查詢可用的排序欄位與篩選條件
+PAGE_ORDER_COLUMNS = ("id", "title", "author", "year", "status", "rating")
+PAGE_ORDER_COLLATIONS = {"author": "NOCASE"}  # 與 idx_books_author 的定序一致
+PAGE_FILTERS = {
+    "status": "status = ?",
+    "author": "author = ? COLLATE NOCASE",
+    "year": "year = ?",
+    "min_year": "year >= ?",
+    "max_year": "year <= ?",
+    "min_rating": "rating >= ?",
+    "max_rating": "rating <= ?",
+}
+DEFAULT_PAGE_SIZE = 100
+
+# 可取消的搜尋每執行多少個 SQLite 虛擬機指令檢查一次是否取消
+SEARCH_CANCEL_CHECK_STEPS = 10000
+
+# 全文索引分詞器選項：trigram 支援中文等無空白語言的子字串比對
+FTS_TOKENIZERS = {
+    "trigram": "trigram",
+    "unicode61": "unicode61 remove_diacritics 2",
+}
+FTS_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN
+        INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+        INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+    END
+    ''',
+]
+SQL_RESERVE_IDS = "UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT IFNULL(MAX(id), 0) FROM books)) + ? WHERE name = 'books'"
+SQL_INIT_SEQUENCE = "INSERT INTO sqlite_sequence (name, seq) SELECT 'books', IFNULL(MAX(id), 0) + ? FROM books"
+SQL_SEQUENCE = "SELECT seq FROM sqlite_sequence WHERE name = 'books'"
+SQL_SELECT_BY_IDS = '''
+    SELECT id, title, author, year, status, rating
+    FROM books
+    WHERE id IN (SELECT value FROM json_each(?))
+'''
+SQL_EXISTING_KEYS = '''
+    SELECT title, author, year FROM books
+    WHERE title IN (SELECT value FROM json_each(?))
+'''
+SQL_FTS_INDEX_IDS = '''
+    INSERT INTO books_fts (rowid, title, author)
+    SELECT id, title, author FROM books WHERE id IN (SELECT value FROM json_each(?))
+'''
+SQL_EXISTING_IDS = 'SELECT id FROM books WHERE id IN (SELECT value FROM json_each(?))'
+SQL_STATUS_COUNTS = 'SELECT status, count FROM book_status_counts WHERE count > 0'
+SQL_RATING_HISTOGRAM = 'SELECT rating, COUNT(*) FROM books GROUP BY rating'
+SQL_YEAR_COUNTS = 'SELECT year, COUNT(*) FROM books GROUP BY year ORDER BY year'
+SQL_AVERAGE_RATING = 'SELECT AVG(rating) FROM books WHERE rating > 0'
+SQL_CHANGE_VERSION = "SELECT seq FROM sqlite_sequence WHERE name = 'book_changes'"
+SQL_OLDEST_CHANGE = 'SELECT MIN(seq) FROM book_changes'
+SQL_CHANGES_SINCE = 'SELECT seq, book_id, op, old_status FROM book_changes WHERE seq > ? ORDER BY seq LIMIT ?'
+SQL_PRUNE_CHANGES = 'DELETE FROM book_changes WHERE changed_at < ?'
+
+# 批次操作預設每個 executemany 區塊的筆數
+DEFAULT_CHUNK_SIZE = 1000
+
+# get_changes_since 一次最多回傳的異動紀錄筆數 (超過時改為通知重新載入)
+CHANGE_FEED_MAX_ROWS = 1000
+
+# prune_changes 預設保留異動紀錄的秒數 (7 天)
+DEFAULT_CHANGE_RETENTION = 7 * 24 * 3600
+
+# 批次新增的區塊達到此筆數時，暫停逐筆觸發的全文索引，改為整個區塊一次寫入索引
+FTS_BULK_MIN_ROWS = 500
+
+
+def _chunked(iterable: Iterable, size: int):
+    """將可迭代物件切成固定大小的串列區塊"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _rows_to_books(rows) -> List[Book]:
+    """將 (id, title, author, year, status, rating) 資料列轉為書籍物件"""
+    return [Book.from_row(row) for row in rows]
+
+
+def read_only_uri(path: str) -> str:
+    """資料庫檔案的唯讀 URI (file:...?mode=ro)，開啟時不會建立或修改檔案"""
+    return f"{Path(os.path.abspath(path)).as_uri()}?mode=ro"
+
+
+def _collate(order_by: str) -> str:
+    """排序欄位對應的 COLLATE 子句"""
+    collation = PAGE_ORDER_COLLATIONS.get(order_by)
+    return f" COLLATE {collation}" if collation else ""
+
+
+def _build_filters(order_by: str, filters: Optional[dict]) -> Tuple[List[str], list]:
+    """檢查排序欄位並將篩選條件轉為 WHERE 子句與參數"""
+    if order_by not in PAGE_ORDER_COLUMNS:
+        raise ValueError(f"不支援的排序欄位: {order_by}")
+    
+    clauses, params = [], []
+    for key, value in (filters or {}).items():
+        if key not in PAGE_FILTERS:
+            raise ValueError(f"不支援的篩選條件: {key}")
+        clauses.append(PAGE_FILTERS[key])
+        params.append(value)
+    return clauses, params
+
+
+class BatchResult:
+    """批次操作結果 - 記錄每一筆輸入資料的成功或錯誤"""
+    
+    def __init__(self):
+        self.total = 0
+        self.succeeded = []  # 成功的輸入索引
+        self.errors = []     # (輸入索引, 錯誤訊息)
+        self.skipped = []    # 重複而略過的輸入索引
+    
+    @property
+    def success_count(self) -> int:
+        return len(self.succeeded)
+    
+    @property
+    def error_count(self) -> int:
+        return len(self.errors)
+    
+    @property
+    def skip_count(self) -> int:
+        return len(self.skipped)
+    
+    def add_success(self, index: int):
+        self.succeeded.append(index)
+    
+    def add_error(self, index: int, message: str):
+        self.errors.append((index, message))
+    
+    def add_skipped(self, index: int):
+        self.skipped.append(index)
+    
+    def fail_all(self, message: str):
+        """整個交易回滾時，將原本成功的資料全部改記為錯誤"""
+        self.errors.extend((index, message) for index in self.succeeded)
+        self.errors.sort()
+        self.succeeded = []
+    
+    def __str__(self) -> str:
+        text = f"共 {self.total} 筆：成功 {self.success_count} 筆，失敗 {self.error_count} 筆"
+        if self.skipped:
+            text += f"，略過重複 {self.skip_count} 筆"
+        return text
+
+
+def _validate_chunk(chunk: List[Tuple[int, Book]], report: BatchResult,
+                    validated: bool) -> List[Tuple[int, Book]]:
+    """整批驗證一個區塊，無效的資料記為錯誤並回傳有效的 (輸入索引, 書籍)"""
+    if validated:
+        return chunk
+    mask, messages = validate_batch(book for _, book in chunk)
+    valid = []
+    for (index, book), invalid, message in zip(chunk, mask, messages):
+        if invalid:
+            report.add_error(index, message)
+        else:
+            valid.append((index, book))
+    return valid
+
+
+class BookChange:
+    """書籍異動事件 - 寫入提交後通知訂閱者
+    
+    inserted 只有 book；updated 有 book 與修改前的 old_book；deleted 只有 old_book；
+    reset 表示批次寫入 (匯入等) 變更了不特定的多筆資料，訂閱者應重新載入。
+    由異動紀錄表 (get_changes_since) 產生的事件沒有 old_book，只有 book_id 與原本的閱讀狀態。
+    """
+    
+    INSERTED = "inserted"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    RESET = "reset"
+    
+    def __init__(self, kind: str, book: Optional[Book] = None, old_book: Optional[Book] = None,
+                 book_id: Optional[int] = None, old_status: Optional[str] = None):
+        self.kind = kind
+        self.book = book
+        self.old_book = old_book
+        if book_id is None and (book or old_book) is not None:
+            book_id = (book or old_book).id
+        self.book_id = book_id
+        if old_status is None and old_book is not None:
+            old_status = old_book.status
+        self.old_status = old_status
+    
+    @property
+    def status_delta(self) -> dict:
+        """各閱讀狀態數量的增減 (reset 時為空字典)"""
+        delta = {}
+        if self.kind in (self.UPDATED, self.DELETED):
+            delta[self.old_status] = delta.get(self.old_status, 0) - 1
+        if self.book is not None:
+            delta[self.book.status] = delta.get(self.book.status, 0) + 1
+        return {status: count for status, count in delta.items() if count}
+    
+    def __repr__(self) -> str:
+        return f"BookChange({self.kind}, id={self.book_id})"
+
+
+# listener(changes)：在執行寫入的執行緒呼叫，需要更新介面時請自行轉交 (例如 wx.CallAfter)
+ChangeListener = Callable[[List[BookChange]], None]
 
 
 class DatabaseManager:
     """資料庫管理類別 - 負責 SQLite 資料庫的所有操作"""
     
-    def __init__(self, db_path: str = "books.db"):
+    def __init__(self, db_path: str = "books.db", synchronous: str = "NORMAL",
+                 cache_size: int = -16000, mmap_size: int = 268435456,
+                 busy_timeout: float = 5.0, cached_statements: int = 256,
+                 fts_tokenizer: Optional[str] = "trigram", defer_backfill: bool = False,
+                 instrumentation: Optional[Instrumentation] = None, read_only: bool = False):
         """
         初始化資料庫管理器
         
+        每個執行緒使用一條長期連線，所有方法共用，不再每次操作都重新連線。
+        
         Args:
             db_path: 資料庫檔案路徑
+            synchronous: PRAGMA synchronous 設定 (OFF/NORMAL/FULL)
+            cache_size: PRAGMA cache_size (負值表示 KiB)
+            mmap_size: PRAGMA mmap_size (位元組，0 表示停用)
+            busy_timeout: 等待資料庫鎖定的秒數
+            cached_statements: 每條連線快取的預備敘述數量
+            fts_tokenizer: 全文索引分詞器 (trigram/unicode61)，None 表示停用全文索引
+            defer_backfill: 是否延後資料回填 (稍後呼叫 run_pending_backfills，例如在背景執行緒)
+            instrumentation: 效能量測 (None 表示建立預設的 Instrumentation)
+            read_only: 是否以唯讀方式開啟 (不套用遷移、不建立全文索引，結構版本過舊時拋出 sqlite3.DatabaseError)
         """
         self.db_path = db_path
+        self.read_only = read_only
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        if fts_tokenizer is not None and fts_tokenizer not in FTS_TOKENIZERS:
+            raise ValueError(f"不支援的分詞器: {fts_tokenizer}")
+        self.fts_tokenizer = fts_tokenizer
+        self.fts_enabled = False
+        self.defer_backfill = defer_backfill
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        
+        self._local = threading.local()
+        self._connections = []
+        self._shared_connection = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._listeners: List[ChangeListener] = []
+        
         self.init_database()
     
-    def init_database(self):
-        """初始化資料庫，創建 books 表格"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """建立新連線並套用 PRAGMA 設定"""
+        conn = sqlite3.connect(
+            read_only_uri(self.db_path) if self.read_only else self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=self.read_only
+        )
+        if self.db_path != ":memory:" and not self.read_only:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        if self.instrumentation.trace_sql:
+            conn.set_trace_callback(self.instrumentation.trace)
+        self.instrumentation.count("connections")
+        return conn
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        取得目前執行緒的資料庫連線 (必要時建立)
+        
+        記憶體資料庫 (":memory:") 無法跨連線共享，因此所有執行緒共用同一條連線。
+        
+        Returns:
+            sqlite3.Connection: 資料庫連線
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("資料庫管理器已關閉")
+        
+        if self.db_path == ":memory:":
+            with self._lock:
+                if self._shared_connection is None:
+                    self._shared_connection = self._connect()
+                    self._connections.append(self._shared_connection)
+                return self._shared_connection
+        
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """
+        寫入交易 (BEGIN IMMEDIATE ... COMMIT，發生例外時 ROLLBACK)
+        
+        Yields:
+            sqlite3.Connection: 目前執行緒的資料庫連線
+        """
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        self.instrumentation.count("transactions")
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS books (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        author TEXT NOT NULL,
-                        year INTEGER NOT NULL,
-                        status TEXT DEFAULT '未讀',
-                        rating INTEGER DEFAULT 0
-                    )
-                ''')
-                conn.commit()
-                print("資料庫初始化成功")
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self.instrumentation.count("rollbacks")
+            raise
+        else:
+            conn.execute("COMMIT")
+    
+    @contextmanager
+    def read_snapshot(self):
+        """
+        讀取交易 (BEGIN ... COMMIT)：區塊內同一執行緒的查詢都看到同一個資料庫快照
+        
+        WAL 模式下不會阻擋寫入；區塊內不可呼叫會開始寫入交易的方法。
+        連線已在交易中時 (巢狀呼叫) 直接沿用外層交易，由外層負責結束。
+        
+        Yields:
+            sqlite3.Connection: 目前執行緒的資料庫連線
+        """
+        conn = self.get_connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+    
+    def close(self):
+        """關閉所有由此管理器開啟的連線"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._shared_connection = None
+            self._closed = True
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def set_sql_trace(self, enabled: bool):
+        """
+        開啟或關閉 SQL 追蹤 (套用到已開啟的連線；追蹤時每個敘述都會呼叫 trace callback)
+        
+        Args:
+            enabled: 是否追蹤
+        """
+        self.instrumentation.trace_sql = enabled
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.set_trace_callback(self.instrumentation.trace if enabled else None)
+    
+    def subscribe(self, listener: ChangeListener) -> ChangeListener:
+        """
+        訂閱書籍異動事件
+        
+        Args:
+            listener: 每次寫入提交後呼叫 listener(List[BookChange])
+        
+        Returns:
+            ChangeListener: 同一個 listener (方便之後取消訂閱)
+        """
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+        return listener
+    
+    def unsubscribe(self, listener: ChangeListener):
+        """取消訂閱書籍異動事件"""
+        with self._lock:
+            self._listeners = [item for item in self._listeners if item is not listener]
+    
+    def _notify(self, changes: List[BookChange]):
+        """通知所有訂閱者 (訂閱者的例外不影響已提交的寫入)"""
+        for listener in self._listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.error("書籍異動通知失敗: %s", e)
+    
+    def _notify_reset(self, report: BatchResult):
+        """批次寫入有成功的資料時通知訂閱者重新載入"""
+        if report.succeeded and self._listeners:
+            self._notify([BookChange(BookChange.RESET)])
+    
+    @instrumented
+    def init_database(self, progress=None):
+        """
+        初始化資料庫，依序套用結構遷移並建立全文索引
+        
+        結構版本 (PRAGMA user_version) 已是最新且全文索引已存在時只執行幾個讀取查詢，
+        不執行 DDL 也不取得寫入鎖。
+        
+        Args:
+            progress: 資料回填進度回呼 progress(說明, 已完成筆數, 總筆數)
+        """
+        try:
+            conn = self.get_connection()
+            if self.read_only:
+                # 唯讀開啟不修改檔案：結構須已是最新版本 (資料回填只影響時間戳記欄位，不需完成)
+                version = get_schema_version(conn)
+                if version < LATEST_VERSION:
+                    raise sqlite3.DatabaseError(
+                        f"{self.db_path} 的結構版本 ({version}) 過舊 (目前為 {LATEST_VERSION})，請先以一般模式開啟以完成遷移")
+                self.fts_enabled = self._fts_ready(conn)
+                logger.info("資料庫已以唯讀方式開啟")
+                return
+            migrate(conn, progress, run_backfill=not self.defer_backfill)
+            self.fts_enabled = self._fts_ready(conn)
+            if not self.fts_enabled and self.fts_tokenizer is not None:
+                with self.transaction() as conn:
+                    self.fts_enabled = self._init_fts(conn)
+            logger.info("資料庫初始化成功")
         except sqlite3.Error as e:
-            print(f"資料庫初始化失敗: {e}")
+            logger.error("資料庫初始化失敗: %s", e)
             raise
     
+    @instrumented
+    def run_pending_backfills(self, progress=None, chunk_size: Optional[int] = None) -> int:
+        """
+        分批完成尚未結束的資料回填 (可中斷，下次會從上次進度繼續)
+        
+        Args:
+            progress: 進度回呼 progress(說明, 已完成筆數, 總筆數)
+            chunk_size: 每批筆數
+        
+        Returns:
+            int: 本次回填處理的資料列數
+        """
+        try:
+            return run_backfills(self.get_connection(), progress, chunk_size)
+        except sqlite3.Error as e:
+            logger.error("資料回填失敗: %s", e)
+            return 0
+    
+    def _fts_ready(self, conn: sqlite3.Connection) -> bool:
+        """全文索引是否已以目前的分詞器建立"""
+        if self.fts_tokenizer is None:
+            return False
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'books_fts'").fetchone()
+        return row is not None and f"tokenize='{FTS_TOKENIZERS[self.fts_tokenizer]}'" in row[0]
+    
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        """
+        建立 books_fts 全文索引與同步觸發器
+        
+        索引首次建立 (或分詞器變更) 時會由現有資料重建，作為既有資料庫的遷移。
+        
+        Args:
+            conn: 資料庫連線 (須已在交易中)
+        
+        Returns:
+            bool: 全文索引是否可用 (不可用時搜尋改用 LIKE)
+        """
+        if self.fts_tokenizer is None:
+            return False
+        if self._fts_ready(conn):
+            return True
+        
+        tokenize = FTS_TOKENIZERS[self.fts_tokenizer]
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'books_fts'").fetchone()
+        
+        try:
+            if row is not None:
+                conn.execute("DROP TABLE books_fts")
+            conn.execute(f'''
+                CREATE VIRTUAL TABLE books_fts USING fts5(
+                    title, author,
+                    content='books', content_rowid='id',
+                    tokenize='{tokenize}'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning("全文索引無法使用，搜尋將改用 LIKE: %s", e)
+            return False
+        
+        for trigger in FTS_TRIGGERS:
+            conn.execute(trigger)
+        conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+        logger.info("已建立全文搜尋索引")
+        return True
+    
+    @instrumented
+    def rebuild_search_index(self) -> bool:
+        """
+        由 books 表格重建全文索引
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        if not self.fts_enabled:
+            return False
+        try:
+            with self.transaction() as conn:
+                conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.Error as e:
+            logger.error("重建全文索引失敗: %s", e)
+            return False
+    
+    def _fts_query(self, keyword: str) -> Optional[str]:
+        """將關鍵字轉為 FTS5 查詢字串；無法使用全文索引時回傳 None"""
+        if not self.fts_enabled or not keyword.strip():
+            return None
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        if self.fts_tokenizer == "trigram":
+            # trigram 至少需要三個字元，較短的關鍵字改用 LIKE
+            return phrase if len(keyword) >= 3 else None
+        return phrase + "*"
+    
+    def is_substring_search(self, keyword: str) -> bool:
+        """
+        search_books(keyword) 是否為子字串比對 (LIKE 或 trigram 全文索引)
+        
+        子字串比對時，包含 keyword 的較長關鍵字結果必為此結果的子集，可在記憶體中篩選；
+        unicode61 分詞器以詞首比對，不符合這個性質。
+        
+        Args:
+            keyword: 搜尋關鍵字
+        
+        Returns:
+            bool: 是否為子字串比對
+        """
+        return self._fts_query(keyword) is None or self.fts_tokenizer == "trigram"
+    
+    def _execute_chunk(self, conn: sqlite3.Connection, sql: str, rows: List[tuple],
+                       indexes: List[int], report: BatchResult, not_found: Optional[set] = None) -> dict:
+        """
+        以 executemany 執行一個區塊；失敗時回滾到 savepoint 後逐筆重試以找出錯誤資料
+        
+        Args:
+            conn: 資料庫連線 (須已在交易中)
+            sql: 參數化 SQL 敘述
+            rows: 參數列
+            indexes: 每一參數列對應的輸入索引
+            report: 批次結果
+            not_found: 不存在於資料庫中的輸入索引 (更新/刪除使用)
+        
+        Returns:
+            dict: 成功資料的 {輸入索引: rowid} (僅新增時有意義)
+        """
+        if not_found:
+            pairs = [(row, index) for row, index in zip(rows, indexes) if index not in not_found]
+            for index in indexes:
+                if index in not_found:
+                    report.add_error(index, "找不到指定的書籍")
+            rows = [row for row, _ in pairs]
+            indexes = [index for _, index in pairs]
+        if not rows:
+            return {}
+        
+        conn.execute("SAVEPOINT bulk_chunk")
+        try:
+            conn.executemany(sql, rows)
+            # 交易持有寫入鎖，AUTOINCREMENT 在同一敘述內配發的是連續ID
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.execute("RELEASE bulk_chunk")
+            report.succeeded.extend(indexes)
+            first_id = last_id - len(rows) + 1
+            return {index: first_id + offset for offset, index in enumerate(indexes)}
+        except sqlite3.Error:
+            conn.execute("ROLLBACK TO bulk_chunk")
+            conn.execute("RELEASE bulk_chunk")
+        
+        row_ids = {}
+        for row, index in zip(rows, indexes):
+            try:
+                row_ids[index] = conn.execute(sql, row).lastrowid
+                report.add_success(index)
+            except sqlite3.Error as e:
+                report.add_error(index, str(e))
+        return row_ids
+    
+    def _missing_ids(self, conn: sqlite3.Connection, ids: List[int]) -> set:
+        """回傳 ids 中不存在於 books 表格的ID"""
+        cursor = conn.execute(SQL_EXISTING_IDS, (json.dumps(ids),))
+        return set(ids) - {row[0] for row in cursor}
+    
+    def _reserve_ids(self, conn: sqlite3.Connection, count: int) -> int:
+        """在目前交易中由 sqlite_sequence 保留連續 count 個ID，回傳第一個ID"""
+        if conn.execute(SQL_RESERVE_IDS, (count,)).rowcount == 0:
+            conn.execute(SQL_INIT_SEQUENCE, (count,))
+        return conn.execute(SQL_SEQUENCE).fetchone()[0] - count + 1
+    
+    def reserve_id_block(self, count: int) -> range:
+        """
+        保留一段連續的書籍ID (供批次載入器預先配發ID)
+        
+        保留後的ID不會再被 AUTOINCREMENT 或其他寫入者使用，
+        可在之後以明確ID新增，多個行程同時保留也不會衝突。
+        
+        Args:
+            count: 要保留的ID數量
+        
+        Returns:
+            range: 保留的ID範圍
+        """
+        if count <= 0:
+            return range(0)
+        with self.transaction() as conn:
+            first_id = self._reserve_ids(conn, count)
+        return range(first_id, first_id + count)
+    
+    def _skip_duplicates(self, conn: sqlite3.Connection, valid: List[Tuple[int, Book]],
+                         report: BatchResult) -> List[Tuple[int, Book]]:
+        """移除書名、作者、年份與資料庫或同一區塊中相同的書籍 (記為略過)"""
+        titles = list({book.title for _, book in valid})
+        seen = set(conn.execute(SQL_EXISTING_KEYS, (json.dumps(titles),)).fetchall())
+        unique = []
+        for index, book in valid:
+            key = (book.title, book.author, book.year)
+            if key in seen:
+                report.add_skipped(index)
+            else:
+                seen.add(key)
+                unique.append((index, book))
+        return unique
+    
+    @instrumented
+    def add_books(self, books: Iterable[Book], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  reserve_ids: bool = False, skip_duplicates: bool = False,
+                  validated: bool = False) -> BatchResult:
+        """
+        批次新增書籍 (單一交易，按區塊 executemany)
+        
+        較大的區塊會先停用逐筆的全文索引觸發器，寫入後以一個敘述為整個區塊建立索引，
+        觸發器在同一交易中還原，其他連線不會看到停用的狀態。
+        
+        Args:
+            books: 書籍物件 (可為串流)
+            chunk_size: 每個 executemany 區塊的筆數
+            reserve_ids: 是否在寫入前為每個區塊保留ID區段並以明確ID新增
+            skip_duplicates: 是否略過書名、作者、年份皆相同的既有書籍
+            validated: 書籍是否已通過驗證 (True 時不再重複驗證)
+        
+        Returns:
+            BatchResult: 每一筆資料的成功/錯誤/略過報告 (成功者會設定 book.id)
+        """
+        report = BatchResult()
+        try:
+            with self.transaction() as conn:
+                for chunk in _chunked(enumerate(books), chunk_size):
+                    report.total += len(chunk)
+                    valid = _validate_chunk(chunk, report, validated)
+                    if valid and skip_duplicates:
+                        valid = self._skip_duplicates(conn, valid, report)
+                    if not valid:
+                        continue
+                    
+                    defer_fts = self.fts_enabled and len(valid) >= FTS_BULK_MIN_ROWS
+                    if defer_fts:
+                        conn.execute("DROP TRIGGER IF EXISTS books_fts_ai")
+                    
+                    indexes = [index for index, _ in valid]
+                    if reserve_ids:
+                        first_id = self._reserve_ids(conn, len(valid))
+                        rows = [(first_id + offset, book.title, book.author, book.year, book.status, book.rating)
+                                for offset, (_, book) in enumerate(valid)]
+                        row_ids = self._execute_chunk(conn, SQL_INSERT_WITH_ID, rows, indexes, report)
+                    else:
+                        rows = [(book.title, book.author, book.year, book.status, book.rating)
+                                for _, book in valid]
+                        row_ids = self._execute_chunk(conn, SQL_INSERT, rows, indexes, report)
+                    
+                    if defer_fts:
+                        conn.execute(SQL_FTS_INDEX_IDS, (json.dumps(list(row_ids.values())),))
+                        conn.execute(FTS_TRIGGERS[0])
+                    
+                    for index, book in valid:
+                        if index in row_ids:
+                            book.id = row_ids[index]
+            
+            logger.info("批次新增書籍: %s", report)
+            self._notify_reset(report)
+        except sqlite3.Error as e:
+            report.fail_all(str(e))
+            logger.error("批次新增書籍失敗: %s", e)
+        return report
+    
+    @instrumented
+    def update_books(self, books: Iterable[Book], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     validated: bool = False) -> BatchResult:
+        """
+        批次更新書籍 (單一交易，按區塊 executemany)
+        
+        Args:
+            books: 書籍物件 (須包含ID)
+            chunk_size: 每個 executemany 區塊的筆數
+            validated: 書籍是否已通過驗證 (True 時不再重複驗證)
+        
+        Returns:
+            BatchResult: 每一筆資料的成功/錯誤報告
+        """
+        report = BatchResult()
+        try:
+            with self.transaction() as conn:
+                for chunk in _chunked(enumerate(books), chunk_size):
+                    report.total += len(chunk)
+                    rows, indexes, ids = [], [], []
+                    for index, book in _validate_chunk(chunk, report, validated):
+                        if book.id is None:
+                            report.add_error(index, "書籍ID不能為空")
+                            continue
+                        rows.append((book.title, book.author, book.year, book.status, book.rating, book.id))
+                        indexes.append(index)
+                        ids.append(book.id)
+                    
+                    missing = self._missing_ids(conn, ids) if ids else set()
+                    not_found = {index for index, book_id in zip(indexes, ids) if book_id in missing}
+                    self._execute_chunk(conn, SQL_UPDATE, rows, indexes, report, not_found)
+            
+            logger.info("批次更新書籍: %s", report)
+            self._notify_reset(report)
+        except sqlite3.Error as e:
+            report.fail_all(str(e))
+            logger.error("批次更新書籍失敗: %s", e)
+        return report
+    
+    @instrumented
+    def upsert_books(self, books: Iterable[Book], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     validated: bool = False) -> BatchResult:
+        """
+        批次新增或更新書籍 (單一交易，按區塊 executemany)
+        
+        有ID的書籍以 INSERT ... ON CONFLICT (id) DO UPDATE 寫入：ID已存在則更新 (內容相同時不寫入)，否則以該ID新增；
+        沒有ID的書籍直接新增並由資料庫配發ID。
+        
+        Args:
+            books: 書籍物件 (可為串流)
+            chunk_size: 每個 executemany 區塊的筆數
+            validated: 書籍是否已通過驗證 (True 時不再重複驗證)
+        
+        Returns:
+            BatchResult: 每一筆資料的成功/錯誤報告 (新增者會設定 book.id)
+        """
+        report = BatchResult()
+        try:
+            with self.transaction() as conn:
+                for chunk in _chunked(enumerate(books), chunk_size):
+                    report.total += len(chunk)
+                    with_id, without_id = [], []
+                    for index, book in _validate_chunk(chunk, report, validated):
+                        if book.id is None:
+                            without_id.append((index, book))
+                        else:
+                            with_id.append((index, book))
+                    
+                    if with_id:
+                        rows = [(book.id, book.title, book.author, book.year, book.status, book.rating)
+                                for _, book in with_id]
+                        self._execute_chunk(conn, SQL_UPSERT, rows, [index for index, _ in with_id], report)
+                    if without_id:
+                        rows = [(book.title, book.author, book.year, book.status, book.rating)
+                                for _, book in without_id]
+                        row_ids = self._execute_chunk(conn, SQL_INSERT, rows,
+                                                      [index for index, _ in without_id], report)
+                        for index, book in without_id:
+                            if index in row_ids:
+                                book.id = row_ids[index]
+            
+            logger.info("批次新增或更新書籍: %s", report)
+            self._notify_reset(report)
+        except sqlite3.Error as e:
+            report.fail_all(str(e))
+            logger.error("批次新增或更新書籍失敗: %s", e)
+        return report
+    
+    @instrumented
+    def delete_books(self, book_ids: Iterable[int], chunk_size: int = DEFAULT_CHUNK_SIZE) -> BatchResult:
+        """
+        批次刪除書籍 (單一交易，按區塊 executemany)
+        
+        同一個ID重複出現時只有第一筆成功，其餘記為找不到指定的書籍。
+        
+        Args:
+            book_ids: 書籍ID
+            chunk_size: 每個 executemany 區塊的筆數
+        
+        Returns:
+            BatchResult: 每一筆資料的成功/錯誤報告
+        """
+        report = BatchResult()
+        try:
+            with self.transaction() as conn:
+                for chunk in _chunked(enumerate(book_ids), chunk_size):
+                    report.total += len(chunk)
+                    indexes = [index for index, _ in chunk]
+                    ids = [book_id for _, book_id in chunk]
+                    
+                    # 區塊內重複的ID在第一筆刪除後已不存在 (與跨區塊的重複ID一致)
+                    missing = self._missing_ids(conn, ids)
+                    not_found, seen = set(), set()
+                    for index, book_id in chunk:
+                        if book_id in missing or book_id in seen:
+                            not_found.add(index)
+                        seen.add(book_id)
+                    self._execute_chunk(conn, SQL_DELETE, [(book_id,) for book_id in ids],
+                                        indexes, report, not_found)
+            
+            logger.info("批次刪除書籍: %s", report)
+            self._notify_reset(report)
+        except sqlite3.Error as e:
+            report.fail_all(str(e))
+            logger.error("批次刪除書籍失敗: %s", e)
+        return report
+    
     def get_next_id(self) -> int:
         """
         獲取下一個可用的ID (現有最大ID + 1)
         
+        僅供顯示參考；新增書籍時的ID由資料庫於 INSERT 時配發。
+        
         Returns:
             int: 下一個可用的ID
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT MAX(id) FROM books')
-                result = cursor.fetchone()
-                max_id = result[0] if result[0] is not None else 0
-                return max_id + 1
+            cursor = self.get_connection().cursor()
+            cursor.execute(SQL_MAX_ID)
+            result = cursor.fetchone()
+            max_id = result[0] if result[0] is not None else 0
+            return max_id + 1
         except sqlite3.Error as e:
-            print(f"獲取最大ID失敗: {e}")
+            logger.error("獲取最大ID失敗: %s", e)
             return 1
     
-    def add_book(self, book: Book) -> bool:
+    @instrumented
+    def add_book(self, book: Book, validated: bool = False) -> bool:
         """
         新增書籍到資料庫
         
         Args:
             book: 書籍物件
-            
+            validated: 書籍是否已通過驗證 (例如表單已驗證過，True 時不再重複驗證)
+        
         Returns:
             bool: 操作是否成功
         """
         try:
             # 驗證書籍資料
-            is_valid, error_msg = book.validate()
-            if not is_valid:
-                raise ValueError(error_msg)
+            if not validated:
+                is_valid, error_msg = book.validate()
+                if not is_valid:
+                    raise ValueError(error_msg)
             
-            # 獲取下一個可用的ID
-            next_id = self.get_next_id()
+            # ID 由 AUTOINCREMENT 於新增時配發，不需先查詢最大ID
+            cursor = self.get_connection().cursor()
+            cursor.execute(SQL_INSERT, (book.title, book.author, book.year, book.status, book.rating))
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO books (id, title, author, year, status, rating)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (next_id, book.title, book.author, book.year, book.status, book.rating))
-                
-                book.id = next_id
-                conn.commit()
-                print(f"成功新增書籍: {book.title} (ID: {next_id})")
-                return True
-                
+            book.id = cursor.lastrowid
+            logger.debug("成功新增書籍: %s (ID: %s)", book.title, book.id)
+            if self._listeners:
+                self._notify([BookChange(BookChange.INSERTED, book)])
+            return True
+        
         except (sqlite3.Error, ValueError) as e:
-            print(f"新增書籍失敗: {e}")
+            logger.error("新增書籍失敗: %s", e)
             return False
     
-    def update_book(self, book: Book) -> bool:
+    @instrumented
+    def update_book(self, book: Book, validated: bool = False) -> bool:
         """
         更新書籍資訊
         
         Args:
             book: 書籍物件
-            
+            validated: 書籍是否已通過驗證 (例如表單已驗證過，True 時不再重複驗證)
+        
         Returns:
             bool: 操作是否成功
         """
         try:
             # 驗證書籍資料
-            is_valid, error_msg = book.validate()
-            if not is_valid:
-                raise ValueError(error_msg)
+            if not validated:
+                is_valid, error_msg = book.validate()
+                if not is_valid:
+                    raise ValueError(error_msg)
             
             if book.id is None:
                 raise ValueError("書籍ID不能為空")
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE books 
-                    SET title=?, author=?, year=?, status=?, rating=?
-                    WHERE id=?
-                ''', (book.title, book.author, book.year, book.status, book.rating, book.id))
+                # 有訂閱者時在同一交易中先讀取修改前的資料 (事件需要原本的閱讀狀態)
+                old_book = None
+                if self._listeners:
+                    cursor.execute(SQL_SELECT_BY_ID, (book.id,))
+                    row = cursor.fetchone()
+                    old_book = Book.from_row(row) if row else None
+                cursor.execute(SQL_UPDATE,
+                               (book.title, book.author, book.year, book.status, book.rating, book.id))
                 
                 if cursor.rowcount == 0:
                     raise ValueError("找不到指定的書籍")
-                
-                conn.commit()
-                print(f"成功更新書籍: {book.title}")
-                return True
-                
+            
+            logger.debug("成功更新書籍: %s", book.title)
+            if self._listeners:
+                self._notify([BookChange(BookChange.UPDATED, book, old_book)])
+            return True
+        
         except (sqlite3.Error, ValueError) as e:
-            print(f"更新書籍失敗: {e}")
+            logger.error("更新書籍失敗: %s", e)
             return False
     
+    @instrumented
     def delete_book(self, book_id: int) -> bool:
         """
         刪除書籍
         
         Args:
             book_id: 書籍ID
-            
+        
         Returns:
             bool: 操作是否成功
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM books WHERE id=?', (book_id,))
+            with self.transaction() as conn:
+                # RETURNING 取得被刪除的資料 (事件需要原本的閱讀狀態)
+                row = conn.execute(SQL_DELETE_RETURNING, (book_id,)).fetchone()
                 
-                if cursor.rowcount == 0:
+                if row is None:
                     raise ValueError("找不到指定的書籍")
-                
-                conn.commit()
-                print(f"成功刪除書籍 ID: {book_id}")
-                return True
-                
+            
+            logger.debug("成功刪除書籍 ID: %s", book_id)
+            if self._listeners:
+                self._notify([BookChange(BookChange.DELETED, old_book=Book.from_row(row))])
+            return True
+        
         except (sqlite3.Error, ValueError) as e:
-            print(f"刪除書籍失敗: {e}")
+            logger.error("刪除書籍失敗: %s", e)
             return False
     
-    def get_all_books(self) -> List[Book]:
+    def get_data_version(self) -> int:
+        """
+        獲取目前執行緒連線的 PRAGMA data_version
+        
+        其他連線 (包含其他行程) 提交寫入後數值會改變，同一條連線自己的寫入不會；
+        不需讀取任何資料表，適合用來頻繁輪詢。
+        
+        Returns:
+            int: 資料版本
+        """
+        return self.get_connection().execute("PRAGMA data_version").fetchone()[0]
+    
+    def get_change_version(self) -> int:
+        """
+        獲取異動紀錄的最新序號 (高水位)
+        
+        Returns:
+            int: 最新序號 (尚無任何異動時為 0)
+        """
+        try:
+            row = self.get_connection().execute(SQL_CHANGE_VERSION).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            logger.error("獲取異動序號失敗: %s", e)
+            return 0
+    
+    @instrumented
+    def get_changes_since(self, seq: int, limit: int = CHANGE_FEED_MAX_ROWS) -> Tuple[int, List[BookChange]]:
+        """
+        獲取某個序號之後的書籍異動 (同一本書的多次異動合併為一個事件)
+        
+        新增/修改的事件附帶目前的書籍資料；異動筆數超過 limit、或所需的紀錄已被清除時，
+        只回傳一個 reset 事件，呼叫端應重新載入。
+        
+        Args:
+            seq: 上次處理到的序號 (get_change_version 或本方法先前回傳的序號)
+            limit: 最多處理的異動紀錄筆數
+        
+        Returns:
+            Tuple[int, List[BookChange]]: (處理到的序號，下次以此呼叫, 異動事件)
+        
+        Raises:
+            sqlite3.Error: 查詢失敗
+        """
+        # 在同一個讀取交易中讀取紀錄與書籍，兩者來自同一個快照 (呼叫端已在 read_snapshot 中時沿用其快照)
+        with self.read_snapshot() as conn:
+            latest_row = conn.execute(SQL_CHANGE_VERSION).fetchone()
+            latest = latest_row[0] if latest_row else 0
+            if seq == latest:
+                return seq, []
+            
+            # 序號大於最新序號 (資料庫被替換) 或中間的紀錄已被清除，無法逐筆同步
+            oldest = conn.execute(SQL_OLDEST_CHANGE).fetchone()[0]
+            if seq > latest or oldest is None or seq < oldest - 1:
+                return latest, [BookChange(BookChange.RESET)]
+            
+            rows = conn.execute(SQL_CHANGES_SINCE, (seq, limit + 1)).fetchall()
+            if len(rows) > limit:
+                return latest, [BookChange(BookChange.RESET)]
+            
+            # 每本書只需要第一筆紀錄 (異動前的狀態) 與目前的資料
+            first_ops = {}
+            for _, book_id, op, old_status in rows:
+                if book_id not in first_ops:
+                    first_ops[book_id] = (op, old_status)
+            cursor = conn.execute(SQL_SELECT_BY_IDS, (json.dumps(list(first_ops)),))
+            current = {book.id: book for book in _rows_to_books(cursor.fetchall())}
+        
+        changes = []
+        for book_id, (op, old_status) in first_ops.items():
+            book = current.get(book_id)
+            existed = op != 'I'
+            if book is None:
+                if existed:
+                    changes.append(BookChange(BookChange.DELETED, book_id=book_id, old_status=old_status))
+            elif existed:
+                changes.append(BookChange(BookChange.UPDATED, book, old_status=old_status))
+            else:
+                changes.append(BookChange(BookChange.INSERTED, book))
+        return rows[-1][0], changes
+    
+    @instrumented
+    def prune_changes(self, max_age: float = DEFAULT_CHANGE_RETENTION) -> int:
+        """
+        清除過舊的異動紀錄
+        
+        Args:
+            max_age: 保留的秒數
+        
+        Returns:
+            int: 刪除的紀錄筆數
+        """
+        try:
+            with self.transaction() as conn:
+                cursor = conn.execute(SQL_PRUNE_CHANGES, (int(time.time() - max_age),))
+            if cursor.rowcount:
+                logger.info("已清除 %s 筆過舊的異動紀錄", cursor.rowcount)
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error("清除異動紀錄失敗: %s", e)
+            return 0
+    
+    @instrumented
+    def vacuum(self) -> bool:
+        """
+        重整資料庫檔案 (合併全文索引、VACUUM、PRAGMA optimize)
+        
+        VACUUM 會重寫整個檔案，執行期間其他連線無法寫入，適合在離峰時段 (例如排程) 執行。
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            conn = self.get_connection()
+            if self.fts_enabled:
+                conn.execute("INSERT INTO books_fts (books_fts) VALUES ('optimize')")
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA optimize")
+            if self.db_path != ":memory:":
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            logger.info("資料庫重整完成")
+            return True
+        except sqlite3.Error as e:
+            logger.error("資料庫重整失敗: %s", e)
+            return False
+    
+    def _fetch_books(self, cursor: sqlite3.Cursor, sql: str, params: tuple = (),
+                     as_batch: bool = False) -> Union[List[Book], BookBatch]:
+        """執行查詢並將結果轉為書籍物件串列或書籍批次"""
+        if as_batch:
+            cursor.execute(sql, params)
+            batch = BookBatch()
+            while True:
+                rows = cursor.fetchmany(DEFAULT_CHUNK_SIZE)
+                if not rows:
+                    return batch
+                batch.extend_rows(rows)
+        cursor.row_factory = book_row_factory
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    
+    @instrumented
+    def get_all_books(self, as_batch: bool = False) -> Union[List[Book], BookBatch]:
         """
         獲取所有書籍
         
+        Args:
+            as_batch: 是否以欄位陣列的書籍批次回傳 (大量資料時較省記憶體)
+        
         Returns:
-            List[Book]: 書籍列表
+            Union[List[Book], BookBatch]: 書籍列表或書籍批次
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT id, title, author, year, status, rating FROM books ORDER BY id')
-                rows = cursor.fetchall()
-                
-                books = []
-                for row in rows:
-                    book = Book(
-                        title=row[1],
-                        author=row[2],
-                        year=row[3],
-                        status=row[4],
-                        rating=row[5],
-                        book_id=row[0]
-                    )
-                    books.append(book)
-                
-                return books
-                
+            return self._fetch_books(self.get_connection().cursor(), SQL_SELECT_ALL, as_batch=as_batch)
         except sqlite3.Error as e:
-            print(f"獲取書籍列表失敗: {e}")
-            return []
+            logger.error("獲取書籍列表失敗: %s", e)
+            return BookBatch() if as_batch else []
     
-    def search_books(self, keyword: str) -> List[Book]:
+    @instrumented
+    def search_books(self, keyword: str, should_cancel: Optional[Callable[[], bool]] = None,
+                     as_batch: bool = False, limit: Optional[int] = None) -> Union[List[Book], BookBatch]:
         """
         搜尋書籍 (按書名或作者)
         
+        優先使用全文索引並依相關度 (bm25) 排序；全文索引不可用時改用 LIKE。
+        
         Args:
             keyword: 搜尋關鍵字
-            
+            should_cancel: 查詢期間定期呼叫，回傳 True 時中止查詢並回傳空串列
+            as_batch: 是否以欄位陣列的書籍批次回傳
+            limit: 最多回傳的書籍數量 (None 表示全部，在查詢中限制，不會讀取多餘的資料列)
+        
         Returns:
-            List[Book]: 符合條件的書籍列表
+            Union[List[Book], BookBatch]: 符合條件的書籍列表或書籍批次
         """
+        empty = BookBatch() if as_batch else []
+        limit_clause, limit_params = ("LIMIT ?", (limit,)) if limit is not None else ("", ())
+        conn = self.get_connection()
+        if should_cancel is not None:
+            conn.set_progress_handler(lambda: 1 if should_cancel() else 0, SEARCH_CANCEL_CHECK_STEPS)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                search_pattern = f"%{keyword}%"
-                cursor.execute('''
-                    SELECT id, title, author, year, status, rating 
-                    FROM books 
-                    WHERE title LIKE ? OR author LIKE ?
-                    ORDER BY id
-                ''', (search_pattern, search_pattern))
-                rows = cursor.fetchall()
-                
-                books = []
-                for row in rows:
-                    book = Book(
-                        title=row[1],
-                        author=row[2],
-                        year=row[3],
-                        status=row[4],
-                        rating=row[5],
-                        book_id=row[0]
-                    )
-                    books.append(book)
-                
-                return books
-                
+            cursor = conn.cursor()
+            fts_query = self._fts_query(keyword)
+            if fts_query is not None:
+                return self._fetch_books(cursor, SQL_SEARCH_FTS + limit_clause,
+                                         (fts_query,) + limit_params, as_batch)
+            search_pattern = f"%{keyword}%"
+            return self._fetch_books(cursor, SQL_SEARCH_LIKE + limit_clause,
+                                     (search_pattern, search_pattern) + limit_params, as_batch)
+        
+        except sqlite3.OperationalError as e:
+            if should_cancel is not None and should_cancel():
+                return empty
+            logger.error("搜尋書籍失敗: %s", e)
+            return empty
         except sqlite3.Error as e:
-            print(f"搜尋書籍失敗: {e}")
-            return []
+            logger.error("搜尋書籍失敗: %s", e)
+            return empty
+        finally:
+            if should_cancel is not None:
+                conn.set_progress_handler(None, 0)
     
+    @instrumented
     def get_book_by_id(self, book_id: int) -> Optional[Book]:
         """
         根據ID獲取書籍
         
         Args:
             book_id: 書籍ID
-            
+        
         Returns:
             Optional[Book]: 書籍物件或None
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT id, title, author, year, status, rating FROM books WHERE id=?', (book_id,))
-                row = cursor.fetchone()
-                
-                if row:
-                    return Book(
-                        title=row[1],
-                        author=row[2],
-                        year=row[3],
-                        status=row[4],
-                        rating=row[5],
-                        book_id=row[0]
-                    )
-                return None
-                
+            cursor = self.get_connection().cursor()
+            cursor.row_factory = book_row_factory
+            cursor.execute(SQL_SELECT_BY_ID, (book_id,))
+            return cursor.fetchone()
+        
+        except sqlite3.Error as e:
+            logger.error("獲取書籍失敗: %s", e)
+            return None
+    
+    def _page_query(self, after_id: Optional[int], limit: int, order_by: str,
+                    filters: Optional[dict], after_value=None) -> Tuple[str, list]:
+        """組合 keyset 分頁查詢的 SQL 與參數"""
+        clauses, params = _build_filters(order_by, filters)
+        if after_id is not None:
+            if order_by == "id":
+                clauses.append("id > ?")
+                params.append(after_id)
+            elif after_value is not None:
+                # 定序放在右側運算元，SQLite 才能以索引範圍搜尋 (SEARCH) 處理 row value 比較
+                clauses.append(f"({order_by}, id) > (?{_collate(order_by)}, ?)")
+                params.extend((after_value, after_id))
+            else:
+                # 未提供排序值時由游標書籍查詢 (該書已被刪除時查不到，請改傳 after_value)
+                clauses.append(f"({order_by}, id) > ((SELECT {order_by} FROM books WHERE id = ?){_collate(order_by)}, ?)")
+                params.extend((after_id, after_id))
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "id" if order_by == "id" else f"{order_by}{_collate(order_by)}, id"
+        sql = f"SELECT id, title, author, year, status, rating FROM books {where} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        return sql, params
+    
+    def _ids_query(self, order_by: str, filters: Optional[dict]) -> Tuple[str, list]:
+        """組合依排序讀取書籍ID的 SQL 與參數"""
+        clauses, params = _build_filters(order_by, filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "id" if order_by == "id" else f"{order_by}{_collate(order_by)}, id"
+        return f"SELECT id FROM books {where} ORDER BY {order}", params
+    
+    def _cursor_query(self, order_by: str, filters: Optional[dict]) -> Tuple[str, list]:
+        """組合依排序位置讀取 keyset 游標 (ID, 排序值) 的 SQL 與參數 (之後須再加上 OFFSET 參數)"""
+        clauses, params = _build_filters(order_by, filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "id" if order_by == "id" else f"{order_by}{_collate(order_by)}, id"
+        return f"SELECT id, {order_by} FROM books {where} ORDER BY {order} LIMIT 1 OFFSET ?", params
+    
+    def _count_query(self, filters: Optional[dict]) -> Tuple[str, list]:
+        """組合計算符合條件書籍數量的 SQL 與參數"""
+        clauses, params = _build_filters("id", filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return f"SELECT COUNT(*) FROM books {where}", params
+    
+    @instrumented
+    def get_books_page(self, after_id: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       order_by: str = "id", filters: Optional[dict] = None,
+                       after_value=None) -> List[Book]:
+        """
+        以 keyset 分頁方式獲取一頁書籍
+        
+        以上一頁最後一本書的 (排序值, ID) 作為游標，不使用 OFFSET，
+        因此無論翻到第幾頁，查詢成本都只與頁面大小有關。
+        游標包含排序值，上一頁最後一本書在翻頁前被刪除也能繼續分頁。
+        
+        Args:
+            after_id: 上一頁最後一本書的ID (None 表示第一頁)
+            limit: 每頁筆數
+            order_by: 排序欄位 (id/title/author/year/status/rating，相同值再依ID排序)
+            filters: 篩選條件，例如 {"status": "已讀", "min_rating": 4}
+            after_value: 上一頁最後一本書的 order_by 欄位值 (order_by 為 id 時不需要；
+                         None 表示由 after_id 查詢)
+        
+        Returns:
+            List[Book]: 此頁的書籍列表
+        """
+        sql, params = self._page_query(after_id, limit, order_by, filters, after_value)
+        try:
+            cursor = self.get_connection().cursor()
+            cursor.execute(sql, params)
+            return _rows_to_books(cursor.fetchall())
+        except sqlite3.Error as e:
+            logger.error("獲取書籍分頁失敗: %s", e)
+            return []
+    
+    @instrumented
+    def get_page_cursor(self, position: int, order_by: str = "id",
+                        filters: Optional[dict] = None) -> Optional[Tuple[int, object]]:
+        """
+        獲取排序後第 position 本書 (從 0 起算) 的 keyset 游標，供直接跳到任意頁時使用
+        
+        以 OFFSET 走訪排序索引，只讀ID與排序欄位，成本與 position 成正比；
+        連續翻頁請改用上一頁最後一本書作為游標。
+        
+        Args:
+            position: 排序位置
+            order_by: 排序欄位
+            filters: 篩選條件
+        
+        Returns:
+            Optional[Tuple[int, object]]: (ID, 排序值)，可作為 get_books_page 的 after_id 與 after_value；
+                                          超出範圍或查詢失敗時為 None
+        """
+        sql, params = self._cursor_query(order_by, filters)
+        params.append(position)
+        try:
+            row = self.get_connection().execute(sql, params).fetchone()
+            return (row[0], row[1]) if row else None
         except sqlite3.Error as e:
-            print(f"獲取書籍失敗: {e}")
+            logger.error("獲取分頁游標失敗: %s", e)
             return None
+    
+    def iter_books(self, batch_size: int = 1000, order_by: str = "id",
+                   filters: Optional[dict] = None) -> Iterator[Book]:
+        """
+        逐批串流所有書籍 (記憶體用量只與 batch_size 有關)
+        
+        Args:
+            batch_size: 每次查詢的筆數
+            order_by: 排序欄位
+            filters: 篩選條件
+        
+        Yields:
+            Book: 書籍物件
+        """
+        after_id = after_value = None
+        while True:
+            page = self.get_books_page(after_id, batch_size, order_by, filters, after_value)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id, after_value = page[-1].id, getattr(page[-1], order_by)
+    
+    def iter_book_rows(self, batch_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        以單一游標逐批讀取所有書籍的原始資料列 (依ID排序，不建立書籍物件)
+        
+        整個讀取過程是同一個查詢，在 WAL 模式下看到的是一致的快照，
+        其他連線可同時寫入。查詢失敗時會拋出 sqlite3.Error，避免呼叫端誤以為資料已完整讀取。
+        
+        Args:
+            batch_size: 每批的資料列數
+        
+        Yields:
+            List[tuple]: (id, title, author, year, status, rating) 資料列
+        """
+        cursor = self.get_connection().cursor()
+        try:
+            cursor.execute(SQL_SELECT_ALL)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+    
+    @instrumented
+    def get_book_count(self) -> int:
+        """
+        獲取書籍總數 (讀取計數表，不掃描 books 表格)
+        
+        Returns:
+            int: 書籍總數
+        """
+        return sum(self.get_status_counts().values())
+    
+    @instrumented
+    def count_books(self, filters: Optional[dict] = None) -> int:
+        """
+        獲取符合篩選條件的書籍數量
+        
+        沒有篩選條件或只篩選閱讀狀態時讀取計數表；其他條件以 COUNT(*) 走訪對應的索引。
+        
+        Args:
+            filters: 篩選條件 (與 get_books_page 相同)
+        
+        Returns:
+            int: 書籍數量
+        """
+        if not filters:
+            return self.get_book_count()
+        if set(filters) == {"status"}:
+            return self.get_status_counts().get(filters["status"], 0)
+        sql, params = self._count_query(filters)
+        try:
+            return self.get_connection().execute(sql, params).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error("計算書籍數量失敗: %s", e)
+            return 0
+    
+    @instrumented
+    def backup(self, file_path: str, pages: int = 1024,
+               progress: Optional[Callable[[int, int, int], None]] = None):
+        """
+        以 sqlite3 備份 API 將資料庫複製到另一個檔案 (線上進行，完成時為一致的快照)
+        
+        每次複製 pages 個頁面，頁面之間其他連線仍可讀寫；
+        來源在複製期間被其他連線修改時，SQLite 會自動重新複製以維持一致。
+        
+        Args:
+            file_path: 目標資料庫檔案路徑
+            pages: 每一步複製的頁面數
+            progress: 進度回呼 progress(狀態, 剩餘頁數, 總頁數)，在回呼中拋出例外可中止備份
+        
+        Raises:
+            sqlite3.Error: 備份失敗
+        """
+        target = sqlite3.connect(file_path)
+        try:
+            self.get_connection().backup(target, pages=pages, progress=progress)
+        finally:
+            target.close()
+    
+    def iter_book_batches(self, batch_size: int = 1000) -> Iterator[BookBatch]:
+        """
+        逐批讀取所有書籍，每批為一個書籍批次 (依ID排序)
+        
+        Args:
+            batch_size: 每批的書籍數量
+        
+        Yields:
+            BookBatch: 書籍批次
+        """
+        for rows in self.iter_book_rows(batch_size):
+            yield BookBatch.from_rows(rows)
+    
+    @instrumented
+    def get_book_ids(self, order_by: str = "id", filters: Optional[dict] = None) -> array:
+        """
+        依排序獲取所有符合條件的書籍ID (只讀索引，不建立書籍物件)
+        
+        Args:
+            order_by: 排序欄位
+            filters: 篩選條件
+        
+        Returns:
+            array: 書籍ID陣列 (型別碼 'q')
+        """
+        sql, params = self._ids_query(order_by, filters)
+        try:
+            cursor = self.get_connection().cursor()
+            cursor.execute(sql, params)
+            return array('q', (row[0] for row in cursor))
+        except sqlite3.Error as e:
+            logger.error("獲取書籍ID失敗: %s", e)
+            return array('q')
+    
+    @instrumented
+    def get_books_by_ids(self, book_ids: Iterable[int]) -> List[Book]:
+        """
+        依ID批次獲取書籍 (依輸入順序回傳，已不存在的ID會被略過)
+        
+        Args:
+            book_ids: 書籍ID
+        
+        Returns:
+            List[Book]: 書籍列表
+        """
+        book_ids = list(book_ids)
+        if not book_ids:
+            return []
+        try:
+            cursor = self.get_connection().cursor()
+            cursor.execute(SQL_SELECT_BY_IDS, (json.dumps(book_ids),))
+            books = {book.id: book for book in _rows_to_books(cursor.fetchall())}
+            return [books[book_id] for book_id in book_ids if book_id in books]
+        except sqlite3.Error as e:
+            logger.error("批次獲取書籍失敗: %s", e)
+            return []
+    
+    @instrumented
+    def get_status_counts(self) -> dict:
+        """
+        獲取各閱讀狀態的書籍數量 (讀取計數表，不掃描 books 表格)
+        
+        Returns:
+            dict: {閱讀狀態: 數量}
+        """
+        try:
+            cursor = self.get_connection().cursor()
+            cursor.execute(SQL_STATUS_COUNTS)
+            return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            logger.error("獲取狀態統計失敗: %s", e)
+            return {}
+    
+    @instrumented
+    def get_statistics(self) -> dict:
+        """
+        獲取收藏統計 (狀態數量、評分分布、各年份數量、平均評分)
+        
+        Returns:
+            dict: 統計資料，包含 total、status_counts、rating_histogram、
+                  year_counts、average_rating (僅計算已評分的書籍)
+        """
+        try:
+            cursor = self.get_connection().cursor()
+            status_counts = self.get_status_counts()
+            
+            cursor.execute(SQL_RATING_HISTOGRAM)
+            rating_histogram = {rating: 0 for rating in range(6)}
+            rating_histogram.update(cursor.fetchall())
+            
+            cursor.execute(SQL_YEAR_COUNTS)
+            year_counts = dict(cursor.fetchall())
+            
+            cursor.execute(SQL_AVERAGE_RATING)
+            average_rating = cursor.fetchone()[0]
+            
+            return {
+                'total': sum(status_counts.values()),
+                'status_counts': status_counts,
+                'rating_histogram': rating_histogram,
+                'year_counts': year_counts,
+                'average_rating': round(average_rating, 2) if average_rating is not None else 0.0
+            }
+        except sqlite3.Error as e:
+            logger.error("獲取統計資訊失敗: %s", e)
+            return {
+                'total': 0,
+                'status_counts': {},
+                'rating_histogram': {},
+                'year_counts': {},
+                'average_rating': 0.0
+            }
+    
+    def _query_catalog(self) -> List[Tuple[str, str, tuple, bool]]:
+        """
+        列出此管理器會執行的查詢，供查詢計畫診斷使用
+        
+        Returns:
+            List[Tuple[str, str, tuple, bool]]: (名稱, SQL, 範例參數, 是否允許全表掃描)
+        """
+        catalog = [
+            ("get_book_by_id", SQL_SELECT_BY_ID, (1,), False),
+            ("get_books_by_ids", SQL_SELECT_BY_IDS, ("[1, 2]",), False),
+            ("update_book", SQL_UPDATE, ("", "", 0, "", 0, 1), False),
+            ("delete_book", SQL_DELETE_RETURNING, (1,), False),
+            ("get_changes_since", SQL_CHANGES_SINCE, (0, CHANGE_FEED_MAX_ROWS + 1), False),
+            ("get_all_books", SQL_SELECT_ALL, (), True),
+            ("search_books (LIKE)", SQL_SEARCH_LIKE, ("%a%", "%a%"), True),
+            ("get_status_counts", SQL_STATUS_COUNTS, (), True),
+            ("get_statistics (rating)", SQL_RATING_HISTOGRAM, (), False),
+            ("get_statistics (year)", SQL_YEAR_COUNTS, (), False),
+            ("get_statistics (average)", SQL_AVERAGE_RATING, (), False),
+        ]
+        if self.fts_enabled:
+            catalog.append(("search_books (FTS)", SQL_SEARCH_FTS, ('"abc"',), False))
+        
+        for order_by in PAGE_ORDER_COLUMNS:
+            sql, params = self._page_query(1, DEFAULT_PAGE_SIZE, order_by, None)
+            catalog.append((f"get_books_page (order_by={order_by})", sql, tuple(params), False))
+            sql, params = self._ids_query(order_by, None)
+            catalog.append((f"get_book_ids (order_by={order_by})", sql, tuple(params), True))
+            # OFFSET 依排序走訪索引 (依ID排序時走訪表格)，成本與位置成正比
+            sql, params = self._cursor_query(order_by, None)
+            catalog.append((f"get_page_cursor (order_by={order_by})", sql, tuple(params) + (DEFAULT_PAGE_SIZE,), True))
+        
+        samples = {"status": "已讀", "author": "a", "year": 2000, "min_year": 2000,
+                   "max_year": 2000, "min_rating": 3, "max_rating": 3}
+        for key, value in samples.items():
+            sql, params = self._page_query(1, DEFAULT_PAGE_SIZE, "id", {key: value})
+            catalog.append((f"get_books_page (filter={key})", sql, tuple(params), False))
+            sql, params = self._count_query({key: value})
+            catalog.append((f"count_books (filter={key})", sql, tuple(params), False))
+        return catalog
+    
+    def explain_queries(self) -> List[dict]:
+        """
+        對每個查詢執行 EXPLAIN QUERY PLAN 並標記全表掃描
+        
+        Returns:
+            List[dict]: 每個查詢的 name、sql、plan (步驟說明)、full_scan
+                        (是否掃描整個資料表)、temp_sort (是否需要暫存排序)、
+                        unexpected (非預期的全表掃描)
+        """
+        conn = self.get_connection()
+        report = []
+        for name, sql, params, allow_scan in self._query_catalog():
+            try:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            except sqlite3.Error as e:
+                plan = [f"ERROR: {e}"]
+            
+            # "SCAN books" 為全表掃描；使用索引或虛擬表格的 SCAN 不算
+            full_scan = any(detail.startswith("SCAN ") and "USING" not in detail
+                            and "VIRTUAL TABLE" not in detail for detail in plan)
+            report.append({
+                'name': name,
+                'sql': " ".join(sql.split()),
+                'plan': plan,
+                'full_scan': full_scan,
+                'temp_sort': any("TEMP B-TREE" in detail for detail in plan),
+                'unexpected': full_scan and not allow_scan
+            })
+        return report
+    
+    def find_unexpected_scans(self) -> List[str]:
+        """
+        找出應使用索引卻執行全表掃描的查詢 (可用於檢查效能退化)
+        
+        Returns:
+            List[str]: 有問題的查詢名稱
+        """
+        return [entry['name'] for entry in self.explain_queries() if entry['unexpected']]
@@ -1,10 +1,16 @@
 """
 對話框模組
-包含 BookFormDialog 類別，用於新增和編輯書籍的表單界面
+包含 BookFormDialog 類別 (新增和編輯書籍的表單界面)、DiagnosticsDialog 類別 (診斷資訊)
+與 LibrarySetDialog 類別 (多館瀏覽)
 """
 
 import wx
-from models import Book
+import wx.grid
+from async_db import AsyncDatabase
+from book_sources import LibraryBookSource
+from grid_table import LibraryGridTable
+from library_set import RELEVANCE
+from models import Book, STATUS_CHOICES
 
 
 class BookFormDialog(wx.Dialog):
@@ -38,8 +44,7 @@ class BookFormDialog(wx.Dialog):
         self.year_text = wx.TextCtrl(self)
         
         # 閱讀狀態選擇
-        status_choices = ["未讀", "閱讀中", "已讀"]
-        self.status_choice = wx.Choice(self, choices=status_choices)
+        self.status_choice = wx.Choice(self, choices=list(STATUS_CHOICES))
         self.status_choice.SetSelection(0)
         
         # 評分選擇
@@ -118,8 +123,7 @@ class BookFormDialog(wx.Dialog):
                 return
             
             # 獲取狀態和評分
-            status_choices = ["未讀", "閱讀中", "已讀"]
-            status = status_choices[self.status_choice.GetSelection()]
+            status = STATUS_CHOICES[self.status_choice.GetSelection()]
             rating = self.rating_choice.GetSelection()
             
             # 創建書籍物件
@@ -143,3 +147,249 @@ class BookFormDialog(wx.Dialog):
     def get_book(self):
         """獲取書籍物件"""
         return self.book
+
+
+class DiagnosticsDialog(wx.Dialog):
+    """診斷資訊對話框 - 顯示資料庫方法的呼叫統計、慢查詢、快取統計與啟動耗時"""
+    
+    def __init__(self, parent, db_manager, profile=None):
+        """
+        初始化診斷資訊對話框
+        
+        Args:
+            parent: 父視窗
+            db_manager: 資料庫管理器 (DatabaseManager 或 CachedDatabaseManager)
+            profile: 啟動計時 (StartupProfile，None 表示不顯示)
+        """
+        super().__init__(parent, title="診斷資訊", size=(900, 600),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        
+        self.db_manager = db_manager
+        self.profile = profile
+        
+        self.init_ui()
+        self.setup_layout()
+        self.refresh()
+    
+    def init_ui(self):
+        """初始化UI元件"""
+        # 報表使用等寬字型，欄位才能對齊
+        self.report_text = wx.TextCtrl(self, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.HSCROLL)
+        self.report_text.SetFont(wx.Font(10, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        
+        self.trace_check = wx.CheckBox(self, label="追蹤 SQL (附在慢查詢紀錄中)")
+        self.trace_check.SetValue(self.db_manager.instrumentation.trace_sql)
+        
+        self.refresh_btn = wx.Button(self, label="重新整理")
+        self.reset_btn = wx.Button(self, label="重設統計")
+        self.close_btn = wx.Button(self, wx.ID_CANCEL, "關閉")
+        
+        # 綁定事件
+        self.trace_check.Bind(wx.EVT_CHECKBOX, self.on_trace)
+        self.refresh_btn.Bind(wx.EVT_BUTTON, lambda event: self.refresh())
+        self.reset_btn.Bind(wx.EVT_BUTTON, self.on_reset)
+    
+    def setup_layout(self):
+        """設置佈局"""
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        btn_sizer.Add(self.trace_check, 0, wx.ALIGN_CENTER_VERTICAL)
+        btn_sizer.AddStretchSpacer()
+        btn_sizer.Add(self.refresh_btn, 0, wx.RIGHT, 10)
+        btn_sizer.Add(self.reset_btn, 0, wx.RIGHT, 10)
+        btn_sizer.Add(self.close_btn, 0)
+        
+        main_sizer.Add(self.report_text, 1, wx.ALL | wx.EXPAND, 10)
+        main_sizer.Add(btn_sizer, 0, wx.ALL | wx.EXPAND, 10)
+        
+        self.SetSizer(main_sizer)
+    
+    def build_report(self):
+        """組合報表文字"""
+        sections = ["[資料庫]", self.db_manager.instrumentation.format_report()]
+        
+        get_cache_stats = getattr(self.db_manager, "get_cache_stats", None)
+        if get_cache_stats is not None:
+            stats = get_cache_stats()
+            sections.append("")
+            sections.append("[快取]")
+            for name, label in (("books", "書籍"), ("queries", "查詢")):
+                item = stats[name]
+                sections.append(f"{label}: 命中 {item['hits']}，未命中 {item['misses']}，"
+                                f"命中率 {item['hit_rate']:.1%}，淘汰 {item['evictions']}，"
+                                f"失效 {item['invalidations']}，目前 {item['entries']} 筆")
+            sections.append(f"估計記憶體: {stats['bytes'] / 1024:.0f} KiB")
+        
+        if self.profile is not None and self.profile.phases:
+            sections.append("")
+            sections.append(self.profile.report())
+        return "\n".join(sections)
+    
+    def refresh(self):
+        """重新讀取統計"""
+        self.report_text.SetValue(self.build_report())
+    
+    def on_trace(self, event):
+        """切換 SQL 追蹤"""
+        self.db_manager.set_sql_trace(self.trace_check.GetValue())
+    
+    def on_reset(self, event):
+        """清除資料庫方法的呼叫統計與慢查詢紀錄"""
+        self.db_manager.instrumentation.reset()
+        self.refresh()
+
+
+class LibrarySetDialog(wx.Dialog):
+    """多館瀏覽對話框 - 瀏覽與搜尋多個資料庫檔案的合併結果 (唯讀)"""
+    
+    PAGE_SIZE = 200
+    # 相關度只適用於搜尋，瀏覽時改依書名排序
+    ORDER_CHOICES = [("書名", "title"), ("作者", "author"), ("出版年份", "year"), ("評分", "rating"), ("ID", "id"),
+                     ("相關度 (搜尋)", RELEVANCE)]
+    
+    def __init__(self, parent, library_set):
+        """
+        初始化多館瀏覽對話框
+        
+        Args:
+            parent: 父視窗
+            library_set: 已開啟的多館藏 (由對話框的 shutdown 關閉)
+        """
+        super().__init__(parent, title="多館瀏覽", size=(1000, 650),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        
+        self.library_set = library_set
+        # 查詢在背景執行緒執行 (各館再由 LibrarySet 的執行緒池平行處理)，只顯示最新一次的結果
+        self.async_db = AsyncDatabase(self.library_set, readers=1, dispatcher=wx.CallAfter)
+        self._generation = 0
+        self.cursors = [None]  # 目前與之前各頁開始時的游標 (上一頁使用)
+        self.next_cursor = None
+        
+        self.init_ui()
+        self.setup_layout()
+        
+        self.async_db.then(self.async_db.read("get_statistics"), self.show_statistics, self.on_query_error)
+        self.load_page()
+    
+    def init_ui(self):
+        """初始化UI元件"""
+        self.stats_label = wx.StaticText(self, label="讀取統計中...")
+        
+        self.search_text = wx.TextCtrl(self, style=wx.TE_PROCESS_ENTER, size=(300, 28))
+        self.search_text.SetHint("輸入書名或作者 (空白表示瀏覽全部)...")
+        self.search_btn = wx.Button(self, label="搜尋")
+        self.order_choice = wx.Choice(self, choices=[label for label, _ in self.ORDER_CHOICES])
+        self.order_choice.SetSelection(0)
+        
+        self.book_grid = wx.grid.Grid(self)
+        self.grid_table = LibraryGridTable(LibraryBookSource([]))
+        self.book_grid.SetTable(self.grid_table, True)
+        self.book_grid.SetRowLabelSize(0)
+        for col, width in enumerate((120, 80, 300, 200, 90, 100, 90)):
+            self.book_grid.SetColSize(col, width)
+        
+        self.prev_btn = wx.Button(self, label="上一頁")
+        self.next_btn = wx.Button(self, label="下一頁")
+        self.page_label = wx.StaticText(self, label="")
+        self.close_btn = wx.Button(self, wx.ID_CANCEL, "關閉")
+        
+        # 綁定事件
+        self.search_btn.Bind(wx.EVT_BUTTON, self.on_search)
+        self.search_text.Bind(wx.EVT_TEXT_ENTER, self.on_search)
+        self.order_choice.Bind(wx.EVT_CHOICE, self.on_search)
+        self.prev_btn.Bind(wx.EVT_BUTTON, self.on_prev_page)
+        self.next_btn.Bind(wx.EVT_BUTTON, self.on_next_page)
+    
+    def setup_layout(self):
+        """設置佈局"""
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        tool_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        tool_sizer.Add(self.search_text, 1, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        tool_sizer.Add(self.search_btn, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 15)
+        tool_sizer.Add(wx.StaticText(self, label="排序:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        tool_sizer.Add(self.order_choice, 0, wx.ALIGN_CENTER_VERTICAL)
+        
+        btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        btn_sizer.Add(self.prev_btn, 0, wx.RIGHT, 10)
+        btn_sizer.Add(self.next_btn, 0, wx.RIGHT, 10)
+        btn_sizer.Add(self.page_label, 0, wx.ALIGN_CENTER_VERTICAL)
+        btn_sizer.AddStretchSpacer()
+        btn_sizer.Add(self.close_btn, 0)
+        
+        main_sizer.Add(self.stats_label, 0, wx.ALL | wx.EXPAND, 10)
+        main_sizer.Add(tool_sizer, 0, wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
+        main_sizer.Add(self.book_grid, 1, wx.ALL | wx.EXPAND, 10)
+        main_sizer.Add(btn_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+        
+        self.SetSizer(main_sizer)
+    
+    def on_query_error(self, error):
+        if self:
+            wx.MessageBox(f"查詢失敗：{error}", "錯誤", wx.OK | wx.ICON_ERROR)
+    
+    @property
+    def order_by(self):
+        return self.ORDER_CHOICES[self.order_choice.GetSelection()][1]
+    
+    def query(self, method, show, *args):
+        """在背景查詢所有館，完成後顯示結果 (略過已被較新查詢取代的結果)"""
+        self._generation += 1
+        generation = self._generation
+        
+        def deliver(result):
+            if self and generation == self._generation:
+                show(result)
+        
+        self.async_db.then(self.async_db.read(method, *args), deliver, self.on_query_error)
+    
+    def load_page(self):
+        """讀取目前游標的一頁合併結果"""
+        order_by = "title" if self.order_by == RELEVANCE else self.order_by
+        self.query("get_books_page", self.show_page, self.cursors[-1], self.PAGE_SIZE, order_by)
+    
+    def show_page(self, result):
+        entries, self.next_cursor = result
+        self.grid_table.set_source(LibraryBookSource(entries))
+        self.prev_btn.Enable(len(self.cursors) > 1)
+        self.next_btn.Enable(self.next_cursor is not None)
+        self.page_label.SetLabel(f"第 {len(self.cursors)} 頁")
+    
+    def show_search_results(self, entries):
+        self.grid_table.set_source(LibraryBookSource(entries))
+        self.prev_btn.Enable(False)
+        self.next_btn.Enable(False)
+        self.page_label.SetLabel(f"找到 {len(entries)} 本書籍")
+    
+    def show_statistics(self, stats):
+        if not self:
+            return
+        libraries = "、".join(f"{name} {count}" for name, count in stats['libraries'].items())
+        self.stats_label.SetLabel(f"共 {len(stats['libraries'])} 館，{stats['total']} 本書籍 "
+                                  f"(平均評分 {stats['average_rating']})：{libraries}")
+        self.Layout()
+    
+    def on_search(self, event):
+        """搜尋或排序改變：有關鍵字時搜尋所有館，否則從第一頁重新瀏覽"""
+        keyword = self.search_text.GetValue().strip()
+        if keyword:
+            self.query("search_books", self.show_search_results, keyword, self.order_by)
+        else:
+            self.cursors = [None]
+            self.load_page()
+    
+    def on_prev_page(self, event):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+            self.load_page()
+    
+    def on_next_page(self, event):
+        if self.next_cursor is not None:
+            self.cursors.append(self.next_cursor)
+            self.load_page()
+    
+    def shutdown(self):
+        """停止背景查詢並關閉所有館的資料庫"""
+        self.async_db.shutdown()
+        self.library_set.close()
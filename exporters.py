@@ -0,0 +1,385 @@
+"""
+匯出模組
+包含 Exporter 基底類別與各格式的匯出器 (CSV、JSON Lines、欄式壓縮格式、SQLite 快照)，
+以固定大小的批次從資料庫游標串流匯出書籍，以及讀取欄式格式的 ColumnarReader 類別
+(不依賴 wx，進度與取消透過回呼和 threading.Event 交給呼叫端)
+
+命令列匯出請使用 cli.py: python cli.py [--db 資料庫] export 輸出檔案 [--format 格式]
+"""
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from typing import Callable, Iterable, Iterator, List, Optional
+from models import Book
+
+logger = logging.getLogger(__name__)
+
+# 匯出檔的欄位標題 (與匯入使用相同的欄位順序)
+CSV_HEADERS = ['ID', '書名', '作者', '出版年份', '閱讀狀態', '評分']
+
+DEFAULT_BATCH_SIZE = 2000
+
+# progress(已匯出筆數, 總筆數)
+ProgressCallback = Callable[[int, int], None]
+
+
+class ExportCancelled(Exception):
+    """匯出已被使用者取消"""
+
+
+class Exporter:
+    """匯出基底類別 - 負責批次讀取、進度回報、取消與暫存檔處理，子類別只需寫入資料列"""
+    
+    # 格式代號、檔案對話框顯示的格式名稱、副檔名與進度單位
+    format = ""
+    name = ""
+    extension = ""
+    unit = "本書籍"
+    
+    def __init__(self, db_manager, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        初始化匯出器
+        
+        Args:
+            db_manager: 資料庫管理器
+            batch_size: 每批從資料庫讀取並寫入的資料列數
+        """
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+    
+    def export(self, file_path: str, progress: Optional[ProgressCallback] = None,
+               cancel_event: Optional[threading.Event] = None) -> int:
+        """
+        匯出所有書籍 (記憶體用量只與 batch_size 有關)
+        
+        資料先寫入暫存檔，完成後才取代目標檔案，因此取消或失敗不會留下不完整的檔案。
+        
+        Args:
+            file_path: 目標檔案路徑
+            progress: 進度回呼 progress(已匯出筆數, 總筆數)，每批呼叫一次
+            cancel_event: 設定後於下一批之前停止匯出
+        
+        Returns:
+            int: 匯出的書籍數量
+        
+        Raises:
+            ExportCancelled: 匯出被取消
+        """
+        total = self.db_manager.get_book_count()
+        temp_path = file_path + ".part"
+        exported = 0
+        try:
+            with self.open(temp_path) as file:
+                self.write_header(file)
+                if progress:
+                    progress(0, total)
+                for rows in self.db_manager.iter_book_rows(self.batch_size):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ExportCancelled()
+                    self.write_rows(file, rows)
+                    exported += len(rows)
+                    if progress:
+                        progress(exported, max(total, exported))
+                self.write_footer(file)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        logger.info("已匯出 %s 本書籍到 %s", exported, file_path)
+        return exported
+    
+    def export_stream(self, file, batches: Optional[Iterable[List[tuple]]] = None) -> int:
+        """
+        匯出到已開啟的檔案 (例如標準輸出)，不使用暫存檔
+        
+        Args:
+            file: 已開啟的檔案 (開啟模式須與 open 相同)
+            batches: 要寫入的 (id, title, author, year, status, rating) 資料列批次，None 表示全部書籍
+        
+        Returns:
+            int: 匯出的書籍數量
+        """
+        if batches is None:
+            batches = self.db_manager.iter_book_rows(self.batch_size)
+        exported = 0
+        self.write_header(file)
+        for rows in batches:
+            self.write_rows(file, rows)
+            exported += len(rows)
+        self.write_footer(file)
+        return exported
+    
+    def open(self, file_path: str):
+        """開啟輸出檔案"""
+        raise NotImplementedError
+    
+    def write_header(self, file):
+        """寫入檔案開頭 (預設不寫入)"""
+    
+    def write_rows(self, file, rows: List[tuple]):
+        """寫入一批 (id, title, author, year, status, rating) 資料列"""
+        raise NotImplementedError
+    
+    def write_footer(self, file):
+        """寫入檔案結尾 (預設不寫入)"""
+
+
+class CsvExporter(Exporter):
+    """CSV 匯出器 - 每批以 writer.writerows 一次寫入"""
+    
+    format = "csv"
+    name = "CSV"
+    extension = "csv"
+    
+    def open(self, file_path: str):
+        return open(file_path, 'w', newline='', encoding='utf-8')
+    
+    def write_header(self, file):
+        csv.writer(file).writerow(CSV_HEADERS)
+    
+    def write_rows(self, file, rows: List[tuple]):
+        csv.writer(file).writerows(rows)
+
+
+class JsonLinesExporter(Exporter):
+    """JSON Lines 匯出器 - 每行一本書籍，內容為 Book.to_dict() 的 JSON"""
+    
+    format = "jsonl"
+    name = "JSON Lines"
+    extension = "jsonl"
+    
+    def open(self, file_path: str):
+        return open(file_path, 'w', encoding='utf-8')
+    
+    def write_rows(self, file, rows: List[tuple]):
+        file.write("".join(
+            json.dumps(Book(row[1], row[2], row[3], row[4], row[5], row[0]).to_dict(), ensure_ascii=False) + "\n"
+            for row in rows
+        ))
+
+
+# 欄式格式：檔頭之後是多個資料列群組 (每批一個)，以筆數 0 的群組結尾。
+# 每個群組依 COLUMNAR_COLUMNS 順序存放各欄位，每欄各自以 zlib 壓縮，前綴壓縮後的長度；
+# 整數欄位為 little-endian 陣列，字串欄位為 UTF-8 位元組長度陣列 ('I') 接著串接的位元組。
+COLUMNAR_MAGIC = b"BKCOL1\n"
+COLUMNAR_COLUMNS = ("id", "title", "author", "year", "status", "rating")
+COLUMNAR_INT_TYPES = {"id": "q", "year": "i", "rating": "b"}
+_UINT32 = struct.Struct("<I")
+
+
+def _pack_ints(typecode: str, values) -> bytes:
+    data = array(typecode, values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _unpack_ints(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack_strings(values) -> bytes:
+    encoded = [(value or "").encode("utf-8") for value in values]
+    return _pack_ints("I", [len(value) for value in encoded]) + b"".join(encoded)
+
+
+def _unpack_strings(data: bytes, count: int) -> List[str]:
+    lengths = _unpack_ints("I", data[:count * 4])
+    values, offset = [], count * 4
+    for length in lengths:
+        values.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    return values
+
+
+class ColumnarExporter(Exporter):
+    """欄式壓縮匯出器 - 每批存成一個資料列群組，每個欄位以陣列存放並壓縮"""
+    
+    format = "columnar"
+    name = "欄式壓縮格式"
+    extension = "bkcol"
+    
+    def open(self, file_path: str):
+        return open(file_path, 'wb')
+    
+    def write_header(self, file):
+        file.write(COLUMNAR_MAGIC)
+    
+    def write_rows(self, file, rows: List[tuple]):
+        columns = list(zip(*rows))
+        parts = [_UINT32.pack(len(rows))]
+        for name, values in zip(COLUMNAR_COLUMNS, columns):
+            if name in COLUMNAR_INT_TYPES:
+                data = _pack_ints(COLUMNAR_INT_TYPES[name], values)
+            else:
+                data = _pack_strings(values)
+            compressed = zlib.compress(data, 6)
+            parts.append(_UINT32.pack(len(compressed)))
+            parts.append(compressed)
+        file.write(b"".join(parts))
+    
+    def write_footer(self, file):
+        file.write(_UINT32.pack(0))
+
+
+class ColumnarReader:
+    """欄式格式讀取器 - 逐一讀取資料列群組，不需載入整個檔案"""
+    
+    def __init__(self, file_path: str):
+        """
+        初始化讀取器
+        
+        Args:
+            file_path: 欄式格式檔案路徑
+        """
+        self.file_path = file_path
+    
+    def __iter__(self) -> Iterator[dict]:
+        """
+        逐一讀取資料列群組
+        
+        Yields:
+            dict: {欄位名稱: 值陣列}，整數欄位為 array，字串欄位為 list
+        
+        Raises:
+            ValueError: 檔案格式錯誤
+        """
+        with open(self.file_path, 'rb') as file:
+            if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+                raise ValueError("不是有效的欄式書籍檔案")
+            while True:
+                count = _UINT32.unpack(self._read(file, _UINT32.size))[0]
+                if count == 0:
+                    return
+                
+                group = {}
+                for name in COLUMNAR_COLUMNS:
+                    size = _UINT32.unpack(self._read(file, _UINT32.size))[0]
+                    try:
+                        data = zlib.decompress(self._read(file, size))
+                    except zlib.error as e:
+                        raise ValueError(f"欄式書籍檔案損毀 ({name} 欄位): {e}") from e
+                    if name in COLUMNAR_INT_TYPES:
+                        values = _unpack_ints(COLUMNAR_INT_TYPES[name], data)
+                    else:
+                        values = _unpack_strings(data, count)
+                    if len(values) != count:
+                        raise ValueError(f"欄式書籍檔案損毀 ({name} 欄位筆數不符)")
+                    group[name] = values
+                yield group
+    
+    @staticmethod
+    def _read(file, size: int) -> bytes:
+        # 讀到的位元組不足表示檔案被截斷
+        data = file.read(size)
+        if len(data) < size:
+            raise ValueError("欄式書籍檔案不完整")
+        return data
+    
+    def iter_books(self) -> Iterator[Book]:
+        """
+        逐一讀取書籍
+        
+        Yields:
+            Book: 書籍物件
+        """
+        for group in self:
+            for book_id, title, author, year, status, rating in zip(*(group[name] for name in COLUMNAR_COLUMNS)):
+                yield Book(title, author, year, status, rating, book_id)
+
+
+class SqliteSnapshotExporter(Exporter):
+    """SQLite 快照匯出器 - 以備份 API 線上複製整個資料庫 (包含索引與統計表)"""
+    
+    format = "sqlite"
+    name = "SQLite 快照"
+    extension = "sqlite"
+    unit = "頁"
+    
+    # 每一步複製的頁面數
+    PAGES_PER_STEP = 256
+    
+    def export(self, file_path: str, progress: Optional[ProgressCallback] = None,
+               cancel_event: Optional[threading.Event] = None) -> int:
+        """
+        建立資料庫快照
+        
+        Args:
+            file_path: 目標檔案路徑
+            progress: 進度回呼 progress(已複製頁數, 總頁數)
+            cancel_event: 設定後於下一步之前停止
+        
+        Returns:
+            int: 快照中的書籍數量
+        
+        Raises:
+            ExportCancelled: 匯出被取消
+        """
+        def step(status, remaining, total):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            if progress:
+                progress(total - remaining, total)
+        
+        temp_path = file_path + ".part"
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.db_manager.backup(temp_path, self.PAGES_PER_STEP, step)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        snapshot = sqlite3.connect(file_path)
+        try:
+            exported = snapshot.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        finally:
+            snapshot.close()
+        logger.info("已建立資料庫快照 %s (%s 本書籍)", file_path, exported)
+        return exported
+
+
+# 可用的匯出格式 {格式代號: 匯出器類別}
+EXPORTERS = {cls.format: cls for cls in (CsvExporter, JsonLinesExporter, ColumnarExporter, SqliteSnapshotExporter)}
+
+
+def get_exporter(format_name: str, db_manager, batch_size: int = DEFAULT_BATCH_SIZE) -> Exporter:
+    """
+    依格式代號建立匯出器
+    
+    Args:
+        format_name: 格式代號 (csv / jsonl / columnar / sqlite)
+        db_manager: 資料庫管理器
+        batch_size: 每批的資料列數
+    
+    Returns:
+        Exporter: 匯出器
+    """
+    if format_name not in EXPORTERS:
+        raise ValueError(f"不支援的匯出格式: {format_name}")
+    return EXPORTERS[format_name](db_manager, batch_size)
+
+
+def format_from_path(file_path: str) -> Optional[str]:
+    """由副檔名判斷匯出格式，無法判斷時回傳 None"""
+    extension = os.path.splitext(file_path)[1].lstrip(".").lower()
+    for cls in EXPORTERS.values():
+        if cls.extension == extension:
+            return cls.format
+    return None
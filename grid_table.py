@@ -0,0 +1,176 @@
+"""
+表格資料模組
+包含 BookGridTable 類別，以虛擬表格 (GridTableBase) 提供主視窗書籍列表的資料；
+LibraryGridTable 類別用於多館藏的合併檢視
+"""
+
+import wx
+import wx.grid
+from book_sources import STATUS_COLUMN, ListBookSource, cell_style, format_cell
+from database import BookChange
+
+
+class BookGridTable(wx.grid.GridTableBase):
+    """虛擬書籍表格 - 只在儲存格需要繪製時才向資料來源取值"""
+    
+    HEADERS = ["ID", "書名", "作者", "年份", "狀態", "評分"]
+    STATUS_COL = STATUS_COLUMN
+    
+    STRIPE_COLOUR = wx.Colour(248, 249, 250)
+    STATUS_COLOURS = {
+        "已讀": wx.Colour(212, 237, 218),
+        "閱讀中": wx.Colour(255, 228, 181),
+        "未讀": wx.Colour(248, 215, 218)
+    }
+    
+    def __init__(self, source=None):
+        """
+        初始化虛擬書籍表格
+        
+        Args:
+            source: 書籍資料來源 (ListBookSource 或 PagedBookSource)
+        """
+        super().__init__()
+        self.source = source if source is not None else ListBookSource([])
+        self.init_attrs()
+    
+    def init_attrs(self):
+        """預先建立共用的儲存格屬性 (交替背景色、對齊方式、狀態顏色)"""
+        self.cell_attrs = {}
+        for stripe in (False, True):
+            for left in (False, True):
+                attr = wx.grid.GridCellAttr()
+                attr.SetReadOnly(True)
+                attr.SetAlignment(wx.ALIGN_LEFT if left else wx.ALIGN_CENTRE, wx.ALIGN_CENTRE)
+                if stripe:
+                    attr.SetBackgroundColour(self.STRIPE_COLOUR)
+                self.cell_attrs[(stripe, left)] = attr
+        
+        self.status_attrs = {}
+        for status, colour in self.STATUS_COLOURS.items():
+            attr = wx.grid.GridCellAttr()
+            attr.SetReadOnly(True)
+            attr.SetAlignment(wx.ALIGN_CENTRE, wx.ALIGN_CENTRE)
+            attr.SetBackgroundColour(colour)
+            self.status_attrs[status] = attr
+    
+    def set_source(self, source):
+        """
+        更換資料來源並通知表格更新列數
+        
+        Args:
+            source: 新的書籍資料來源
+        """
+        old_rows = len(self.source)
+        self.source = source
+        new_rows = len(source)
+        
+        view = self.GetView()
+        if view is None:
+            return
+        
+        view.BeginBatch()
+        if new_rows < old_rows:
+            msg = wx.grid.GridTableMessage(self, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED,
+                                           new_rows, old_rows - new_rows)
+            view.ProcessTableMessage(msg)
+        elif new_rows > old_rows:
+            msg = wx.grid.GridTableMessage(self, wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED,
+                                           new_rows - old_rows)
+            view.ProcessTableMessage(msg)
+        view.EndBatch()
+        view.ForceRefresh()
+    
+    def apply_changes(self, changes):
+        """
+        依書籍異動事件局部更新表格 (只插入、移除或重繪受影響的列)
+        
+        Args:
+            changes: BookChange 串列
+        
+        Returns:
+            bool: 是否已套用 (False 表示資料來源無法局部更新，呼叫端應重新載入)
+        """
+        if not getattr(self.source, "patchable", False):
+            return False
+        if any(change.kind == BookChange.RESET for change in changes):
+            return False
+        
+        applied = True
+        view = self.GetView()
+        if view is not None:
+            view.BeginBatch()
+        for change in changes:
+            # 分頁資料來源只知道已載入頁面的列號，前一個異動可能已讓頁面失效，因此逐一檢查
+            if not self.source.can_patch(change):
+                applied = False
+                break
+            if change.kind == BookChange.DELETED:
+                row = self.source.remove_book(change.book_id)
+                if row is not None and view is not None:
+                    msg = wx.grid.GridTableMessage(self, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, row, 1)
+                    view.ProcessTableMessage(msg)
+            else:
+                row, inserted = self.source.upsert_book(change.book)
+                if inserted and view is not None:
+                    msg = wx.grid.GridTableMessage(self, wx.grid.GRIDTABLE_NOTIFY_ROWS_INSERTED, row, 1)
+                    view.ProcessTableMessage(msg)
+        if view is not None:
+            view.EndBatch()
+            # 只重繪可見範圍，修改過的列會重新向資料來源取值
+            view.ForceRefresh()
+        return applied
+    
+    def get_book(self, row):
+        """獲取指定列的書籍"""
+        return self.source.get_book(row)
+    
+    def get_book_id(self, row):
+        """獲取指定列的書籍ID"""
+        return self.source.get_book_id(row)
+    
+    def GetNumberRows(self):
+        return len(self.source)
+    
+    def GetNumberCols(self):
+        return len(self.HEADERS)
+    
+    def GetColLabelValue(self, col):
+        return self.HEADERS[col]
+    
+    def IsEmptyCell(self, row, col):
+        return False
+    
+    def GetValue(self, row, col):
+        # 頁面在背景載入中時，載入完成後資料來源會通知表格重繪
+        return format_cell(self.source, row, col)
+    
+    def SetValue(self, row, col, value):
+        # 表格為唯讀，修改須透過編輯對話框
+        pass
+    
+    def GetAttr(self, row, col, kind):
+        status, stripe, left = cell_style(self.source, row, col)
+        attr = self.status_attrs.get(status)
+        if attr is None:
+            attr = self.cell_attrs[(stripe, left)]
+        attr.IncRef()
+        return attr
+
+
+class LibraryGridTable(BookGridTable):
+    """多館藏表格 - 在書籍欄位前加上館別欄 (資料來源為 LibraryBookSource)"""
+    
+    HEADERS = ["館別"] + BookGridTable.HEADERS
+    
+    def GetValue(self, row, col):
+        if col == 0:
+            return self.source.get_library(row) or ""
+        return super().GetValue(row, col - 1)
+    
+    def GetAttr(self, row, col, kind):
+        if col == 0:
+            attr = self.cell_attrs[(row % 2 == 0, True)]
+            attr.IncRef()
+            return attr
+        return super().GetAttr(row, col - 1, kind)
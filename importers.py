@@ -0,0 +1,299 @@
+"""
+匯入模組
+包含 Importer 基底類別與 CsvImporter、JsonLinesImporter 類別，以串流方式讀取匯出格式的檔案，
+分批驗證並寫入資料庫
+(不依賴 wx，進度與取消透過回呼和 threading.Event 交給呼叫端)
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import threading
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+from models import Book, validate_batch
+from exporters import CSV_HEADERS
+
+logger = logging.getLogger(__name__)
+
+# 匯入模式：append 一律新增 (忽略ID欄位)；upsert 依ID更新或新增；dedupe 略過書名、作者、年份相同的書籍
+IMPORT_MODES = {
+    "append": "全部新增",
+    "upsert": "依ID更新或新增",
+    "dedupe": "略過重複書籍",
+}
+
+REJECT_HEADERS = ['行號'] + CSV_HEADERS + ['錯誤原因']
+
+DEFAULT_BATCH_SIZE = 5000
+
+# progress(已讀取位元組, 檔案總位元組)
+ProgressCallback = Callable[[int, int], None]
+
+
+def parse_row(fields: List[str], keep_id: bool = True) -> Book:
+    """
+    將一列 CSV 欄位轉為書籍物件
+    
+    Args:
+        fields: (ID, 書名, 作者, 出版年份, 閱讀狀態, 評分) 欄位
+        keep_id: 是否保留ID欄位 (False 時由資料庫配發新ID)
+    
+    Returns:
+        Book: 書籍物件 (尚未驗證)
+    
+    Raises:
+        ValueError: 欄位數量或數字格式錯誤
+    """
+    if len(fields) != len(CSV_HEADERS):
+        raise ValueError(f"欄位數量必須是 {len(CSV_HEADERS)} 個")
+    id_text, title, author, year_text, status, rating_text = fields
+    
+    book_id = None
+    if keep_id and id_text.strip():
+        try:
+            book_id = int(id_text)
+        except ValueError:
+            raise ValueError("ID必須是整數")
+    try:
+        year = int(year_text)
+    except ValueError:
+        raise ValueError("出版年份必須是整數")
+    try:
+        rating = int(rating_text) if rating_text.strip() else 0
+    except ValueError:
+        raise ValueError("評分必須是整數")
+    
+    return Book(title=title.strip(), author=author.strip(), year=year,
+                status=status.strip(), rating=rating, book_id=book_id)
+
+
+class ImportResult:
+    """匯入結果 - 記錄匯入、略過與拒絕的筆數"""
+    
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.cancelled = False
+        self.reject_path = None  # 有被拒絕的資料列時才會建立
+    
+    def __str__(self) -> str:
+        text = f"共 {self.total} 筆：匯入 {self.imported} 筆，略過 {self.skipped} 筆，拒絕 {self.rejected} 筆"
+        if self.cancelled:
+            text += " (已取消)"
+        return text
+
+
+class Importer:
+    """匯入基底類別 - 負責分批驗證、寫入、進度、取消與拒絕檔，子類別只需將檔案內容轉為欄位"""
+    
+    # 格式代號與副檔名
+    format = ""
+    extension = ""
+    
+    def __init__(self, db_manager, mode: str = "append", batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        初始化匯入器
+        
+        Args:
+            db_manager: 資料庫管理器
+            mode: 匯入模式 (append / upsert / dedupe)
+            batch_size: 每批驗證並寫入的資料列數 (也是每個交易的大小)
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"不支援的匯入模式: {mode}")
+        self.db_manager = db_manager
+        self.mode = mode
+        self.batch_size = batch_size
+    
+    def import_file(self, file_path: str, reject_path: Optional[str] = None,
+                    progress: Optional[ProgressCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> ImportResult:
+        """
+        匯入檔案 (記憶體用量只與 batch_size 有關)
+        
+        無法解析或驗證失敗的資料列會寫入拒絕檔 (原始欄位加上行號與錯誤原因)。
+        每批各自提交，取消時已提交的批次會保留。
+        
+        Args:
+            file_path: 檔案路徑 (CSV 的標題列須與匯出格式相同)
+            reject_path: 拒絕檔路徑 (None 表示與來源檔同目錄的 *_rejects.csv)
+            progress: 進度回呼 progress(已讀取位元組, 檔案總位元組)，每批呼叫一次
+            cancel_event: 設定後於下一批之前停止匯入
+        
+        Returns:
+            ImportResult: 匯入結果
+        
+        Raises:
+            ValueError: 標題列與匯出格式不符
+        """
+        if reject_path is None:
+            reject_path = os.path.splitext(file_path)[0] + "_rejects.csv"
+        with open(file_path, 'rb') as raw:
+            return self.import_stream(raw, reject_path, progress, cancel_event,
+                                      total_bytes=os.path.getsize(file_path))
+    
+    def import_stream(self, raw: BinaryIO, reject_path: str,
+                      progress: Optional[ProgressCallback] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      total_bytes: Optional[int] = None) -> ImportResult:
+        """
+        由已開啟的位元組串流匯入 (例如標準輸入)
+        
+        Args:
+            raw: 以二進位模式開啟的串流 (UTF-8)
+            reject_path: 拒絕檔路徑
+            progress: 進度回呼 (只有已知 total_bytes 時才會呼叫)
+            cancel_event: 設定後於下一批之前停止匯入
+            total_bytes: 串流總位元組數 (None 表示未知，例如管線)
+        
+        Returns:
+            ImportResult: 匯入結果
+        
+        Raises:
+            ValueError: 標題列與匯出格式不符
+        """
+        if total_bytes is None:
+            progress = None
+        
+        result = ImportResult()
+        reject_file = None
+        text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        try:
+            keep_id = self.mode == "upsert"
+            batch: List[Tuple[int, List[str], Book]] = []
+            rejects: List[Tuple[int, List[str], str]] = []
+            for line_num, fields, error in self.read_records(text):
+                result.total += 1
+                if error is None:
+                    try:
+                        batch.append((line_num, fields, parse_row(fields, keep_id)))
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    rejects.append((line_num, fields, error))
+                
+                if len(batch) + len(rejects) >= self.batch_size:
+                    if cancel_event is not None and cancel_event.is_set():
+                        result.cancelled = True
+                        break
+                    rejects.extend(self._write_batch(batch, result))
+                    reject_file = self._write_rejects(reject_file, reject_path, rejects, result)
+                    batch, rejects = [], []
+                    if progress:
+                        progress(raw.tell(), total_bytes)
+            
+            if not result.cancelled:
+                rejects.extend(self._write_batch(batch, result))
+                reject_file = self._write_rejects(reject_file, reject_path, rejects, result)
+                if progress:
+                    progress(total_bytes, total_bytes)
+        finally:
+            # 交還原本的串流，不隨文字包裝一起關閉 (例如標準輸入)
+            text.detach()
+            if reject_file is not None:
+                reject_file.close()
+        
+        logger.info("匯入書籍: %s", result)
+        return result
+    
+    def read_records(self, text) -> Iterator[Tuple[int, List[str], Optional[str]]]:
+        """
+        逐一讀取資料列
+        
+        Args:
+            text: 文字串流
+        
+        Yields:
+            Tuple[int, List[str], Optional[str]]: (行號, CSV 順序的欄位, 無法讀取時的錯誤訊息)
+        """
+        raise NotImplementedError
+    
+    def _write_batch(self, batch: List[Tuple[int, List[str], Book]],
+                     result: ImportResult) -> List[Tuple[int, List[str], str]]:
+        """整批驗證並寫入一批書籍，回傳被拒絕的資料列"""
+        rejects, books, rows = [], [], []
+        mask, messages = validate_batch(book for _, _, book in batch)
+        for (line_num, fields, book), invalid, message in zip(batch, mask, messages):
+            if invalid:
+                rejects.append((line_num, fields, message))
+            else:
+                books.append(book)
+                rows.append((line_num, fields))
+        if not books:
+            return rejects
+        
+        # 已在此驗證過，資料庫層不再重複驗證
+        if self.mode == "upsert":
+            report = self.db_manager.upsert_books(books, chunk_size=len(books), validated=True)
+        else:
+            report = self.db_manager.add_books(books, chunk_size=len(books),
+                                               skip_duplicates=self.mode == "dedupe", validated=True)
+        result.imported += report.success_count
+        result.skipped += report.skip_count
+        for index, message in report.errors:
+            line_num, fields = rows[index]
+            rejects.append((line_num, fields, message))
+        return rejects
+    
+    def _write_rejects(self, reject_file, reject_path: str,
+                       rejects: List[Tuple[int, List[str], str]], result: ImportResult):
+        """將被拒絕的資料列附加到拒絕檔 (第一次有拒絕資料時才建立檔案)"""
+        if not rejects:
+            return reject_file
+        if reject_file is None:
+            reject_file = open(reject_path, 'w', newline='', encoding='utf-8')
+            csv.writer(reject_file).writerow(REJECT_HEADERS)
+            result.reject_path = reject_path
+        rejects.sort()
+        csv.writer(reject_file).writerows([line_num] + fields + [message]
+                                          for line_num, fields, message in rejects)
+        result.rejected += len(rejects)
+        return reject_file
+
+
+class CsvImporter(Importer):
+    """CSV 匯入器 - 串流讀取、分批驗證，每批在各自的交易中寫入"""
+    
+    format = "csv"
+    extension = "csv"
+    
+    def read_records(self, text) -> Iterator[Tuple[int, List[str], Optional[str]]]:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None or [name.strip() for name in header] != CSV_HEADERS:
+            raise ValueError(f"CSV 標題列必須是: {', '.join(CSV_HEADERS)}")
+        for fields in reader:
+            if fields:
+                yield reader.line_num, fields, None
+
+
+# JSON Lines 的鍵 (與 Book.to_dict() 相同)，依 CSV 欄位順序排列
+JSONL_KEYS = ('id', 'title', 'author', 'year', 'status', 'rating')
+
+
+class JsonLinesImporter(Importer):
+    """JSON Lines 匯入器 - 每行一個 Book.to_dict() 格式的 JSON 物件"""
+    
+    format = "jsonl"
+    extension = "jsonl"
+    
+    def read_records(self, text) -> Iterator[Tuple[int, List[str], Optional[str]]]:
+        for line_num, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError
+            except ValueError:
+                yield line_num, [line.rstrip("\r\n")], "JSON 格式錯誤"
+                continue
+            values = (record.get(key) for key in JSONL_KEYS)
+            yield line_num, ["" if value is None else str(value) for value in values], None
+
+
+IMPORTERS = {cls.format: cls for cls in (CsvImporter, JsonLinesImporter)}
@@ -0,0 +1,311 @@
+"""
+效能量測模組
+包含 Instrumentation 類別，記錄 DatabaseManager 各方法的呼叫次數、延遲分布、回傳筆數、
+連線與交易次數，並可追蹤執行的 SQL 與記錄超過門檻的慢查詢 (透過 logging 輸出)
+"""
+
+import functools
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Optional
+
+# 延遲分布的區間上限 (毫秒)；最後一個區間沒有上限
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# 未指定時的慢查詢門檻 (秒) 與保留的慢查詢筆數
+DEFAULT_SLOW_THRESHOLD = 0.2
+DEFAULT_SLOW_LOG_SIZE = 100
+# 慢查詢紀錄中每次呼叫最多保留的 SQL 敘述數量
+MAX_TRACED_STATEMENTS = 20
+
+sql_logger = logging.getLogger("database.sql")
+slow_logger = logging.getLogger("database.slow")
+
+# 每個執行緒記錄過的錯誤訊息數量 (方法捕捉例外後只記錄錯誤時，用來判斷呼叫是否失敗)
+_logged_errors = threading.local()
+
+
+class ErrorLogFilter(logging.Filter):
+    """計算目前執行緒記錄的 ERROR 訊息 (加在 database 模組的 logger 上，不過濾任何訊息)"""
+    
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            _logged_errors.count = getattr(_logged_errors, "count", 0) + 1
+        return True
+
+
+error_log_filter = ErrorLogFilter()
+
+
+def _pad(text: str, width: int, right: bool = False) -> str:
+    """依顯示寬度補空白 (中文字佔兩格)"""
+    shown = sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+    padding = " " * max(0, width - shown)
+    return padding + text if right else text + padding
+
+
+def count_rows(result) -> Optional[int]:
+    """由方法的回傳值估計筆數 (串列、BookBatch、ID陣列、批次結果、異動清單)；無法判斷時回傳 None"""
+    if isinstance(result, (bool, int, float, str, dict)) or result is None:
+        return None
+    if hasattr(result, "succeeded"):
+        return len(result.succeeded)
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], list):
+        return len(result[1])
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+class Histogram:
+    """延遲分布 - 固定區間的計數 (不保留每次的樣本)"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+    
+    def percentile(self, fraction: float) -> float:
+        """
+        估計百分位數
+        
+        Args:
+            fraction: 0 到 1 之間的比例 (例如 0.95)
+        
+        Returns:
+            float: 百分位數所在區間的上限 (毫秒)；落在最後一個區間時回傳最大值
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(BUCKET_BOUNDS_MS[index], self.max) if index < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+    
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            'max_ms': round(self.max, 3),
+            'buckets': {(f"<={bound}" if index < len(BUCKET_BOUNDS_MS) else f">{BUCKET_BOUNDS_MS[-1]}"): count
+                        for index, (bound, count) in enumerate(zip(BUCKET_BOUNDS_MS + (None,), self.counts))
+                        if count},
+        }
+
+
+class MethodStats:
+    """單一方法的統計 - 呼叫次數、失敗次數 (例外或記錄了錯誤)、回傳筆數與延遲分布"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.latency = Histogram()
+    
+    def to_dict(self) -> dict:
+        return dict(self.latency.to_dict(), calls=self.calls, errors=self.errors, rows=self.rows,
+                    total_ms=round(self.latency.total, 3))
+
+
+class Instrumentation:
+    """效能量測 - 由 DatabaseManager 持有，各方法透過 instrumented 裝飾器記錄"""
+    
+    def __init__(self, enabled: bool = True, slow_threshold: float = DEFAULT_SLOW_THRESHOLD,
+                 trace_sql: bool = False, slow_log_size: int = DEFAULT_SLOW_LOG_SIZE):
+        """
+        初始化效能量測
+        
+        Args:
+            enabled: 是否記錄方法的呼叫統計 (連線與交易次數一律記錄)
+            slow_threshold: 慢查詢門檻 (秒)，超過時以 WARNING 記錄到 database.slow；None 表示不記錄
+            trace_sql: 是否追蹤執行的 SQL (以 DEBUG 記錄到 database.sql，並附在慢查詢紀錄中)
+            slow_log_size: 保留的慢查詢筆數
+        """
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.trace_sql = trace_sql
+        self.methods: Dict[str, MethodStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def count(self, name: str, amount: int = 1):
+        """累加計數器 (例如 connections、transactions、rollbacks)"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def record(self, method: str, seconds: float, rows: Optional[int] = None, error: bool = False):
+        """
+        記錄一次方法呼叫
+        
+        Args:
+            method: 方法名稱
+            seconds: 耗時 (秒)
+            rows: 回傳筆數 (None 表示不適用)
+            error: 是否失敗 (以例外結束或記錄了錯誤)
+        """
+        with self._lock:
+            stats = self.methods.get(method)
+            if stats is None:
+                stats = self.methods[method] = MethodStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.rows += rows or 0
+            stats.latency.record(seconds)
+        
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            statements = list(getattr(self._local, "statements", None) or ())
+            entry = {
+                'time': time.time(),
+                'method': method,
+                'ms': round(seconds * 1000, 3),
+                'rows': rows,
+                'statements': statements,
+            }
+            self.slow_queries.append(entry)
+            slow_logger.warning("慢查詢 %s: %.1f ms (%s 筆)%s", method, seconds * 1000,
+                                "-" if rows is None else rows,
+                                "".join(f"\n    {sql}" for sql in statements))
+    
+    def trace(self, statement: str):
+        """sqlite3 的 trace callback：記錄目前執行緒執行的 SQL (觸發器與全文索引內部的敘述不記錄)"""
+        statement = " ".join(statement.split())
+        if statement.startswith("--"):
+            return
+        statements = getattr(self._local, "statements", None)
+        if statements is not None:
+            # 觸發器執行時會重複回報外層敘述
+            if statements and statements[-1] == statement:
+                return
+            if len(statements) < MAX_TRACED_STATEMENTS:
+                statements.append(statement)
+        sql_logger.debug("%s", statement)
+    
+    def begin_call(self):
+        """開始一次方法呼叫 (巢狀呼叫共用外層的 SQL 追蹤紀錄)"""
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.statements = [] if self.trace_sql else None
+        self._local.depth = depth + 1
+    
+    def end_call(self):
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            self._local.statements = None
+    
+    def reset(self):
+        """清除所有統計"""
+        with self._lock:
+            self.methods = {}
+            self.counters = {}
+            self.slow_queries.clear()
+            self.started = time.time()
+    
+    def snapshot(self) -> dict:
+        """
+        獲取目前的統計
+        
+        Returns:
+            dict: 計數器、各方法統計 (依總耗時排序)、慢查詢紀錄與統計開始後的秒數
+        """
+        with self._lock:
+            methods = sorted(self.methods.items(), key=lambda item: item[1].latency.total, reverse=True)
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'counters': dict(self.counters),
+                'methods': {name: stats.to_dict() for name, stats in methods},
+                'slow_queries': list(self.slow_queries),
+            }
+    
+    def format_report(self, snapshot: Optional[dict] = None) -> str:
+        """
+        產生文字報表 (診斷資訊視窗與命令列使用)
+        
+        Args:
+            snapshot: 統計 (None 表示目前的統計)
+        
+        Returns:
+            str: 報表
+        """
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        lines = [f"統計時間: {snapshot['uptime_s']} 秒"]
+        counters = snapshot['counters']
+        if counters:
+            lines.append("計數: " + ", ".join(f"{name}={value}" for name, value in sorted(counters.items())))
+        
+        lines.append("")
+        columns = (("方法", 24), ("次數", 8), ("失敗", 6), ("筆數", 10), ("總計ms", 11), ("平均ms", 9),
+                   ("p50", 8), ("p95", 8), ("p99", 8), ("最大ms", 10))
+        lines.append("".join(_pad(title, width, index > 0) for index, (title, width) in enumerate(columns)))
+        for name, stats in snapshot['methods'].items():
+            values = (name, stats['calls'], stats['errors'], stats['rows'], f"{stats['total_ms']:.1f}",
+                      f"{stats['mean_ms']:.3f}", stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+                      f"{stats['max_ms']:.1f}")
+            lines.append("".join(_pad(str(value), width, index > 0)
+                                 for index, (value, (_, width)) in enumerate(zip(values, columns))))
+        
+        slow_queries = snapshot['slow_queries']
+        if slow_queries:
+            lines.append("")
+            lines.append(f"慢查詢 (最近 {len(slow_queries)} 筆):")
+            for entry in reversed(slow_queries):
+                stamp = time.strftime("%H:%M:%S", time.localtime(entry['time']))
+                lines.append(f"  {stamp} {entry['method']} {entry['ms']} ms")
+                lines.extend(f"      {sql}" for sql in entry['statements'])
+        return "\n".join(lines)
+
+
+def instrumented(method):
+    """
+    DatabaseManager 方法的裝飾器：記錄耗時、回傳筆數與是否失敗 (self.instrumentation 停用時直接呼叫)
+    
+    Args:
+        method: 要量測的方法
+    
+    Returns:
+        function: 包裝後的方法
+    """
+    name = method.__name__
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        stats = self.instrumentation
+        if not stats.enabled:
+            return method(self, *args, **kwargs)
+        stats.begin_call()
+        errors = getattr(_logged_errors, "count", 0)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException:
+            stats.record(name, time.perf_counter() - start, error=True)
+            raise
+        else:
+            failed = getattr(_logged_errors, "count", 0) != errors
+            stats.record(name, time.perf_counter() - start, count_rows(result), failed)
+            return result
+        finally:
+            stats.end_call()
+    
+    return wrapper
@@ -0,0 +1,290 @@
+"""
+多館藏模組
+包含 LibrarySet 類別，將多個書籍資料庫檔案 (例如各分館) 視為一個館藏：
+搜尋與統計同時分送到各資料庫，在執行緒池或行程池平行執行後依排序合併結果；
+各館以唯讀方式開啟，不會對選取的檔案套用遷移或建立索引 (不依賴 wx)
+"""
+
+import heapq
+import logging
+import os
+import sqlite3
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count, repeat
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from database import DEFAULT_PAGE_SIZE, PAGE_ORDER_COLUMNS, DatabaseManager, read_only_uri
+from models import Book
+
+logger = logging.getLogger(__name__)
+
+# SQLite 預設最多同時附加的資料庫數量 (SQLITE_MAX_ATTACHED)
+MAX_ATTACHED = 10
+
+# 搜尋結果依相關度排序 (各館內依 bm25 的名次)
+RELEVANCE = "relevance"
+
+# 與 SQLite NOCASE 定序相同：只將 ASCII 大寫字母轉為小寫
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# 工作行程中已開啟的資料庫 (每個行程每個檔案只開啟一次)
+_worker_libraries: Dict[str, DatabaseManager] = {}
+
+# (館別名稱, 書籍)
+LibraryBook = Tuple[str, Book]
+# 各館的分頁位置：館別名稱 -> 最後一本書的 (ID, 排序值)，None 表示從頭開始
+LibraryCursor = Dict[str, Optional[Tuple[int, Any]]]
+
+
+def row_sort_key(order_by: str) -> Callable[[tuple], tuple]:
+    """
+    資料列的排序鍵，與 DatabaseManager 分頁查詢的 ORDER BY 相同 (欄位值，再依ID)
+    
+    Args:
+        order_by: 排序欄位 (id/title/author/year/status/rating)
+    
+    Returns:
+        Callable: key(資料列) -> 排序鍵
+    """
+    if order_by not in PAGE_ORDER_COLUMNS:
+        raise ValueError(f"不支援的排序欄位: {order_by}")
+    column = PAGE_ORDER_COLUMNS.index(order_by)
+    if order_by == "id":
+        return lambda row: (row[0],)
+    if order_by == "author":
+        return lambda row: (row[column].translate(_NOCASE), row[0])
+    return lambda row: (row[column], row[0])
+
+
+def _open(library) -> DatabaseManager:
+    """執行緒池直接使用 DatabaseManager；行程池傳入檔案路徑，在工作行程中開啟"""
+    if isinstance(library, DatabaseManager):
+        return library
+    db_manager = _worker_libraries.get(library)
+    if db_manager is None:
+        db_manager = _worker_libraries[library] = DatabaseManager(library, read_only=True)
+    return db_manager
+
+
+def _search_rows(library, keyword: str, order_by: str) -> List[tuple]:
+    """在一個資料庫搜尋並排序 (在工作執行緒或行程執行；依相關度時保留搜尋結果的順序)"""
+    rows = list(_open(library).search_books(keyword, as_batch=True).rows())
+    if order_by != RELEVANCE:
+        rows.sort(key=row_sort_key(order_by))
+    return rows
+
+
+def _page_rows(library, after: Optional[Tuple[int, Any]], limit: int, order_by: str,
+               filters: Optional[dict]) -> List[tuple]:
+    """讀取一個資料庫的一頁資料列 (已依 order_by 排序)"""
+    after_id, after_value = after if after is not None else (None, None)
+    books = _open(library).get_books_page(after_id, limit, order_by, filters, after_value)
+    return [(book.id, book.title, book.author, book.year, book.status, book.rating) for book in books]
+
+
+def _statistics(library) -> dict:
+    return _open(library).get_statistics()
+
+
+def _library_names(paths: Sequence[str]) -> List[str]:
+    """以檔名 (不含副檔名) 作為館別名稱，重複時加上序號"""
+    names = []
+    for path in paths:
+        base = os.path.splitext(os.path.basename(path))[0] or path
+        name, suffix = base, 2
+        while name in names:
+            name, suffix = f"{base}-{suffix}", suffix + 1
+        names.append(name)
+    return names
+
+
+class LibrarySet:
+    """多館藏 - 每個資料庫檔案一個 DatabaseManager，查詢分送到各館後合併"""
+    
+    def __init__(self, paths: Sequence[str], max_workers: Optional[int] = None,
+                 use_processes: bool = False):
+        """
+        初始化多館藏
+        
+        工作執行緒 (或行程) 數量預設為 CPU 核心數與館數的較小值，
+        館數多於核心數時各館依序排入，搜尋延遲隨核心數而非館數增加而下降。
+        
+        Args:
+            paths: 資料庫檔案路徑 (以唯讀方式開啟，結構版本過舊的檔案會拋出 sqlite3.DatabaseError)
+            max_workers: 工作執行緒或行程數量上限
+            use_processes: 是否使用行程池 (大量搜尋結果的排序不受 GIL 限制，但結果需在行程間傳遞)
+        """
+        if not paths:
+            raise ValueError("至少需要一個資料庫檔案")
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.names = _library_names(self.paths)
+        self.libraries: Dict[str, DatabaseManager] = {}
+        try:
+            for name, path in zip(self.names, self.paths):
+                self.libraries[name] = DatabaseManager(path, read_only=True)
+        except sqlite3.Error:
+            for db_manager in self.libraries.values():
+                db_manager.close()
+            raise
+        self.use_processes = use_processes
+        
+        workers = max_workers or min(len(self.paths), os.cpu_count() or 1)
+        if use_processes:
+            self._executor: Executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="library")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def close(self):
+        """停止工作執行緒並關閉所有資料庫"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for db_manager in self.libraries.values():
+            db_manager.close()
+    
+    def _targets(self, names: Sequence[str]) -> list:
+        # 行程池只能傳遞檔案路徑；執行緒池直接使用已開啟的資料庫 (每個工作執行緒一條連線)
+        if self.use_processes:
+            return [self.paths[self.names.index(name)] for name in names]
+        return [self.libraries[name] for name in names]
+    
+    def _fan_out(self, func: Callable, names: Sequence[str], *args) -> List:
+        """在各館平行執行 func(館, *args)，依 names 的順序回傳結果"""
+        futures = [self._executor.submit(func, target, *args) for target in self._targets(names)]
+        return [future.result() for future in futures]
+    
+    def _merge(self, results: List[List[tuple]], order_by: str):
+        """
+        合併各館已排序的資料列，逐一產生 (排序鍵, 館別索引, 資料列)
+        
+        依相關度時以各館內的名次交錯合併：bm25 分數依各館自己的詞頻統計計算，不同館之間無法直接比較。
+        """
+        if order_by == RELEVANCE:
+            streams = [zip(count(), repeat(index), rows) for index, rows in enumerate(results)]
+        else:
+            key = row_sort_key(order_by)
+            streams = [zip(map(key, rows), repeat(index), rows) for index, rows in enumerate(results)]
+        return heapq.merge(*streams)
+    
+    def search_books(self, keyword: str, order_by: str = RELEVANCE,
+                     limit: Optional[int] = None) -> List[LibraryBook]:
+        """
+        搜尋所有館 (各館同時搜尋並排序，再合併)
+        
+        Args:
+            keyword: 搜尋關鍵字
+            order_by: 合併後的排序欄位 (預設依相關度，與 DatabaseManager.search_books 相同)
+            limit: 最多回傳的筆數 (None 表示全部)
+        
+        Returns:
+            List[LibraryBook]: (館別名稱, 書籍) 串列
+        """
+        results = self._fan_out(_search_rows, self.names, keyword, order_by)
+        merged = self._merge(results, order_by)
+        if limit is not None:
+            merged = (item for item, _ in zip(merged, range(limit)))
+        return [(self.names[index], Book.from_row(row)) for _, index, row in merged]
+    
+    def get_books_page(self, cursor: Optional[LibraryCursor] = None,
+                       limit: int = DEFAULT_PAGE_SIZE, order_by: str = "id",
+                       filters: Optional[dict] = None) -> Tuple[List[LibraryBook], Optional[LibraryCursor]]:
+        """
+        以 keyset 分頁方式瀏覽所有館的合併結果
+        
+        每館各讀取一頁 (同時執行)，合併後取前 limit 筆；每館的游標只前進到實際用到的書籍，
+        並記錄該書的排序值，游標所指的書籍之後被刪除也能繼續分頁。
+        
+        Args:
+            cursor: 上一頁回傳的游標 (None 表示第一頁)
+            limit: 每頁筆數
+            order_by: 排序欄位
+            filters: 篩選條件 (與 DatabaseManager.get_books_page 相同)
+        
+        Returns:
+            Tuple[List[LibraryBook], Optional[dict]]: (此頁的 (館別名稱, 書籍) 串列, 下一頁的游標；沒有下一頁時為 None)
+        """
+        cursor = dict(cursor) if cursor is not None else {name: None for name in self.names}
+        names = [name for name in self.names if name in cursor]
+        if not names:
+            return [], None
+        
+        futures = [self._executor.submit(_page_rows, target, cursor[name], limit, order_by, filters)
+                   for name, target in zip(names, self._targets(names))]
+        results = [future.result() for future in futures]
+        column = PAGE_ORDER_COLUMNS.index(order_by)
+        page = []
+        for _, index, row in self._merge(results, order_by):
+            if len(page) == limit:
+                break
+            page.append((names[index], Book.from_row(row)))
+            cursor[names[index]] = (row[0], row[column])
+        
+        # 整頁都已用完且不足一頁的館已沒有更多書籍
+        used = {}
+        for name, _ in page:
+            used[name] = used.get(name, 0) + 1
+        for name, rows in zip(names, results):
+            if len(rows) < limit and used.get(name, 0) == len(rows):
+                del cursor[name]
+        return page, (cursor or None)
+    
+    def get_book_count(self) -> int:
+        """所有館的書籍總數"""
+        return sum(db_manager.get_book_count() for db_manager in self.libraries.values())
+    
+    def get_statistics(self) -> dict:
+        """
+        合併所有館的統計 (各館同時計算)
+        
+        Returns:
+            dict: 與 DatabaseManager.get_statistics 相同的欄位，另有 libraries (各館書籍數)
+        """
+        results = self._fan_out(_statistics, self.names)
+        status_counts: Dict[str, int] = {}
+        rating_histogram = {rating: 0 for rating in range(6)}
+        year_counts: Dict[int, int] = {}
+        for stats in results:
+            for status, count in stats['status_counts'].items():
+                status_counts[status] = status_counts.get(status, 0) + count
+            for rating, count in stats['rating_histogram'].items():
+                rating_histogram[rating] = rating_histogram.get(rating, 0) + count
+            for year, count in stats['year_counts'].items():
+                year_counts[year] = year_counts.get(year, 0) + count
+        
+        # 平均評分只計算已評分的書籍，由合併後的評分分布計算
+        rated = sum(count for rating, count in rating_histogram.items() if rating > 0)
+        rating_sum = sum(rating * count for rating, count in rating_histogram.items() if rating > 0)
+        return {
+            'total': sum(stats['total'] for stats in results),
+            'status_counts': status_counts,
+            'rating_histogram': rating_histogram,
+            'year_counts': dict(sorted(year_counts.items())),
+            'average_rating': round(rating_sum / rated, 2) if rated else 0.0,
+            'libraries': {name: stats['total'] for name, stats in zip(self.names, results)},
+        }
+    
+    def open_attached(self) -> sqlite3.Connection:
+        """
+        開啟一條以 ATTACH 附加所有館 (唯讀) 的連線，並建立合併檢視 all_books
+        
+        適合臨時的 SQL 查詢，例如
+        SELECT library, COUNT(*) FROM all_books GROUP BY library；
+        查詢在單一連線依序執行，需要平行處理時請使用 search_books 等方法。
+        
+        Returns:
+            sqlite3.Connection: 連線 (呼叫端負責關閉)
+        """
+        if len(self.paths) > MAX_ATTACHED:
+            raise ValueError(f"ATTACH 最多只能附加 {MAX_ATTACHED} 個資料庫")
+        conn = sqlite3.connect("file::memory:", uri=True, isolation_level=None, check_same_thread=False)
+        selects = []
+        for index, (name, path) in enumerate(zip(self.names, self.paths)):
+            conn.execute(f"ATTACH DATABASE ? AS lib{index}", (read_only_uri(path),))
+            label = name.replace("'", "''")
+            selects.append(f"SELECT '{label}' AS library, id, title, author, year, status, rating FROM lib{index}.books")
+        conn.execute(f"CREATE TEMP VIEW all_books AS {' UNION ALL '.join(selects)}")
+        return conn
@@ -0,0 +1,110 @@
+"""
+即時搜尋模組
+包含 LiveSearch 類別，在背景執行緒執行搜尋，並取消已被新輸入取代的查詢
+(不依賴 wx，結果透過回呼交給呼叫端，例如以 wx.CallAfter 轉回 UI 執行緒)
+"""
+
+import threading
+from typing import Callable, List, Optional
+from models import Book
+
+
+class LiveSearch:
+    """即時搜尋 - 單一背景執行緒，只處理最新的關鍵字"""
+    
+    def __init__(self, db_manager, on_results: Callable[[str, List[Book]], None]):
+        """
+        初始化即時搜尋
+        
+        Args:
+            db_manager: 資料庫管理器
+            on_results: 搜尋完成時的回呼 on_results(關鍵字, 書籍列表)，在背景執行緒呼叫
+        """
+        self.db_manager = db_manager
+        self.on_results = on_results
+        
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._pending: Optional[str] = None
+        self._closed = False
+        
+        # 上一次子字串比對 (LIKE/trigram) 的完整結果，新關鍵字包含舊關鍵字時直接在記憶體中篩選
+        self._last_keyword: Optional[str] = None
+        self._last_results: Optional[List[Book]] = None
+        
+        self._thread = threading.Thread(target=self._run, name="LiveSearch", daemon=True)
+        self._thread.start()
+    
+    def submit(self, keyword: str):
+        """
+        提交新的搜尋關鍵字 (取代尚未完成的搜尋)
+        
+        Args:
+            keyword: 搜尋關鍵字
+        """
+        with self._condition:
+            self._generation += 1
+            self._pending = keyword
+            self._condition.notify()
+    
+    def cancel(self):
+        """取消尚未完成的搜尋"""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+    
+    def invalidate(self):
+        """資料已變更，下次搜尋不可沿用上一次結果"""
+        with self._condition:
+            self._last_keyword = None
+            self._last_results = None
+    
+    def close(self):
+        """停止背景執行緒"""
+        with self._condition:
+            self._closed = True
+            self._generation += 1
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+    
+    def _is_stale(self, generation: int) -> bool:
+        return self._closed or generation != self._generation
+    
+    def _refine(self, keyword: str) -> Optional[List[Book]]:
+        """新關鍵字包含上一次的關鍵字且兩者都是子字串比對時，從上一次結果篩選 (結果必為其子集)"""
+        with self._condition:
+            last_keyword, last_results = self._last_keyword, self._last_results
+        if last_results is None or not last_keyword or last_keyword not in keyword:
+            return None
+        if not self.db_manager.is_substring_search(keyword):
+            return None
+        
+        needle = keyword.casefold()
+        return [book for book in last_results
+                if needle in book.title.casefold() or needle in book.author.casefold()]
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                keyword, generation = self._pending, self._generation
+                self._pending = None
+            
+            results = self._refine(keyword)
+            if results is None:
+                results = self.db_manager.search_books(
+                    keyword, should_cancel=lambda: self._is_stale(generation))
+            
+            with self._condition:
+                if self._is_stale(generation):
+                    continue
+                # 詞首比對的結果不能再篩選；空結果也不保留 (搜尋失敗時同樣回傳空串列)
+                if results and self.db_manager.is_substring_search(keyword):
+                    self._last_keyword = keyword
+                    self._last_results = results
+                else:
+                    self._last_keyword = self._last_results = None
+            self.on_results(keyword, results)
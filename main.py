@@ -1,26 +1,46 @@
-import wx
-from main_window import MainFrame
+"""
+程式入口
+先解析命令列參數再載入 wxPython，啟動各階段的耗時由 StartupProfile 記錄
 
+用法: python main.py [--profile-startup] [--log-level 等級]
+"""
 
-class BookCollectionApp(wx.App):
-    """應用程式主類別"""
-    
-    def OnInit(self):
-        """應用程式初始化"""
-        try:
-            frame = MainFrame()
-            frame.Show()
-            return True
-        except Exception as e:
-            wx.MessageBox(f"應用程式啟動失敗：{str(e)}", "錯誤", wx.OK | wx.ICON_ERROR)
-            return False
-
-
-def main():
+import argparse
+import logging
+import sys
+from startup import StartupProfile
+
+
+def __getattr__(name):
+    # 相容舊的匯入方式 (from main import BookCollectionApp)；wxPython 仍在第一次使用時才載入
+    if name == "BookCollectionApp":
+        from app import BookCollectionApp
+        return BookCollectionApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv=None):
     """主函數"""
-    app = BookCollectionApp()
+    parser = argparse.ArgumentParser(description="個人化書籍收藏管理系統")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="第一頁書籍顯示後，在標準錯誤輸出列出啟動各階段的耗時")
+    parser.add_argument("--log-level", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="INFO",
+                        help="記錄訊息的等級 (DEBUG 會列出每次新增、修改、刪除)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    profile = StartupProfile(enabled=args.profile_startup)
+    
+    try:
+        from app import BookCollectionApp
+    except ImportError as e:
+        print(f"無法載入 wxPython ({e})；不需圖形介面的操作可使用 cli.py", file=sys.stderr)
+        return 1
+    profile.mark("載入 wxPython")
+    
+    app = BookCollectionApp(profile)
     app.MainLoop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -3,37 +3,125 @@
 包含 MainFrame 類別，負責主要的用戶界面和功能整合
 """
 
-import csv
+import sqlite3
+import threading
 import wx
 import wx.grid
 from models import Book
-from database import DatabaseManager
-from dialogs import BookFormDialog
+from database import BookChange, DatabaseManager
+from cache import CachedDatabaseManager
+from book_sources import ListBookSource, PagedBookSource
+from grid_table import BookGridTable
+from live_search import LiveSearch
+from async_db import AsyncDatabase
+from change_feed import ChangeFeed
+from startup import StartupProfile
+
+# 對話框、匯出與匯入模組在第一次使用時才載入，縮短啟動時間
 
 
 class MainFrame(wx.Frame):
     """主視窗類別"""
     
-    def __init__(self):
-        """初始化主視窗"""
-        super().__init__(None, title="個人化書籍收藏管理系統", size=(1100, 700))
+    # 輸入停止多久 (毫秒) 後才開始即時搜尋
+    SEARCH_DEBOUNCE_MS = 300
+    
+    def __init__(self, profile: StartupProfile = None):
+        """
+        初始化主視窗 (資料庫在寫入執行緒開啟，書籍列表與統計在視窗顯示後於背景載入)
         
-        # 初始化資料庫管理器
-        self.db_manager = DatabaseManager()
+        Args:
+            profile: 啟動計時 (第一頁書籍顯示時結束)
+        """
+        super().__init__(None, title="個人化書籍收藏管理系統", size=(1100, 700))
+        self.profile = profile if profile is not None else StartupProfile()
+        
+        # 資料庫開啟完成前為 None (見 on_database_opened)
+        self.db_manager = None
+        self.live_search = None
+        self.change_feed = None
+        self.search_timer = None
+        
+        # 資料庫操作在背景執行緒執行，UI執行緒只負責顯示結果
+        self.async_db = AsyncDatabase(None, dispatcher=self.call_after, on_busy=self.on_db_busy)
+        self._load_generation = 0
+        self._shown_generation = 0
+        self._stats_generation = 0
+        self._stats_shown_generation = 0
+        self.status_counts = {}
         
         # 設置圖示和樣式
         self.SetMinSize((900, 600))
         
-        # 創建狀態列
-        self.CreateStatusBar()
+        # 創建狀態列 (右側欄位顯示背景作業狀態)
+        self.CreateStatusBar(2)
+        self.SetStatusWidths([-1, 140])
         
         self.init_ui()
         self.setup_layout()
-        self.load_books()
+        self.profile.mark("建立介面")
+        
+        # 結構遷移與全文索引重建可能需要數秒，在寫入執行緒執行，視窗先顯示載入中的狀態
+        self.enable_controls(False)
+        self.SetStatusText("正在開啟資料庫...")
+        self._open_future = self.async_db.run(self.open_database, write=True)
+        self.async_db.then(self._open_future, self.on_database_opened, self.on_database_failed)
         
         # 置中顯示
         self.Center()
     
+    def open_database(self):
+        """
+        開啟資料庫並套用結構遷移 (在寫入執行緒執行，之後的寫入沿用同一條連線)
+        
+        Returns:
+            CachedDatabaseManager: 資料庫管理器 (讀取經過記憶體快取，寫入時自動失效)
+        """
+        # 結構已是最新版本時不執行任何 DDL；大量資料回填延後到之後的寫入工作
+        return CachedDatabaseManager(DatabaseManager(defer_backfill=True))
+    
+    def on_database_opened(self, db_manager):
+        """資料庫開啟完成 (在UI執行緒執行)：啟動背景工作並載入書籍列表"""
+        self.db_manager = db_manager
+        self.async_db.db_manager = db_manager
+        self.profile.mark("開啟資料庫")
+        
+        # 即時搜尋在背景執行緒查詢，結果經 wx.CallAfter 回到 UI 執行緒
+        self.live_search = LiveSearch(
+            self.db_manager,
+            lambda keyword, books: wx.CallAfter(self.on_search_results, keyword, books)
+        )
+        
+        # 新增、修改、刪除後只局部更新表格與統計數字，不再重新載入整個列表
+        self.db_manager.subscribe(self.on_db_changes)
+        # 其他行程 (或其他工具) 寫入同一個資料庫時，由異動紀錄表取得變更，不需按「重新整理」
+        self.change_feed = ChangeFeed(
+            self.db_manager,
+            lambda changes: self.call_after(self.apply_book_changes, changes, True)
+        )
+        self.async_db.write("run_pending_backfills")
+        self.async_db.write("prune_changes")
+        
+        self.enable_controls(True)
+        self.load_books()
+    
+    def on_database_failed(self, error):
+        """資料庫無法開啟 (在UI執行緒執行)"""
+        wx.MessageBox(f"無法開啟資料庫：{str(error)}", "錯誤", wx.OK | wx.ICON_ERROR)
+        self.Close()
+    
+    def enable_controls(self, enabled):
+        """啟用或停用需要資料庫的控制項 (資料庫開啟前停用)"""
+        for control in [self.search_text, self.search_btn, self.refresh_btn, self.diagnostics_btn,
+                        self.add_btn, self.edit_btn, self.delete_btn, self.export_btn, self.import_btn,
+                        self.library_btn]:
+            control.Enable(enabled)
+        if not enabled:
+            self.total_books_label.SetLabel("總書籍數: 載入中...")
+            self.read_books_label.SetLabel("已讀: 載入中...")
+            self.reading_books_label.SetLabel("閱讀中: 載入中...")
+            self.unread_books_label.SetLabel("未讀: 載入中...")
+    
     def init_ui(self):
         """初始化UI元件"""
         # 創建主面板
@@ -89,20 +177,24 @@ class MainFrame(wx.Frame):
         
         self.search_btn = wx.Button(tool_panel, label="搜尋", size=(80, 28))
         self.refresh_btn = wx.Button(tool_panel, label="重新整理", size=(100, 28))
+        self.diagnostics_btn = wx.Button(tool_panel, label="診斷資訊", size=(100, 28))
         
         # 設置按鈕顏色
         self.search_btn.SetBackgroundColour(wx.Colour(0, 123, 255))
         self.search_btn.SetForegroundColour(wx.Colour(255, 255, 255))
         self.refresh_btn.SetBackgroundColour(wx.Colour(108, 117, 125))
         self.refresh_btn.SetForegroundColour(wx.Colour(255, 255, 255))
+        self.diagnostics_btn.SetBackgroundColour(wx.Colour(108, 117, 125))
+        self.diagnostics_btn.SetForegroundColour(wx.Colour(255, 255, 255))
         
         # 內容面板
         content_panel = wx.Panel(main_panel)
         content_panel.SetBackgroundColour(wx.Colour(255, 255, 255))
         
-        # 書籍列表 (使用Grid)
+        # 書籍列表 (使用虛擬表格，資料按需從資料來源載入)
         self.book_grid = wx.grid.Grid(content_panel)
-        self.book_grid.CreateGrid(0, 6)
+        self.grid_table = BookGridTable()
+        self.book_grid.SetTable(self.grid_table, True)
         
         # 設置Grid樣式
         self.book_grid.SetDefaultCellBackgroundColour(wx.Colour(255, 255, 255))
@@ -121,11 +213,6 @@ class MainFrame(wx.Frame):
         # 設置行高
         self.book_grid.SetDefaultRowSize(30, True)
         
-        # 設置列標題
-        headers = ["ID", "書名", "作者", "年份", "狀態", "評分"]
-        for i, header in enumerate(headers):
-            self.book_grid.SetColLabelValue(i, header)
-        
         # 設置列寬 (增加寬度以配合較大的字體)
         self.book_grid.SetColSize(0, 100)
         self.book_grid.SetColSize(1, 320)
@@ -146,6 +233,8 @@ class MainFrame(wx.Frame):
         self.edit_btn = wx.Button(button_panel, label="編輯書籍", size=(120, 35))
         self.delete_btn = wx.Button(button_panel, label="刪除書籍", size=(120, 35))
         self.export_btn = wx.Button(button_panel, label="匯出清單", size=(120, 35))
+        self.import_btn = wx.Button(button_panel, label="匯入清單", size=(120, 35))
+        self.library_btn = wx.Button(button_panel, label="多館瀏覽", size=(120, 35))
         
         # 設置按鈕樣式
         self.add_btn.SetBackgroundColour(wx.Colour(40, 167, 69))
@@ -160,9 +249,16 @@ class MainFrame(wx.Frame):
         self.export_btn.SetBackgroundColour(wx.Colour(23, 162, 184))
         self.export_btn.SetForegroundColour(wx.Colour(255, 255, 255))
         
+        self.import_btn.SetBackgroundColour(wx.Colour(111, 66, 193))
+        self.import_btn.SetForegroundColour(wx.Colour(255, 255, 255))
+        
+        self.library_btn.SetBackgroundColour(wx.Colour(52, 58, 64))
+        self.library_btn.SetForegroundColour(wx.Colour(255, 255, 255))
+        
         # 設置按鈕字體
         button_font = wx.Font(10, wx.FONTFAMILY_MODERN, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD)
-        for btn in [self.add_btn, self.edit_btn, self.delete_btn, self.export_btn]:
+        for btn in [self.add_btn, self.edit_btn, self.delete_btn, self.export_btn, self.import_btn,
+                    self.library_btn]:
             btn.SetFont(button_font)
         
         # 儲存面板引用
@@ -181,11 +277,16 @@ class MainFrame(wx.Frame):
         # 綁定事件
         self.search_btn.Bind(wx.EVT_BUTTON, self.on_search)
         self.refresh_btn.Bind(wx.EVT_BUTTON, self.on_refresh)
+        self.diagnostics_btn.Bind(wx.EVT_BUTTON, self.on_diagnostics)
         self.add_btn.Bind(wx.EVT_BUTTON, self.on_add_book)
         self.edit_btn.Bind(wx.EVT_BUTTON, self.on_edit_book)
         self.delete_btn.Bind(wx.EVT_BUTTON, self.on_delete_book)
         self.export_btn.Bind(wx.EVT_BUTTON, self.on_export_books)
+        self.import_btn.Bind(wx.EVT_BUTTON, self.on_import_books)
+        self.library_btn.Bind(wx.EVT_BUTTON, self.on_library_set)
         self.search_text.Bind(wx.EVT_TEXT_ENTER, self.on_search)
+        self.search_text.Bind(wx.EVT_TEXT, self.on_search_text)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
     
     def setup_layout(self):
         """設置佈局"""
@@ -215,6 +316,7 @@ class MainFrame(wx.Frame):
         tool_sizer.Add(self.search_text, 1, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
         tool_sizer.Add(self.search_btn, 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
         tool_sizer.Add(self.refresh_btn, 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        tool_sizer.Add(self.diagnostics_btn, 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
         self.tool_panel.SetSizer(tool_sizer)
         
         # 內容區域佈局
@@ -229,6 +331,8 @@ class MainFrame(wx.Frame):
         button_sizer.Add(self.edit_btn, 0, wx.ALL, 5)
         button_sizer.Add(self.delete_btn, 0, wx.ALL, 5)
         button_sizer.Add(self.export_btn, 0, wx.ALL, 5)
+        button_sizer.Add(self.import_btn, 0, wx.ALL, 5)
+        button_sizer.Add(self.library_btn, 0, wx.ALL, 5)
         button_sizer.AddStretchSpacer()
         self.button_panel.SetSizer(button_sizer)
         
@@ -241,63 +345,112 @@ class MainFrame(wx.Frame):
         
         self.main_panel.SetSizer(main_sizer)
     
+    def call_after(self, func, *args):
+        """將背景作業的回呼轉交給UI執行緒 (視窗已關閉則略過)"""
+        wx.CallAfter(lambda: func(*args) if self else None)
+    
+    def on_db_busy(self, pending):
+        """背景資料庫作業數量改變時更新狀態列"""
+        if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+            self.SetStatusText(f"處理中 ({pending})..." if pending else "就緒", 1)
+    
+    def on_db_error(self, error):
+        """背景資料庫作業失敗"""
+        wx.MessageBox(f"資料庫操作失敗：{str(error)}", "錯誤", wx.OK | wx.ICON_ERROR)
+    
+    def on_db_changes(self, changes):
+        """書籍異動事件 (在寫入執行緒呼叫，轉交UI執行緒處理)"""
+        self.call_after(self.apply_book_changes, changes)
+    
+    def apply_book_changes(self, changes, external=False):
+        """
+        依書籍異動事件局部更新表格與統計資訊 (在UI執行緒執行)
+        
+        Args:
+            changes: BookChange 串列
+            external: 是否來自異動紀錄表 (可能已由本行程的事件套用過，統計改為重新讀取)
+        """
+        self.live_search.invalidate()
+        
+        # 載入尚未完成時，載入結果不一定包含這次異動，因此重新載入
+        if self._shown_generation != self._load_generation or not self.grid_table.apply_changes(changes):
+            self.refresh_view()
+            return
+        
+        # 表格的局部更新可重複套用，統計增減則不行；計數表只有幾列，直接重新讀取
+        if external or self._stats_shown_generation != self._stats_generation:
+            self.update_statistics()
+            return
+        for change in changes:
+            for status, delta in change.status_delta.items():
+                self.status_counts[status] = self.status_counts.get(status, 0) + delta
+        self.render_statistics()
+    
+    def refresh_view(self):
+        """重新載入目前的檢視 (有搜尋關鍵字時重新搜尋)"""
+        if self.search_text.GetValue().strip():
+            self.start_live_search()
+            self.update_statistics()
+        else:
+            self.load_books()
+    
+    def build_paged_source(self):
+        """建立分頁資料來源並載入第一頁 (在背景執行緒執行，表格第一次繪製時不需查詢)"""
+        source = PagedBookSource(self.db_manager, async_db=self.async_db,
+                                 on_page_loaded=self.on_page_loaded)
+        source.preload(0)
+        return source
+    
     def load_books(self, books=None):
-        """載入書籍到列表"""
+        """載入書籍到列表 (完整列表的ID與第一頁在背景讀取)"""
+        self._load_generation += 1
+        generation = self._load_generation
         if books is None:
-            books = self.db_manager.get_all_books()
-        
-        # 清空現有資料
-        if self.book_grid.GetNumberRows() > 0:
-            self.book_grid.DeleteRows(0, self.book_grid.GetNumberRows())
-        
-        # 添加新資料
-        for i, book in enumerate(books):
-            self.book_grid.AppendRows(1)
-            row = self.book_grid.GetNumberRows() - 1
-            
-            self.book_grid.SetCellValue(row, 0, str(book.id))
-            self.book_grid.SetCellValue(row, 1, book.title)
-            self.book_grid.SetCellValue(row, 2, book.author)
-            self.book_grid.SetCellValue(row, 3, str(book.year))
-            self.book_grid.SetCellValue(row, 4, book.status)
-            self.book_grid.SetCellValue(row, 5, f"{book.rating}★" if book.rating > 0 else "未評分")
-            
-            # 設置儲存格對齊方式
-            for col in range(6):
-                if col == 1 or col == 2:  # 書名和作者靠左對齊
-                    self.book_grid.SetCellAlignment(row, col, wx.ALIGN_LEFT, wx.ALIGN_CENTRE)
-                else:  # 其他欄位置中對齊
-                    self.book_grid.SetCellAlignment(row, col, wx.ALIGN_CENTRE, wx.ALIGN_CENTRE)
-            
-            # 設置行顏色 (交替背景色)
-            if i % 2 == 0:
-                for col in range(6):
-                    self.book_grid.SetCellBackgroundColour(row, col, wx.Colour(248, 249, 250))
-            
-            # 根據狀態設置特殊顏色
-            status_colors = {
-                "已讀": wx.Colour(212, 237, 218),
-                "閱讀中": wx.Colour(255, 228, 181),
-                "未讀": wx.Colour(248, 215, 218)
-            }
-            if book.status in status_colors:
-                self.book_grid.SetCellBackgroundColour(row, 4, status_colors[book.status])
-            
-            # 設置為只讀
-            for col in range(6):
-                self.book_grid.SetReadOnly(row, col)
-        
-        self.book_grid.AutoSizeColumns()
+            self.async_db.then(self.async_db.run(self.build_paged_source),
+                               lambda source: self.show_source(source, generation),
+                               self.on_db_error)
+        else:
+            self.show_source(ListBookSource(books), generation)
         self.update_statistics()
     
+    def show_source(self, source, generation):
+        """顯示資料來源 (略過已被較新載入取代的結果)"""
+        if generation != self._load_generation:
+            return
+        self._shown_generation = generation
+        # 虛擬表格只在繪製時取值，不再逐列寫入儲存格
+        self.grid_table.set_source(source)
+        self.profile.finish("顯示第一頁")
+    
+    def on_page_loaded(self, source):
+        """分頁資料來源在背景載入頁面後重繪表格 (略過已被取代的資料來源)"""
+        if source is self.grid_table.source:
+            self.book_grid.ForceRefresh()
+    
     def update_statistics(self):
         """更新統計資訊"""
-        books = self.db_manager.get_all_books()
-        
-        total_count = len(books)
-        read_count = len([b for b in books if b.status == "已讀"])
-        reading_count = len([b for b in books if b.status == "閱讀中"])
-        unread_count = len([b for b in books if b.status == "未讀"])
+        # 狀態數量由資料庫計數表維護，不需重新讀取所有書籍
+        self._stats_generation += 1
+        generation = self._stats_generation
+        self.async_db.then(self.async_db.read("get_status_counts"),
+                           lambda counts: self.show_statistics(counts, generation),
+                           self.on_db_error)
+    
+    def show_statistics(self, status_counts, generation):
+        """顯示統計資訊 (略過過時的結果)"""
+        if generation != self._stats_generation:
+            return
+        self._stats_shown_generation = generation
+        self.status_counts = dict(status_counts)
+        self.render_statistics()
+    
+    def render_statistics(self):
+        """依目前的狀態數量更新統計標籤與狀態列"""
+        status_counts = self.status_counts
+        total_count = sum(status_counts.values())
+        read_count = status_counts.get("已讀", 0)
+        reading_count = status_counts.get("閱讀中", 0)
+        unread_count = status_counts.get("未讀", 0)
         
         self.total_books_label.SetLabel(f"總書籍數: {total_count}")
         self.read_books_label.SetLabel(f"已讀: {read_count}")
@@ -323,48 +476,110 @@ class MainFrame(wx.Frame):
                 return None
         
         if selected_rows:
-            row = selected_rows[0]
-            book_id_str = self.book_grid.GetCellValue(row, 0)
-            try:
-                return int(book_id_str)
-            except ValueError:
-                return None
+            return self.grid_table.get_book_id(selected_rows[0])
         return None
     
+    def on_search_text(self, event):
+        """搜尋欄輸入事件處理 - 停止輸入一段時間後才開始搜尋"""
+        if self.search_timer is not None and self.search_timer.IsRunning():
+            self.search_timer.Restart(self.SEARCH_DEBOUNCE_MS)
+        else:
+            self.search_timer = wx.CallLater(self.SEARCH_DEBOUNCE_MS, self.start_live_search)
+    
+    def start_live_search(self):
+        """將目前關鍵字交給背景搜尋 (空白關鍵字則顯示完整列表)"""
+        keyword = self.search_text.GetValue().strip()
+        if keyword:
+            self.live_search.submit(keyword)
+            if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+                self.SetStatusText(f"搜尋中: {keyword} ...")
+        else:
+            self.live_search.cancel()
+            self.load_books()
+    
+    def on_search_results(self, keyword, books):
+        """背景搜尋完成 (在UI執行緒執行)"""
+        # 結果送達前輸入已改變，則略過過時的結果
+        if keyword != self.search_text.GetValue().strip():
+            return
+        self.load_books(books)
+        if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+            self.SetStatusText(f"搜尋結果: 找到 {len(books)} 本相關書籍")
+    
     def on_search(self, event):
         """搜尋事件處理"""
+        if self.search_timer is not None:
+            self.search_timer.Stop()
         keyword = self.search_text.GetValue().strip()
         if keyword:
-            books = self.db_manager.search_books(keyword)
-            self.load_books(books)
-            if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
-                self.SetStatusText(f"搜尋結果: 找到 {len(books)} 本相關書籍")
+            self.start_live_search()
         else:
             self.on_refresh(event)
     
     def on_refresh(self, event):
         """重新整理事件處理"""
+        if self.search_timer is not None:
+            self.search_timer.Stop()
+        self.live_search.cancel()
+        self.live_search.invalidate()
         self.load_books()
-        self.search_text.SetValue("")
+        self.search_text.ChangeValue("")
         if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
             self.SetStatusText("已重新載入書籍列表")
     
+    def on_diagnostics(self, event):
+        """顯示診斷資訊 (資料庫方法的呼叫統計、慢查詢、快取統計與啟動耗時)"""
+        from dialogs import DiagnosticsDialog
+        dialog = DiagnosticsDialog(self, self.db_manager, self.profile)
+        dialog.ShowModal()
+        dialog.Destroy()
+    
+    def on_library_set(self, event):
+        """選擇多個資料庫檔案 (例如各分館)，合併瀏覽與搜尋"""
+        dialog = wx.FileDialog(self, "選擇要合併瀏覽的資料庫", wildcard="SQLite 資料庫 (*.db)|*.db",
+                               style=wx.FD_OPEN | wx.FD_MULTIPLE | wx.FD_FILE_MUST_EXIST)
+        if dialog.ShowModal() != wx.ID_OK:
+            dialog.Destroy()
+            return
+        paths = dialog.GetPaths()
+        dialog.Destroy()
+        
+        from dialogs import LibrarySetDialog
+        from library_set import LibrarySet
+        try:
+            # 各館以唯讀方式開啟，結構版本過舊的檔案須先以一般模式開啟完成遷移
+            library_set = LibrarySet(paths)
+        except sqlite3.Error as e:
+            wx.MessageBox(f"無法開啟資料庫：{e}", "錯誤", wx.OK | wx.ICON_ERROR)
+            return
+        library_dialog = LibrarySetDialog(self, library_set)
+        library_dialog.ShowModal()
+        library_dialog.shutdown()
+        library_dialog.Destroy()
+    
     def on_add_book(self, event):
         """新增書籍事件處理"""
+        from dialogs import BookFormDialog
         dialog = BookFormDialog(self, "新增書籍")
         
         if dialog.ShowModal() == wx.ID_OK:
             book = dialog.get_book()
-            if self.db_manager.add_book(book):
-                wx.MessageBox("書籍新增成功!", "成功", wx.OK | wx.ICON_INFORMATION)
-                self.load_books()
-                if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
-                    self.SetStatusText(f"成功新增書籍: {book.title}")
-            else:
-                wx.MessageBox("書籍新增失敗，請檢查輸入資料", "錯誤", wx.OK | wx.ICON_ERROR)
+            self.async_db.then(self.async_db.write("add_book", book, validated=True),
+                               lambda success: self.on_book_added(book, success),
+                               self.on_db_error)
         
         dialog.Destroy()
     
+    def on_book_added(self, book, success):
+        """新增書籍完成 (在UI執行緒執行)"""
+        if success:
+            # 表格與統計已由書籍異動事件更新
+            wx.MessageBox("書籍新增成功!", "成功", wx.OK | wx.ICON_INFORMATION)
+            if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+                self.SetStatusText(f"成功新增書籍: {book.title}")
+        else:
+            wx.MessageBox("書籍新增失敗，請檢查輸入資料", "錯誤", wx.OK | wx.ICON_ERROR)
+    
     def on_edit_book(self, event):
         """編輯書籍事件處理"""
         book_id = self.get_selected_book_id()
@@ -372,25 +587,36 @@ class MainFrame(wx.Frame):
             wx.MessageBox("請先選擇要編輯的書籍", "提示", wx.OK | wx.ICON_INFORMATION)
             return
         
-        book = self.db_manager.get_book_by_id(book_id)
+        self.async_db.then(self.async_db.read("get_book_by_id", book_id),
+                           self.show_edit_dialog, self.on_db_error)
+    
+    def show_edit_dialog(self, book):
+        """讀取書籍完成後顯示編輯對話框 (在UI執行緒執行)"""
         if book is None:
             wx.MessageBox("找不到指定的書籍", "錯誤", wx.OK | wx.ICON_ERROR)
             return
         
+        from dialogs import BookFormDialog
         dialog = BookFormDialog(self, "編輯書籍", book)
         
         if dialog.ShowModal() == wx.ID_OK:
             updated_book = dialog.get_book()
-            if self.db_manager.update_book(updated_book):
-                wx.MessageBox("書籍更新成功!", "成功", wx.OK | wx.ICON_INFORMATION)
-                self.load_books()
-                if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
-                    self.SetStatusText(f"成功更新書籍: {updated_book.title}")
-            else:
-                wx.MessageBox("書籍更新失敗，請檢查輸入資料", "錯誤", wx.OK | wx.ICON_ERROR)
+            self.async_db.then(self.async_db.write("update_book", updated_book, validated=True),
+                               lambda success: self.on_book_updated(updated_book, success),
+                               self.on_db_error)
         
         dialog.Destroy()
     
+    def on_book_updated(self, book, success):
+        """更新書籍完成 (在UI執行緒執行)"""
+        if success:
+            # 表格與統計已由書籍異動事件更新
+            wx.MessageBox("書籍更新成功!", "成功", wx.OK | wx.ICON_INFORMATION)
+            if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+                self.SetStatusText(f"成功更新書籍: {book.title}")
+        else:
+            wx.MessageBox("書籍更新失敗，請檢查輸入資料", "錯誤", wx.OK | wx.ICON_ERROR)
+    
     def on_delete_book(self, event):
         """刪除書籍事件處理"""
         book_id = self.get_selected_book_id()
@@ -402,48 +628,174 @@ class MainFrame(wx.Frame):
         result = wx.MessageBox("確定要刪除選中的書籍嗎？", "確認刪除", wx.YES_NO | wx.ICON_QUESTION)
         
         if result == wx.YES:
-            if self.db_manager.delete_book(book_id):
-                wx.MessageBox("書籍刪除成功!", "成功", wx.OK | wx.ICON_INFORMATION)
-                self.load_books()
-                if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
-                    self.SetStatusText(f"已刪除書籍 (ID: {book_id})")
-            else:
-                wx.MessageBox("書籍刪除失敗", "錯誤", wx.OK | wx.ICON_ERROR)
+            self.async_db.then(self.async_db.write("delete_book", book_id),
+                               lambda success: self.on_book_deleted(book_id, success),
+                               self.on_db_error)
+    
+    def on_book_deleted(self, book_id, success):
+        """刪除書籍完成 (在UI執行緒執行)"""
+        if success:
+            # 表格與統計已由書籍異動事件更新
+            wx.MessageBox("書籍刪除成功!", "成功", wx.OK | wx.ICON_INFORMATION)
+            if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+                self.SetStatusText(f"已刪除書籍 (ID: {book_id})")
+        else:
+            wx.MessageBox("書籍刪除失敗", "錯誤", wx.OK | wx.ICON_ERROR)
     
     def on_export_books(self, event):
         """匯出書籍清單事件處理"""
-        # 選擇儲存位置
-        wildcard = "CSV files (*.csv)|*.csv"
+        from exporters import EXPORTERS
+        # 選擇儲存位置與格式 (檔案類型清單依匯出器註冊順序)
+        exporter_classes = list(EXPORTERS.values())
+        wildcard = "|".join(f"{cls.name} (*.{cls.extension})|*.{cls.extension}" for cls in exporter_classes)
         dialog = wx.FileDialog(self, "儲存書籍清單", wildcard=wildcard, style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
         
         if dialog.ShowModal() == wx.ID_OK:
-            file_path = dialog.GetPath()
-            
-            try:
-                books = self.db_manager.get_all_books()
-                
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    
-                    # 寫入標題行
-                    writer.writerow(['ID', '書名', '作者', '出版年份', '閱讀狀態', '評分'])
-                    
-                    # 寫入書籍資料
-                    for book in books:
-                        writer.writerow([
-                            book.id,
-                            book.title,
-                            book.author,
-                            book.year,
-                            book.status,
-                            book.rating
-                        ])
-                
-                wx.MessageBox(f"書籍清單已成功匯出到：\n{file_path}", "匯出成功", wx.OK | wx.ICON_INFORMATION)
-                if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
-                    self.SetStatusText(f"已匯出 {len(books)} 本書籍到 CSV 檔案")
-                
-            except Exception as e:
-                wx.MessageBox(f"匯出失敗：{str(e)}", "錯誤", wx.OK | wx.ICON_ERROR)
+            exporter_class = exporter_classes[dialog.GetFilterIndex()]
+            self.start_export(exporter_class(self.db_manager), dialog.GetPath())
         
         dialog.Destroy()
+    
+    def create_progress_dialog(self, title, message):
+        """
+        建立可取消的進度對話框
+        
+        Args:
+            title: 對話框標題
+            message: 初始訊息
+        
+        Returns:
+            tuple: (進度對話框, 取消事件, 更新函式 update(已完成, 總數, 訊息))
+        """
+        cancel_event = threading.Event()
+        progress_dialog = wx.ProgressDialog(
+            title, message, maximum=100, parent=self,
+            style=wx.PD_APP_MODAL | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME
+        )
+        
+        def update_progress(done, total, text):
+            # 對話框關閉後仍可能有排隊中的進度更新
+            if not progress_dialog:
+                return
+            percent = min(100, done * 100 // total) if total else 100
+            # 保留最後 1% 直到背景作業真正完成
+            keep_going, _ = progress_dialog.Update(min(percent, 99), text)
+            if not keep_going:
+                cancel_event.set()
+        
+        return progress_dialog, cancel_event, update_progress
+    
+    def start_export(self, exporter, file_path):
+        """
+        在背景執行匯出，並顯示可取消的進度對話框
+        
+        Args:
+            exporter: 匯出器
+            file_path: 目標檔案路徑
+        """
+        progress_dialog, cancel_event, update_progress = self.create_progress_dialog("匯出書籍清單", "正在匯出...")
+        
+        def finished(count):
+            progress_dialog.Destroy()
+            self.on_books_exported(file_path, exporter.name, count)
+        
+        def failed(error):
+            progress_dialog.Destroy()
+            from exporters import ExportCancelled
+            if isinstance(error, ExportCancelled):
+                if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+                    self.SetStatusText("已取消匯出")
+            else:
+                wx.MessageBox(f"匯出失敗：{str(error)}", "錯誤", wx.OK | wx.ICON_ERROR)
+        
+        future = self.async_db.run(
+            exporter.export, file_path,
+            progress=lambda done, total: self.call_after(
+                update_progress, done, total, f"已匯出 {done} / {total} {exporter.unit}"),
+            cancel_event=cancel_event
+        )
+        self.async_db.then(future, finished, failed)
+    
+    def on_books_exported(self, file_path, format_name, count):
+        """匯出完成 (在UI執行緒執行)"""
+        wx.MessageBox(f"書籍清單已成功匯出到：\n{file_path}", "匯出成功", wx.OK | wx.ICON_INFORMATION)
+        if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+            self.SetStatusText(f"已匯出 {count} 本書籍到 {format_name} 檔案")
+    
+    def on_import_books(self, event):
+        """匯入書籍清單事件處理"""
+        from importers import IMPORTERS, IMPORT_MODES
+        importer_classes = list(IMPORTERS.values())
+        wildcard = "|".join(f"{cls.format.upper()} files (*.{cls.extension})|*.{cls.extension}"
+                            for cls in importer_classes)
+        dialog = wx.FileDialog(self, "選擇要匯入的書籍清單", wildcard=wildcard,
+                               style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+        if dialog.ShowModal() != wx.ID_OK:
+            dialog.Destroy()
+            return
+        file_path = dialog.GetPath()
+        importer_class = importer_classes[dialog.GetFilterIndex()]
+        dialog.Destroy()
+        
+        # 選擇匯入模式
+        modes = list(IMPORT_MODES)
+        mode_dialog = wx.SingleChoiceDialog(self, "請選擇匯入模式:", "匯入書籍清單",
+                                            [IMPORT_MODES[mode] for mode in modes])
+        if mode_dialog.ShowModal() == wx.ID_OK:
+            self.start_import(importer_class(self.db_manager, modes[mode_dialog.GetSelection()]), file_path)
+        mode_dialog.Destroy()
+    
+    def start_import(self, importer, file_path):
+        """
+        在寫入執行緒執行匯入，並顯示可取消的進度對話框
+        
+        Args:
+            importer: 匯入器
+            file_path: CSV 檔案路徑
+        """
+        progress_dialog, cancel_event, update_progress = self.create_progress_dialog("匯入書籍清單", "正在匯入...")
+        
+        def finished(result):
+            progress_dialog.Destroy()
+            self.on_books_imported(result)
+        
+        def failed(error):
+            progress_dialog.Destroy()
+            wx.MessageBox(f"匯入失敗：{str(error)}", "錯誤", wx.OK | wx.ICON_ERROR)
+        
+        future = self.async_db.run(
+            importer.import_file, file_path,
+            progress=lambda done, total: self.call_after(
+                update_progress, done, total, f"已讀取 {done // 1024} / {total // 1024} KB"),
+            cancel_event=cancel_event,
+            write=True
+        )
+        self.async_db.then(future, finished, failed)
+    
+    def on_books_imported(self, result):
+        """匯入完成 (在UI執行緒執行，表格已由批次寫入的異動事件重新載入)"""
+        message = f"匯入完成：\n{result}"
+        if result.reject_path:
+            message += f"\n\n被拒絕的資料列已寫入：\n{result.reject_path}"
+        wx.MessageBox(message, "匯入結果", wx.OK | wx.ICON_INFORMATION)
+        if hasattr(self, 'GetStatusBar') and self.GetStatusBar():
+            self.SetStatusText(f"已匯入 {result.imported} 本書籍")
+    
+    def on_close(self, event):
+        """關閉視窗事件處理 (依序停止背景作業，最後關閉資料庫連線)"""
+        if self.search_timer is not None:
+            self.search_timer.Stop()
+        if self.live_search is not None:
+            self.live_search.close()
+        if self.change_feed is not None:
+            self.change_feed.close()
+        if self.db_manager is not None:
+            self.db_manager.unsubscribe(self.on_db_changes)
+        # 等待已提交的寫入與執行中的讀取完成後，才能關閉各執行緒的連線 (並讓 WAL 檔合併回資料庫)
+        self.async_db.shutdown(wait=True)
+        # 資料庫仍在開啟時關閉視窗：開啟已隨寫入執行緒完成，結果不會再交給 UI 執行緒，在此一併關閉
+        if self.db_manager is None and self._open_future.exception() is None:
+            self.db_manager = self._open_future.result()
+        if self.db_manager is not None:
+            self.db_manager.close()
+        self.Destroy()
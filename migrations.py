@@ -0,0 +1,345 @@
+"""
+資料庫結構遷移模組
+包含 Migration 與 Backfill 類別及依序套用的遷移清單，以 PRAGMA user_version 記錄目前結構版本
+
+結構變更 (DDL) 在短交易中完成；大量資料回填則按ID區段分批執行，
+每批各自提交並記錄進度，因此不會長時間鎖住資料庫，中斷後也能從上次進度繼續。
+"""
+
+import logging
+import sqlite3
+from typing import Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class Backfill:
+    """資料回填 - 以ID區段分批更新既有資料"""
+    
+    def __init__(self, table: str, sql: str, chunk_size: int = 5000):
+        """
+        初始化資料回填
+        
+        Args:
+            table: 要回填的資料表 (須以 id 為整數主鍵)
+            sql: 回填一個區段的 SQL，參數為 (起始ID(不含), 結束ID(含))
+            chunk_size: 每批處理的資料列數
+        """
+        self.table = table
+        self.sql = sql
+        self.chunk_size = chunk_size
+
+
+class Migration:
+    """單一結構遷移 - 依序執行的一組 SQL 敘述，可附帶分批資料回填"""
+    
+    def __init__(self, version: int, description: str,
+                 statements: List[Union[str, Callable[[sqlite3.Connection], None]]],
+                 backfill: Optional[Backfill] = None):
+        """
+        初始化結構遷移
+        
+        Args:
+            version: 遷移完成後的結構版本
+            description: 遷移說明
+            statements: 要執行的 SQL 敘述或函式 (應可重複執行，以相容舊版建立的資料庫)
+            backfill: 結構變更後要分批執行的資料回填
+        """
+        self.version = version
+        self.description = description
+        self.statements = statements
+        self.backfill = backfill
+    
+    def apply(self, conn: sqlite3.Connection):
+        """執行結構變更 (呼叫端負責交易)"""
+        for statement in self.statements:
+            if callable(statement):
+                statement(conn)
+            else:
+                conn.execute(statement)
+
+
+def add_column(table: str, column: str, declaration: str) -> Callable[[sqlite3.Connection], None]:
+    """
+    產生「欄位不存在時才新增」的遷移步驟 (ALTER TABLE ADD COLUMN 本身不可重複執行)
+    
+    Args:
+        table: 資料表名稱
+        column: 欄位名稱
+        declaration: 欄位型別與約束
+    
+    Returns:
+        Callable: 遷移步驟
+    """
+    def step(conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    return step
+
+
+NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+MIGRATIONS = [
+    Migration(1, "建立 books 表格", [
+        '''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            status TEXT DEFAULT '未讀',
+            rating INTEGER DEFAULT 0
+        )
+        ''',
+    ]),
+    # 狀態計數表：由觸發器隨寫入增量維護，統計列不需掃描 books 表格
+    Migration(2, "建立閱讀狀態計數表", [
+        '''
+        CREATE TABLE IF NOT EXISTS book_status_counts (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        'DELETE FROM book_status_counts',
+        '''
+        INSERT INTO book_status_counts (status, count)
+        SELECT IFNULL(status, ''), COUNT(*) FROM books GROUP BY IFNULL(status, '')
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS book_status_counts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO book_status_counts (status, count) VALUES (IFNULL(new.status, ''), 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS book_status_counts_ad AFTER DELETE ON books BEGIN
+            UPDATE book_status_counts SET count = count - 1 WHERE status = IFNULL(old.status, '');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS book_status_counts_au AFTER UPDATE OF status ON books
+        WHEN old.status IS NOT new.status BEGIN
+            UPDATE book_status_counts SET count = count - 1 WHERE status = IFNULL(old.status, '');
+            INSERT INTO book_status_counts (status, count) VALUES (IFNULL(new.status, ''), 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+    ]),
+    # 篩選與排序用的次要索引 (每個索引最後都隱含 id，可直接用於 keyset 分頁)
+    Migration(3, "建立篩選與排序索引", [
+        'DROP INDEX IF EXISTS idx_books_status',
+        'CREATE INDEX IF NOT EXISTS idx_books_status_id ON books (status, id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_author ON books (author COLLATE NOCASE)',
+        'CREATE INDEX IF NOT EXISTS idx_books_title ON books (title)',
+        'CREATE INDEX IF NOT EXISTS idx_books_year ON books (year)',
+        'CREATE INDEX IF NOT EXISTS idx_books_rating ON books (rating)',
+    ]),
+    # 建立/更新時間 (Unix 時間戳記)；新資料由觸發器填入，既有資料分批回填
+    Migration(4, "新增建立與更新時間欄位", [
+        add_column('books', 'created_at', 'INTEGER'),
+        add_column('books', 'updated_at', 'INTEGER'),
+        f'''
+        CREATE TRIGGER IF NOT EXISTS books_timestamps_ai AFTER INSERT ON books
+        WHEN new.created_at IS NULL BEGIN
+            UPDATE books SET created_at = {NOW}, updated_at = {NOW} WHERE id = new.id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS books_timestamps_au AFTER UPDATE OF title, author, year, status, rating ON books
+        BEGIN
+            UPDATE books SET updated_at = {NOW} WHERE id = new.id;
+        END
+        ''',
+    ], backfill=Backfill('books', f'''
+        UPDATE books SET created_at = {NOW}, updated_at = {NOW}
+        WHERE id > ? AND id <= ? AND created_at IS NULL
+    ''')),
+    # 異動紀錄表：由觸發器記錄每次新增/修改/刪除 (I/U/D) 與原本的閱讀狀態，
+    # 其他連線或行程只需讀取某個序號之後的紀錄即可同步，不必重新掃描 books 表格
+    Migration(5, "建立書籍異動紀錄表", [
+        '''
+        CREATE TABLE IF NOT EXISTS book_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            old_status TEXT,
+            changed_at INTEGER NOT NULL
+        )
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS book_changes_ai AFTER INSERT ON books BEGIN
+            INSERT INTO book_changes (book_id, op, changed_at) VALUES (new.id, 'I', {NOW});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS book_changes_au AFTER UPDATE OF title, author, year, status, rating ON books
+        BEGIN
+            INSERT INTO book_changes (book_id, op, old_status, changed_at) VALUES (old.id, 'U', old.status, {NOW});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS book_changes_ad AFTER DELETE ON books BEGIN
+            INSERT INTO book_changes (book_id, op, old_status, changed_at) VALUES (old.id, 'D', old.status, {NOW});
+        END
+        ''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# progress(說明, 已完成筆數, 總筆數)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """讀取資料庫目前的結構版本 (PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _ensure_progress_table(conn: sqlite3.Connection):
+    """建立記錄回填進度的資料表"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_backfill_progress (
+            version INTEGER PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+
+def pending_backfills(conn: sqlite3.Connection) -> List[int]:
+    """
+    列出尚未完成回填的遷移版本
+    
+    Args:
+        conn: 資料庫連線
+    
+    Returns:
+        List[int]: 遷移版本
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'schema_backfill_progress'"
+    ).fetchone()
+    if not exists:
+        return []
+    return [row[0] for row in conn.execute("SELECT version FROM schema_backfill_progress ORDER BY version")]
+
+
+def apply_schema(conn: sqlite3.Connection) -> List[Migration]:
+    """
+    套用尚未執行的結構變更，每個遷移各自一個短交易 (連線須為 autocommit 模式)
+    
+    有回填的遷移會登記回填進度，實際回填由 run_backfills 分批執行。
+    
+    Args:
+        conn: 資料庫連線
+    
+    Returns:
+        List[Migration]: 本次套用的遷移
+    """
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return []
+    
+    applied = []
+    for migration in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 取得寫入鎖後再確認版本，避免多個行程重複套用
+            if migration.version <= get_schema_version(conn):
+                conn.execute("COMMIT")
+                continue
+            migration.apply(conn)
+            if migration.backfill is not None:
+                _ensure_progress_table(conn)
+                conn.execute("INSERT OR IGNORE INTO schema_backfill_progress (version) VALUES (?)",
+                             (migration.version,))
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        applied.append(migration)
+        logger.info("已套用資料庫遷移 %s: %s", migration.version, migration.description)
+    return applied
+
+
+def run_backfills(conn: sqlite3.Connection, progress: Optional[ProgressCallback] = None,
+                  chunk_size: Optional[int] = None) -> int:
+    """
+    分批執行尚未完成的資料回填 (連線須為 autocommit 模式)
+    
+    每一批在獨立交易中更新一段ID區間並記錄進度，其他連線可在批次之間讀寫；
+    若執行中斷，下次呼叫會從最後提交的進度繼續。
+    
+    Args:
+        conn: 資料庫連線
+        progress: 進度回呼 progress(說明, 已完成筆數, 總筆數)
+        chunk_size: 每批筆數 (None 表示使用各回填的預設值)
+    
+    Returns:
+        int: 本次回填處理的資料列數
+    """
+    migrations = {migration.version: migration for migration in MIGRATIONS}
+    processed = 0
+    for version in pending_backfills(conn):
+        migration = migrations.get(version)
+        if migration is None or migration.backfill is None:
+            conn.execute("DELETE FROM schema_backfill_progress WHERE version = ?", (version,))
+            continue
+        
+        backfill = migration.backfill
+        size = chunk_size or backfill.chunk_size
+        last_id = conn.execute("SELECT last_id FROM schema_backfill_progress WHERE version = ?",
+                               (version,)).fetchone()[0]
+        total = conn.execute(f"SELECT COUNT(*) FROM {backfill.table} WHERE id > ?", (last_id,)).fetchone()[0]
+        done = 0
+        if progress:
+            progress(migration.description, done, total)
+        
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM {backfill.table} WHERE id > ? ORDER BY id LIMIT ?)",
+                    (last_id, size)
+                ).fetchone()
+                upper, count = row
+                if upper is None:
+                    conn.execute("DELETE FROM schema_backfill_progress WHERE version = ?", (version,))
+                    conn.execute("COMMIT")
+                    break
+                conn.execute(backfill.sql, (last_id, upper))
+                conn.execute("UPDATE schema_backfill_progress SET last_id = ? WHERE version = ?", (upper, version))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            
+            last_id = upper
+            done += count
+            processed += count
+            if progress:
+                progress(migration.description, done, max(total, done))
+        
+        if done:
+            logger.info("已完成資料回填 %s: %s (%s 筆)", migration.version, migration.description, done)
+    return processed
+
+
+def migrate(conn: sqlite3.Connection, progress: Optional[ProgressCallback] = None,
+            run_backfill: bool = True) -> List[Migration]:
+    """
+    套用所有尚未執行的遷移，並 (預設) 完成所有資料回填
+    
+    Args:
+        conn: 資料庫連線 (須為 autocommit 模式)
+        progress: 回填進度回呼
+        run_backfill: 是否立即執行資料回填 (False 時可稍後呼叫 run_backfills)
+    
+    Returns:
+        List[Migration]: 本次套用的遷移
+    """
+    applied = apply_schema(conn)
+    if run_backfill:
+        run_backfills(conn, progress)
+    return applied
@@ -1,14 +1,37 @@
 """
 書籍模型模組
-包含 Book 類別的定義和相關方法
+包含 Book 類別的定義和相關方法，以及以欄位陣列存放多本書籍的 BookBatch 類別
 """
 
-from typing import Tuple
+import sys
+from array import array
+from typing import Iterable, Iterator, List, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # NumPy 為選用套件，未安裝時以純 Python 檢查整數欄位
+    numpy = None
+
+# 閱讀狀態 (顯示順序) 與驗證用的集合
+STATUS_CHOICES = ("未讀", "閱讀中", "已讀")
+VALID_STATUSES = frozenset(STATUS_CHOICES)
+
+MIN_YEAR, MAX_YEAR = 0, 2025
+MIN_RATING, MAX_RATING = 0, 5
+
+ERROR_TITLE = "書名不能為空"
+ERROR_AUTHOR = "作者不能為空"
+ERROR_YEAR = f"出版年份必須是有效的數字({MIN_YEAR}-{MAX_YEAR})"
+ERROR_STATUS = f"閱讀狀態必須是：{'、'.join(STATUS_CHOICES)} 其中之一"
+ERROR_RATING = f"評分必須是{MIN_RATING}-{MAX_RATING}之間的整數"
 
 
 class Book:
     """書籍類別 - 定義書籍物件的屬性和方法"""
     
+    # 固定屬性，不建立 __dict__ (大量書籍時節省記憶體)
+    __slots__ = ("id", "title", "author", "year", "status", "rating")
+    
     def __init__(self, title: str, author: str, year: int, status: str = "未讀", rating: int = 0, book_id: int = None):
         """
         初始化書籍物件
@@ -28,6 +51,21 @@ class Book:
         self.status = status
         self.rating = rating
     
+    @classmethod
+    def from_row(cls, row: tuple) -> "Book":
+        """
+        由資料庫資料列建立書籍物件
+        
+        Args:
+            row: (id, title, author, year, status, rating) 資料列
+        
+        Returns:
+            Book: 書籍物件
+        """
+        book = cls.__new__(cls)
+        book.id, book.title, book.author, book.year, book.status, book.rating = row
+        return book
+    
     def validate(self) -> Tuple[bool, str]:
         """
         驗證書籍資料的有效性
@@ -36,19 +74,19 @@ class Book:
             Tuple[bool, str]: (是否有效, 錯誤訊息)
         """
         if not self.title.strip():
-            return False, "書名不能為空"
+            return False, ERROR_TITLE
         
         if not self.author.strip():
-            return False, "作者不能為空"
+            return False, ERROR_AUTHOR
         
-        if not isinstance(self.year, int) or self.year < 0 or self.year > 2025:
-            return False, "出版年份必須是有效的數字(0-2025)"
+        if not isinstance(self.year, int) or self.year < MIN_YEAR or self.year > MAX_YEAR:
+            return False, ERROR_YEAR
         
-        if self.status not in ["未讀", "閱讀中", "已讀"]:
-            return False, "閱讀狀態必須是：未讀、閱讀中、已讀 其中之一"
+        if self.status not in VALID_STATUSES:
+            return False, ERROR_STATUS
         
-        if not isinstance(self.rating, int) or self.rating < 0 or self.rating > 5:
-            return False, "評分必須是0-5之間的整數"
+        if not isinstance(self.rating, int) or self.rating < MIN_RATING or self.rating > MAX_RATING:
+            return False, ERROR_RATING
         
         return True, ""
     
@@ -66,3 +104,195 @@ class Book:
     def __str__(self) -> str:
         """字串表示法"""
         return f"《{self.title}》- {self.author} ({self.year}) [{self.status}] {self.rating}★"
+
+
+def book_row_factory(cursor, row: tuple) -> Book:
+    """sqlite3 的 row_factory：查詢 (id, title, author, year, status, rating) 時直接產生書籍物件"""
+    return Book.from_row(row)
+
+
+def _intern(value):
+    """共用相同的字串物件 (閱讀狀態只有少數幾種值)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _extend_column(column: Union[array, list], values: tuple) -> Union[array, list]:
+    """
+    附加整數欄位的值；整數陣列放不下 (超出範圍或不是整數，例如 None) 時改用串列，
+    讓 validate_batch 逐列回報錯誤，而不是在建立批次時就拋出例外
+    
+    Args:
+        column: 目前的欄位 (整數陣列或串列)
+        values: 要附加的值
+    
+    Returns:
+        Union[array, list]: 附加後的欄位 (可能是新的串列)
+    """
+    if isinstance(column, array):
+        try:
+            # 先轉為暫時的陣列，失敗時原本的欄位不會只附加一部分
+            column.extend(array(column.typecode, values))
+            return column
+        except (OverflowError, TypeError):
+            column = column.tolist()
+    column.extend(values)
+    return column
+
+
+class BookBatch:
+    """書籍批次 - 以欄位陣列存放多本書籍，需要時才建立個別的書籍物件
+    
+    ids 以 0 表示尚未存入資料庫的書籍 (資料庫配發的ID從 1 開始)，轉回書籍物件時還原為 None。
+    years 與 ratings 含有整數陣列放不下的值時改以串列存放 (由 validate_batch 回報錯誤)。
+    """
+    
+    __slots__ = ("ids", "titles", "authors", "years", "statuses", "ratings")
+    
+    def __init__(self):
+        """初始化空的書籍批次"""
+        self.ids = array('q')
+        self.titles: List[str] = []
+        self.authors: List[str] = []
+        self.years = array('i')
+        self.statuses: List[str] = []
+        self.ratings = array('b')
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "BookBatch":
+        """
+        由資料庫資料列建立書籍批次
+        
+        Args:
+            rows: (id, title, author, year, status, rating) 資料列
+        
+        Returns:
+            BookBatch: 書籍批次
+        """
+        batch = cls()
+        batch.extend_rows(rows)
+        return batch
+    
+    @classmethod
+    def from_books(cls, books: Iterable[Book]) -> "BookBatch":
+        """由書籍物件建立書籍批次"""
+        return cls.from_rows((book.id, book.title, book.author, book.year, book.status, book.rating)
+                             for book in books)
+    
+    def extend_rows(self, rows: Iterable[tuple]):
+        """
+        附加資料列
+        
+        Args:
+            rows: (id, title, author, year, status, rating) 資料列
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        ids, titles, authors, years, statuses, ratings = zip(*rows)
+        self.ids.extend(0 if book_id is None else book_id for book_id in ids)
+        self.titles.extend(titles)
+        self.authors.extend(authors)
+        self.years = _extend_column(self.years, years)
+        self.statuses.extend(map(_intern, statuses))
+        self.ratings = _extend_column(self.ratings, ratings)
+    
+    def row(self, index: int) -> tuple:
+        """獲取指定位置的資料列 (id, title, author, year, status, rating)"""
+        return (self.ids[index] or None, self.titles[index], self.authors[index],
+                self.years[index], self.statuses[index], self.ratings[index])
+    
+    def rows(self) -> Iterator[tuple]:
+        """逐一產生資料列"""
+        ids = (book_id or None for book_id in self.ids)
+        return zip(ids, self.titles, self.authors, self.years, self.statuses, self.ratings)
+    
+    def to_books(self) -> List[Book]:
+        """轉換為書籍物件串列"""
+        return [Book.from_row(row) for row in self.rows()]
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: int) -> Book:
+        return Book.from_row(self.row(index))
+    
+    def __iter__(self) -> Iterator[Book]:
+        return map(Book.from_row, self.rows())
+
+
+# 每個欄位先以內建函式 (C 迴圈) 檢查整欄，只有整欄不合格時才逐一找出錯誤位置
+
+def _blank_indexes(values) -> List[int]:
+    """找出空白或不是字串的位置"""
+    try:
+        if all(map(str.strip, values)):
+            return []
+    except TypeError:
+        pass
+    return [i for i, value in enumerate(values) if not isinstance(value, str) or not value.strip()]
+
+
+def _out_of_range_indexes(values, low: int, high: int) -> List[int]:
+    """找出不是整數或超出範圍的位置 (整數陣列且有 NumPy 時一次比較整個欄位)"""
+    if len(values) == 0:
+        return []
+    if isinstance(values, array):
+        if numpy is not None:
+            column = numpy.frombuffer(values, dtype=values.typecode)
+            return numpy.flatnonzero((column < low) | (column > high)).tolist()
+        if low <= min(values) and max(values) <= high:
+            return []
+        return [i for i, value in enumerate(values) if not low <= value <= high]
+    if set(map(type, values)) <= {int, bool} and low <= min(values) and max(values) <= high:
+        return []
+    return [i for i, value in enumerate(values)
+            if not isinstance(value, int) or not low <= value <= high]
+
+
+def _invalid_status_indexes(statuses) -> List[int]:
+    """找出不是有效閱讀狀態的位置"""
+    try:
+        if VALID_STATUSES.issuperset(statuses):
+            return []
+    except TypeError:
+        pass
+    return [i for i, status in enumerate(statuses) if status not in VALID_STATUSES]
+
+
+def validate_batch(books: Union[BookBatch, Iterable[Book]]) -> Tuple[bytearray, List[str]]:
+    """
+    整批驗證書籍資料 (逐欄位檢查，結果與逐本呼叫 Book.validate 相同)
+    
+    Args:
+        books: 書籍批次或書籍物件
+    
+    Returns:
+        Tuple[bytearray, List[str]]: (錯誤遮罩：無效為 1, 每本書的錯誤訊息：有效為空字串)
+    """
+    if isinstance(books, BookBatch):
+        titles, authors, years, statuses, ratings = (
+            books.titles, books.authors, books.years, books.statuses, books.ratings)
+    else:
+        books = list(books)
+        titles = [book.title for book in books]
+        authors = [book.author for book in books]
+        years = [book.year for book in books]
+        statuses = [book.status for book in books]
+        ratings = [book.rating for book in books]
+    
+    mask = bytearray(len(titles))
+    messages = [""] * len(titles)
+    checks = (
+        (_blank_indexes(titles), ERROR_TITLE),
+        (_blank_indexes(authors), ERROR_AUTHOR),
+        (_out_of_range_indexes(years, MIN_YEAR, MAX_YEAR), ERROR_YEAR),
+        (_invalid_status_indexes(statuses), ERROR_STATUS),
+        (_out_of_range_indexes(ratings, MIN_RATING, MAX_RATING), ERROR_RATING),
+    )
+    # 依 Book.validate 的檢查順序，每本書只記錄第一個錯誤
+    for indexes, message in checks:
+        for i in indexes:
+            if not mask[i]:
+                mask[i] = 1
+                messages[i] = message
+    return mask, messages
@@ -0,0 +1,441 @@
+"""
+伺服器模組
+包含 BookServer 類別，以 asyncio (只用標準函式庫) 在本機提供書籍收藏的 HTTP/JSON API
+
+讀取在 AsyncDatabase 的讀取執行緒池執行 (每個執行緒一條 WAL 連線，讀取之間不互相阻擋)，
+寫入全部交給單一寫入執行緒依序執行，因此大量同時讀取時不會出現 "database is locked"。
+GET 回應附帶 ETag (異動紀錄的最新序號)，帶 If-None-Match 且資料未變更時回傳 304，不執行查詢。
+
+用法: python server.py [--db 資料庫] [--host 127.0.0.1] [--port 8080] [--readers 4]
+    GET    /books?after_id=&after_value=&limit=&order_by=&status=...
+                                                           分頁列出書籍 (keyset 分頁)
+    GET    /books/{id}                                     獲取一本書籍
+    POST   /books                                          新增書籍 (JSON)
+    PUT    /books/{id}                                     更新書籍 (JSON)
+    DELETE /books/{id}                                     刪除書籍
+    GET    /search?q=關鍵字&limit=                          搜尋書籍
+    GET    /stats                                          統計資訊
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+import time
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+from async_db import AsyncDatabase
+from database import DEFAULT_PAGE_SIZE, PAGE_FILTERS, DatabaseManager
+from models import Book
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_READERS = 4
+# 請求本文與分頁筆數的上限
+MAX_BODY_SIZE = 1024 * 1024
+MAX_PAGE_SIZE = 1000
+# 標頭讀取逾時與閒置連線 (keep-alive) 逾時 (秒)
+REQUEST_TIMEOUT = 30.0
+
+# 數值型的篩選條件與排序欄位 (查詢字串中的值需轉為整數)
+INT_FILTERS = frozenset({"year", "min_year", "max_year", "min_rating", "max_rating"})
+INT_ORDER_COLUMNS = frozenset({"year", "rating"})
+
+
+class HTTPError(Exception):
+    """回傳給用戶端的錯誤 (狀態碼與訊息)"""
+    
+    def __init__(self, status: HTTPStatus, message: str = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.message = message or status.phrase
+
+
+class Request:
+    """HTTP 請求"""
+    
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes = b""):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        url = urlsplit(target)
+        self.path = unquote(url.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+    
+    def json(self) -> dict:
+        """解析 JSON 本文"""
+        try:
+            data = json.loads(self.body.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"JSON 格式錯誤: {e}")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "本文必須是 JSON 物件")
+        return data
+    
+    def int_param(self, name: str, default: Optional[int] = None) -> Optional[int]:
+        """讀取整數查詢參數"""
+        value = self.query.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"參數 {name} 必須是整數")
+
+
+class Response:
+    """HTTP 回應 (本文為 JSON)"""
+    
+    def __init__(self, status: HTTPStatus = HTTPStatus.OK, payload=None, headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.payload = payload
+        self.headers = headers or {}
+    
+    def encode(self, keep_alive: bool, head_only: bool = False) -> bytes:
+        """轉為 HTTP/1.1 回應位元組"""
+        body = b""
+        headers = dict(self.headers)
+        if self.payload is not None:
+            body = json.dumps(self.payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            headers["Content-Type"] = "application/json; charset=utf-8"
+        if self.status not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+            headers["Content-Length"] = str(len(body))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        
+        lines = [f"HTTP/1.1 {self.status.value} {self.status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if head_only or self.status in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+            return head
+        return head + body
+
+
+def _json_field(data: dict, name: str, kind: type, default=None):
+    """
+    讀取 JSON 欄位並檢查型別 (不做轉換：null、浮點數與布林值都視為錯誤)
+    
+    Args:
+        data: JSON 物件
+        name: 欄位名稱
+        kind: 欄位型別 (str 或 int)
+        default: 欄位不存在時的預設值 (None 表示必填)
+    
+    Returns:
+        欄位值
+    """
+    if name not in data:
+        if default is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"缺少欄位 {name}")
+        return default
+    value = data[name]
+    # bool 是 int 的子類別，需另外排除
+    if not isinstance(value, kind) or isinstance(value, bool):
+        type_name = "字串" if kind is str else "整數"
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"欄位 {name} 必須是{type_name}")
+    return value
+
+
+def book_from_json(data: dict, book_id: Optional[int] = None) -> Book:
+    """由 JSON 物件建立書籍並驗證 (欄位與 Book.to_dict 相同；型別錯誤為 400，內容不合法為 422)"""
+    book = Book(
+        title=_json_field(data, "title", str).strip(),
+        author=_json_field(data, "author", str).strip(),
+        year=_json_field(data, "year", int),
+        status=_json_field(data, "status", str, "未讀"),
+        rating=_json_field(data, "rating", int, 0),
+        book_id=book_id,
+    )
+    is_valid, error_msg = book.validate()
+    if not is_valid:
+        raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, error_msg)
+    return book
+
+
+class BookServer:
+    """書籍收藏 HTTP/JSON 伺服器 - 讀取走執行緒池，寫入由單一寫入執行緒依序執行"""
+    
+    def __init__(self, db_manager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 readers: int = DEFAULT_READERS):
+        """
+        初始化伺服器
+        
+        Args:
+            db_manager: 資料庫管理器 (每個執行緒使用自己的連線)
+            host: 監聽位址 (預設只接受本機連線)
+            port: 監聽埠號 (0 表示自動選擇)
+            readers: 讀取執行緒數量 (同時執行的讀取查詢上限)
+        """
+        self.db_manager = db_manager
+        self.host = host
+        self.port = port
+        self.async_db = AsyncDatabase(db_manager, readers=readers)
+        # ETag 前綴：資料庫檔案被整個替換後序號可能重來，重新啟動伺服器即使舊的 ETag 失效
+        self.etag_prefix = format(int(time.time()), "x")
+        self.server = None
+        self.routes: List[Tuple[str, re.Pattern, Callable]] = [
+            ("GET", re.compile(r"/books"), self.list_books),
+            ("POST", re.compile(r"/books"), self.create_book),
+            ("GET", re.compile(r"/books/(\d+)"), self.get_book),
+            ("PUT", re.compile(r"/books/(\d+)"), self.update_book),
+            ("DELETE", re.compile(r"/books/(\d+)"), self.delete_book),
+            ("GET", re.compile(r"/search"), self.search_books),
+            ("GET", re.compile(r"/stats"), self.get_stats),
+        ]
+    
+    async def start(self):
+        """開始監聽 (port 為 0 時實際埠號會寫回 self.port)"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("書籍收藏伺服器已啟動: http://%s:%s", self.host, self.port)
+    
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+    
+    async def close(self):
+        """停止接受連線並等待已提交的寫入完成"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await asyncio.get_running_loop().run_in_executor(None, self.async_db.shutdown)
+    
+    async def read(self, func: Callable, *args):
+        """在讀取執行緒池執行函式"""
+        return await asyncio.wrap_future(self.async_db.run(func, *args))
+    
+    async def write(self, func: Callable, *args):
+        """在寫入執行緒執行函式 (所有寫入依提交順序執行)"""
+        return await asyncio.wrap_future(self.async_db.run(func, *args, write=True))
+    
+    def etag(self, version: int) -> str:
+        return f'W/"{self.etag_prefix}-{version}"'
+    
+    async def conditional_read(self, request: Request, query: Callable) -> Response:
+        """
+        執行可快取的讀取：異動序號與查詢在同一個讀取交易中執行，ETag 與資料一致
+        
+        Args:
+            request: 請求 (If-None-Match 與目前序號相符時不執行查詢)
+            query: 在讀取執行緒呼叫 query()，回傳 JSON 資料；回傳 None 表示 404
+        
+        Returns:
+            Response: 200 (附 ETag)、304 或 404
+        """
+        if_none_match = request.headers.get("if-none-match")
+        
+        def run():
+            with self.db_manager.read_snapshot():
+                etag = self.etag(self.db_manager.get_change_version())
+                if if_none_match is not None and etag in (tag.strip() for tag in if_none_match.split(",")):
+                    return etag, None, True
+                return etag, query(), False
+        
+        etag, payload, not_modified = await self.read(run)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if not_modified:
+            return Response(HTTPStatus.NOT_MODIFIED, headers=headers)
+        if payload is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "找不到指定的書籍")
+        return Response(HTTPStatus.OK, payload, headers)
+    
+    async def list_books(self, request: Request) -> Response:
+        after_id = request.int_param("after_id")
+        limit = min(request.int_param("limit", DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit 必須大於 0")
+        order_by = request.query.get("order_by", "id")
+        after_value = (request.int_param("after_value") if order_by in INT_ORDER_COLUMNS
+                       else request.query.get("after_value"))
+        filters = {key: (request.int_param(key) if key in INT_FILTERS else request.query[key])
+                   for key in PAGE_FILTERS if key in request.query}
+        
+        def query():
+            books = self.db_manager.get_books_page(after_id, limit, order_by, filters, after_value)
+            # 下一頁的游標 (ID 與排序值)；不足一頁表示已是最後一頁
+            if len(books) == limit:
+                next_after_id, next_after_value = books[-1].id, getattr(books[-1], order_by)
+            else:
+                next_after_id = next_after_value = None
+            return {"books": [book.to_dict() for book in books],
+                    "next_after_id": next_after_id, "next_after_value": next_after_value}
+        
+        try:
+            return await self.conditional_read(request, query)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+    
+    async def get_book(self, request: Request, book_id: str) -> Response:
+        def query():
+            book = self.db_manager.get_book_by_id(int(book_id))
+            return book.to_dict() if book is not None else None
+        return await self.conditional_read(request, query)
+    
+    async def search_books(self, request: Request) -> Response:
+        keyword = request.query.get("q", "").strip()
+        if not keyword:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "缺少搜尋關鍵字 q")
+        limit = request.int_param("limit")
+        
+        def query():
+            books = self.db_manager.search_books(keyword, limit=limit)
+            return {"books": [book.to_dict() for book in books]}
+        return await self.conditional_read(request, query)
+    
+    async def get_stats(self, request: Request) -> Response:
+        return await self.conditional_read(request, self.db_manager.get_statistics)
+    
+    async def create_book(self, request: Request) -> Response:
+        book = book_from_json(request.json())
+        if not await self.write(self.db_manager.add_book, book, True):
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "新增書籍失敗")
+        return Response(HTTPStatus.CREATED, book.to_dict(), {"Location": f"/books/{book.id}"})
+    
+    async def update_book(self, request: Request, book_id: str) -> Response:
+        book = book_from_json(request.json(), int(book_id))
+        
+        def update():
+            # 在寫入執行緒先確認書籍存在，與更新之間不會有其他寫入
+            if self.db_manager.get_book_by_id(book.id) is None:
+                return None
+            return self.db_manager.update_book(book, validated=True)
+        
+        result = await self.write(update)
+        if result is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "找不到指定的書籍")
+        if not result:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "更新書籍失敗")
+        return Response(HTTPStatus.OK, book.to_dict())
+    
+    async def delete_book(self, request: Request, book_id: str) -> Response:
+        def delete():
+            # 與 update_book 相同：先在寫入執行緒確認書籍存在，其餘失敗為伺服器錯誤
+            if self.db_manager.get_book_by_id(int(book_id)) is None:
+                return None
+            return self.db_manager.delete_book(int(book_id))
+        
+        result = await self.write(delete)
+        if result is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "找不到指定的書籍")
+        if not result:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "刪除書籍失敗")
+        return Response(HTTPStatus.NO_CONTENT)
+    
+    async def dispatch(self, request: Request) -> Response:
+        """依路徑與方法呼叫處理函式 (HEAD 視為 GET)"""
+        method = "GET" if request.method == "HEAD" else request.method
+        allowed = []
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(request.path.rstrip("/") or "/")
+            if match is None:
+                continue
+            if route_method == method:
+                return await handler(request, *match.groups())
+            allowed.append(route_method)
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"此路徑只支援 {', '.join(allowed)}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"找不到路徑 {request.path}")
+    
+    async def read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        """讀取一個請求 (連線關閉時回傳 None)"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "請求行格式錯誤")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        
+        if "transfer-encoding" in headers:
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "不支援分塊傳輸，請提供 Content-Length")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length 格式錯誤")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, version, headers, body)
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """處理一條連線 (支援 keep-alive，依序處理同一連線上的請求)"""
+        try:
+            while True:
+                keep_alive = False
+                head_only = False
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    keep_alive = request.keep_alive
+                    head_only = request.method == "HEAD"
+                    response = await self.dispatch(request)
+                except HTTPError as e:
+                    response = Response(e.status, {"error": e.message})
+                except Exception as e:
+                    logger.exception("處理請求失敗: %s", e)
+                    response = Response(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "伺服器內部錯誤"})
+                
+                writer.write(response.encode(keep_alive, head_only))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(db_path: str, host: str, port: int, readers: int):
+    """開啟資料庫並執行伺服器直到被中斷"""
+    with DatabaseManager(db_path) as db_manager:
+        server = BookServer(db_manager, host, port, readers)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+
+def main(argv=None) -> int:
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="書籍收藏 HTTP/JSON 伺服器")
+    parser.add_argument("--db", default="books.db", help="資料庫檔案路徑")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="監聽位址 (預設只接受本機連線)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="監聽埠號")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="讀取執行緒數量")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
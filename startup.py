@@ -0,0 +1,57 @@
+"""
+啟動計時模組
+包含 StartupProfile 類別，記錄程式啟動各階段的耗時 (不依賴 wx)
+"""
+
+import sys
+import time
+from typing import List, Tuple
+
+
+class StartupProfile:
+    """啟動計時 - 依序記錄各階段完成的時間點，啟動完成後可輸出耗時明細"""
+    
+    def __init__(self, enabled: bool = False):
+        """
+        初始化啟動計時 (建立時開始計時)
+        
+        Args:
+            enabled: 啟動完成時是否輸出耗時明細 (未啟用時仍會記錄)
+        """
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []  # (階段名稱, 距開始的秒數)
+        self.finished = False
+    
+    def mark(self, phase: str):
+        """
+        記錄一個階段完成
+        
+        Args:
+            phase: 階段名稱
+        """
+        if not self.finished:
+            self.phases.append((phase, time.perf_counter() - self.start))
+    
+    def finish(self, phase: str = "啟動完成"):
+        """記錄最後一個階段並 (啟用時) 輸出耗時明細；之後的呼叫會被忽略"""
+        if self.finished:
+            return
+        self.mark(phase)
+        self.finished = True
+        if self.enabled:
+            print(self.report(), file=sys.stderr)
+    
+    def report(self) -> str:
+        """
+        產生耗時明細
+        
+        Returns:
+            str: 每個階段的耗時與累計時間 (毫秒)
+        """
+        lines = ["啟動階段耗時:"]
+        previous = 0.0
+        for phase, elapsed in self.phases:
+            lines.append(f"  {phase:<16} {(elapsed - previous) * 1000:8.1f} ms  (累計 {elapsed * 1000:8.1f} ms)")
+            previous = elapsed
+        return "\n".join(lines)
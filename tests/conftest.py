@@ -0,0 +1,42 @@
+"""
+測試共用設定
+將專案根目錄加入模組搜尋路徑，並提供暫存資料庫
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager  # noqa: E402
+from models import Book  # noqa: E402
+
+SAMPLE_BOOKS = [
+    ("三體", "劉慈欣", 2008, "已讀", 5),
+    ("流浪地球", "劉慈欣", 2000, "未讀", 4),
+    ("Dune", "Frank Herbert", 1965, "閱讀中", 5),
+    ("dune messiah", "frank herbert", 1969, "未讀", 0),
+    ("Neuromancer", "William Gibson", 1984, "已讀", 4),
+    ("Foundation", "Isaac Asimov", 1951, "已讀", 3),
+    ("I, Robot", "isaac asimov", 1950, "未讀", 0),
+    ("百年孤寂", "馬奎斯", 1967, "閱讀中", 5),
+    ("Solaris", "Stanisław Lem", 1961, "未讀", 2),
+    ("The Left Hand of Darkness", "Ursula K. Le Guin", 1969, "已讀", 5),
+]
+
+
+def make_library(path, books=SAMPLE_BOOKS):
+    """建立含範例書籍的資料庫並回傳 DatabaseManager"""
+    db_manager = DatabaseManager(str(path))
+    for title, author, year, status, rating in books:
+        assert db_manager.add_book(Book(title, author, year, status, rating))
+    return db_manager
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_manager = make_library(tmp_path / "books.db")
+    yield db_manager
+    db_manager.close()
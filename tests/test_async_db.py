@@ -0,0 +1,80 @@
+"""非同步資料存取層測試"""
+
+import logging
+import threading
+
+import pytest
+
+from async_db import AsyncDatabase
+from database import DatabaseManager
+
+
+@pytest.mark.parametrize("method", sorted(AsyncDatabase.WRITE_METHODS))
+def test_write_methods_exist(method):
+    assert callable(getattr(DatabaseManager, method))
+
+
+def test_upsert_books_runs_on_writer_thread(db):
+    threads = []
+    original = db.upsert_books
+    
+    def upsert_books(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+    
+    db.upsert_books = upsert_books
+    async_db = AsyncDatabase(db)
+    try:
+        async_db.call("upsert_books", db.get_all_books()).result(10)
+    finally:
+        async_db.shutdown()
+    assert threads and threads[0].startswith("db-writer")
+
+
+def test_shutdown_waits_for_running_reads(db):
+    started, release = threading.Event(), threading.Event()
+    finished = []
+    
+    def slow_read():
+        started.set()
+        release.wait(10)
+        finished.append(db.get_book_count())
+    
+    async_db = AsyncDatabase(db, readers=1)
+    async_db.run(slow_read)
+    queued = async_db.run(db.get_book_count)
+    started.wait(10)
+    threading.Timer(0.1, release.set).start()
+    async_db.shutdown(wait=True)
+    
+    # 執行中的讀取已完成，之後才可以安全地關閉資料庫；尚未開始的讀取被取消
+    assert finished == [10]
+    assert queued.cancelled()
+    db.close()
+
+
+def test_shutdown_with_queued_callbacks(db, caplog):
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+    
+    def slow_read():
+        started.set()
+        release.wait(10)
+        return db.get_book_count()
+    
+    async_db = AsyncDatabase(db, readers=1)
+    async_db.then(async_db.run(slow_read), results.append, errors.append)
+    queued = [async_db.then(async_db.read("get_book_count"), results.append, errors.append)
+              for _ in range(3)]
+    started.wait(10)
+    threading.Timer(0.1, release.set).start()
+    with caplog.at_level(logging.DEBUG):
+        async_db.shutdown(wait=True)
+    
+    # 被取消的讀取不呼叫回呼，也不記錄回呼中的例外
+    assert all(future.cancelled() for future in queued)
+    assert results == [10]
+    assert errors == []
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert async_db.pending == 0
+    db.close()
@@ -0,0 +1,202 @@
+"""分頁資料來源測試"""
+
+import threading
+
+from async_db import AsyncDatabase
+from book_sources import ListBookSource, PagedBookSource, cell_style, format_cell
+from database import BookChange
+from models import Book
+
+
+class QueuedDispatcher:
+    """記錄回呼，由測試在「UI 執行緒」(主執行緒) 執行"""
+    
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+    
+    def __call__(self, func, *args):
+        with self.lock:
+            self.calls.append((func, args))
+    
+    def run_pending(self):
+        with self.lock:
+            calls, self.calls = self.calls, []
+        for func, args in calls:
+            func(*args)
+
+
+def make_source(db, **kwargs):
+    dispatcher = QueuedDispatcher()
+    async_db = AsyncDatabase(db, readers=1, dispatcher=dispatcher)
+    loaded = []
+    source = PagedBookSource(db, page_size=2, async_db=async_db, on_page_loaded=loaded.append, **kwargs)
+    return source, async_db, dispatcher, loaded
+
+
+def wait_for_loads(async_db, dispatcher):
+    async_db.run(lambda: None).result(10)
+    async_db.shutdown()
+    dispatcher.run_pending()
+
+
+def all_ids(db, order_by="id"):
+    return [book.id for book in db.get_books_page(None, 100, order_by)]
+
+
+def rows(source):
+    return [source.get_book_id(row) for row in range(len(source))]
+
+
+def test_page_miss_returns_placeholder_and_loads_in_background(db, monkeypatch):
+    source, async_db, dispatcher, loaded = make_source(db)
+    ui_thread = threading.current_thread()
+    calls = []
+    original = db.get_books_page
+    
+    def get_books_page(*args, **kwargs):
+        calls.append(threading.current_thread())
+        return original(*args, **kwargs)
+    
+    monkeypatch.setattr(db, "get_books_page", get_books_page)
+    
+    assert source.get_book(5) is None
+    assert source.is_loading(5)
+    wait_for_loads(async_db, dispatcher)
+    
+    assert calls and ui_thread not in calls
+    assert loaded and loaded[0] is source
+    assert not source.is_loading(5)
+    assert source.get_book(5).id == all_ids(db)[5]
+    # 相鄰頁面一併載入
+    assert set(source._pages) == {1, 2, 3}
+
+
+def test_preload_is_synchronous(db):
+    source, async_db, _, _ = make_source(db)
+    source.preload(0)
+    assert source.get_book(0).id == all_ids(db)[0]
+    async_db.shutdown()
+
+
+def test_result_discarded_when_rows_shift_during_load(db):
+    source, async_db, dispatcher, _ = make_source(db)
+    source.preload(0)
+    assert source.get_book(4) is None
+    source.remove_book(all_ids(db)[0])
+    wait_for_loads(async_db, dispatcher)
+    # 載入期間列號已位移，舊的頁面不會被使用
+    assert source._pages == {}
+
+
+def test_synchronous_without_async_db(db):
+    source = PagedBookSource(db, page_size=2)
+    assert source.get_book(5).id == all_ids(db)[5]
+    assert not source.is_loading(5)
+
+
+def test_refresh_does_not_read_every_id(db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("不應讀取全部書籍ID")
+    
+    monkeypatch.setattr(db, "get_book_ids", fail)
+    monkeypatch.setattr(db, "get_all_books", fail)
+    source = PagedBookSource(db, page_size=3)
+    assert len(source) == 10
+    assert rows(source) == all_ids(db)
+
+
+def test_pages_follow_keyset_cursors(db, monkeypatch):
+    cursors = []
+    original = db.get_page_cursor
+    
+    def get_page_cursor(*args, **kwargs):
+        cursors.append(args)
+        return original(*args, **kwargs)
+    
+    monkeypatch.setattr(db, "get_page_cursor", get_page_cursor)
+    for order_by in ("id", "title", "author", "year", "rating"):
+        # 依序翻頁只使用上一頁的游標
+        source = PagedBookSource(db, page_size=3, order_by=order_by)
+        assert rows(source) == all_ids(db, order_by)
+        assert cursors == []
+    
+    # 直接跳到後面的頁面時，先依位置查詢游標
+    source = PagedBookSource(db, page_size=3, order_by="year")
+    assert source.get_book(7).id == all_ids(db, "year")[7]
+    assert cursors == [(5, "year", None)]
+    assert rows(source) == all_ids(db, "year")
+
+
+def test_filtered_count_and_pages(db):
+    source = PagedBookSource(db, page_size=2, filters={"status": "已讀"})
+    expected = [book.id for book in db.get_books_page(None, 100, filters={"status": "已讀"})]
+    assert len(source) == len(expected) == 4
+    assert rows(source) == expected
+    
+    source = PagedBookSource(db, page_size=2, order_by="year", filters={"min_year": 1965})
+    expected = [book.id for book in db.get_books_page(None, 100, "year", {"min_year": 1965})]
+    assert len(source) == len(expected)
+    assert rows(source) == expected
+
+
+def test_patch_insert_and_delete(db):
+    source = PagedBookSource(db, page_size=3)
+    rows(source)
+    
+    book = Book("超新星紀元", "劉慈欣", 2003)
+    assert db.add_book(book)
+    inserted = BookChange(BookChange.INSERTED, book)
+    assert source.can_patch(inserted)
+    assert source.upsert_book(book) == (10, True)
+    # 同一事件再次送達 (例如異動紀錄表) 不會重複新增
+    assert source.can_patch(inserted)
+    assert source.upsert_book(book) == (None, False)
+    assert len(source) == 11
+    assert source.get_book_id(10) == book.id
+    assert source.upsert_book(book) == (10, False)
+    
+    removed_id = all_ids(db)[4]
+    assert db.delete_book(removed_id)
+    deleted = BookChange(BookChange.DELETED, book_id=removed_id, old_status="已讀")
+    assert source.can_patch(deleted)
+    assert source.remove_book(removed_id) == 4
+    assert source.can_patch(deleted)
+    assert source.remove_book(removed_id) is None
+    
+    assert len(source) == 10
+    assert rows(source) == all_ids(db)
+
+
+def test_unknown_rows_need_reload(db):
+    source = PagedBookSource(db, page_size=3)
+    source.preload(0)
+    
+    # 刪除的書籍不在已載入的頁面中，無法得知列號
+    removed_id = all_ids(db)[7]
+    assert not source.can_patch(BookChange(BookChange.DELETED, book_id=removed_id, old_status="未讀"))
+    # 修改未載入的書籍不影響列號，之後載入頁面時會讀到新資料
+    book = db.get_book_by_id(all_ids(db)[8])
+    assert source.can_patch(BookChange(BookChange.UPDATED, book, old_status=book.status))
+    assert source.upsert_book(book) == (None, False)
+    # 其他排序無法局部更新
+    assert not PagedBookSource(db, order_by="title").can_patch(BookChange(BookChange.UPDATED, book))
+
+
+def test_cell_formatting(db):
+    book = Book("三體", "劉慈欣", 2008, "已讀", 5, 1)
+    source = ListBookSource([book, Book("Dune", "Frank Herbert", 1965, "未讀", 0, 2)])
+    assert [format_cell(source, 0, col) for col in range(6)] == ["1", "三體", "劉慈欣", "2008", "已讀", "5★"]
+    assert format_cell(source, 1, 5) == "未評分"
+    assert format_cell(source, 2, 1) == ""
+    assert cell_style(source, 0, 4) == ("已讀", True, False)
+    assert cell_style(source, 1, 1) == (None, False, True)
+    
+    # 載入中的列顯示已知的ID與「載入中...」
+    paged, async_db, dispatcher, _ = make_source(db)
+    paged.preload(0)
+    row = 3
+    assert format_cell(paged, row, 1) == "載入中..."
+    assert format_cell(paged, row, 0) == ""
+    wait_for_loads(async_db, dispatcher)
+    assert format_cell(paged, row, 0) == str(all_ids(db)[row])
@@ -0,0 +1,134 @@
+"""批次新增/更新/刪除測試"""
+
+import pytest
+
+from database import FTS_BULK_MIN_ROWS
+from models import Book
+
+
+def fts_trigger_exists(db):
+    row = db.get_connection().execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'books_fts_ai'").fetchone()
+    return row is not None
+
+
+def check_fts_index(db):
+    # 索引與 books 表格不一致時拋出 sqlite3.DatabaseError
+    db.get_connection().execute("INSERT INTO books_fts (books_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_add_books_reports_each_row(db):
+    books = [
+        Book("超新星紀元", "劉慈欣", 2003),
+        Book("", "無名", 2000),
+        Book("球狀閃電", "劉慈欣", 2004, "不存在的狀態"),
+        Book("鄉村教師", "劉慈欣", 2001),
+    ]
+    report = db.add_books(books, chunk_size=3)
+    
+    assert report.total == 4
+    assert report.succeeded == [0, 3]
+    assert [index for index, _ in report.errors] == [1, 2]
+    assert db.get_book_by_id(books[0].id).title == "超新星紀元"
+    assert db.get_book_by_id(books[3].id).title == "鄉村教師"
+    assert books[1].id is None
+    assert db.get_book_count() == 12
+
+
+def test_add_books_skip_duplicates(db):
+    books = [Book("三體", "劉慈欣", 2008), Book("鄉村教師", "劉慈欣", 2001), Book("鄉村教師", "劉慈欣", 2001)]
+    report = db.add_books(books, skip_duplicates=True)
+    assert report.succeeded == [1]
+    assert report.skipped == [0, 2]
+    assert db.get_book_count() == 11
+
+
+def test_failed_chunk_retries_row_by_row(db):
+    # 已驗證 (validated=True) 的資料違反 NOT NULL 時，整個區塊回滾後逐筆重試
+    books = [Book("超新星紀元", "劉慈欣", 2003), Book(None, "無名", 2000), Book("鄉村教師", "劉慈欣", 2001)]
+    report = db.add_books(books, validated=True)
+    
+    assert report.succeeded == [0, 2]
+    assert [index for index, _ in report.errors] == [1]
+    assert "NOT NULL" in report.errors[0][1]
+    assert [db.get_book_by_id(book.id).title for book in (books[0], books[2])] == ["超新星紀元", "鄉村教師"]
+    assert db.get_book_count() == 12
+
+
+def test_large_chunk_defers_fts_triggers(db):
+    count = FTS_BULK_MIN_ROWS + 10
+    books = [Book(f"批次書籍 {i:04d}", "批次作者", 2000) for i in range(count)]
+    books[5] = Book(None, "無名", 2000)
+    report = db.add_books(books, validated=True)
+    
+    assert report.success_count == count - 1
+    # 觸發器在同一交易中還原，逐筆重試的區塊也只為成功的資料建立索引
+    assert fts_trigger_exists(db)
+    check_fts_index(db)
+    assert len(db.search_books("批次書籍")) == count - 1
+    assert [book.title for book in db.search_books("批次書籍 0007")] == ["批次書籍 0007"]
+    
+    # 之後的單筆新增仍由觸發器建立索引
+    assert db.add_book(Book("單筆新增", "某人", 2001))
+    assert [book.title for book in db.search_books("單筆新增")] == ["單筆新增"]
+
+
+def test_large_chunk_rollback_restores_triggers(db):
+    books = [Book(f"批次書籍 {i:04d}", "批次作者", 2000) for i in range(FTS_BULK_MIN_ROWS)]
+    # 產生器在區塊之後拋出例外，整個交易回滾
+    def stream():
+        yield from books
+        raise RuntimeError("來源中斷")
+    
+    with pytest.raises(RuntimeError):
+        db.add_books(stream(), chunk_size=FTS_BULK_MIN_ROWS)
+    assert db.get_book_count() == 10
+    assert fts_trigger_exists(db)
+    check_fts_index(db)
+
+
+def test_update_books_reports_missing_ids(db):
+    first, second = db.get_books_page(None, 2)
+    books = [
+        Book(first.title, first.author, first.year, "已讀", 1, first.id),
+        Book("不存在", "某人", 2000, "未讀", 0, 9999),
+        Book("沒有ID", "某人", 2000),
+        Book(second.title, second.author, -5, second.status, second.rating, second.id),
+    ]
+    report = db.update_books(books)
+    
+    assert report.succeeded == [0]
+    assert sorted(index for index, _ in report.errors) == [1, 2, 3]
+    assert db.get_book_by_id(first.id).rating == 1
+    assert db.get_book_by_id(second.id).year == second.year
+
+
+def test_upsert_books_inserts_and_updates(db):
+    first = db.get_books_page(None, 1)[0]
+    books = [
+        Book(first.title, first.author, first.year, first.status, 2, first.id),
+        Book("指定ID", "某人", 2000, "未讀", 0, 500),
+        Book("自動ID", "某人", 2001),
+    ]
+    report = db.upsert_books(books)
+    
+    assert report.succeeded == [0, 1, 2]
+    assert db.get_book_by_id(first.id).rating == 2
+    assert db.get_book_by_id(500).title == "指定ID"
+    assert db.get_book_by_id(books[2].id).title == "自動ID"
+    assert db.get_book_count() == 12
+
+
+def test_delete_books_reports_missing_and_duplicate_ids(db):
+    first, second = db.get_books_page(None, 2)
+    report = db.delete_books([first.id, 9999, first.id, second.id], chunk_size=10)
+    
+    assert report.succeeded == [0, 3]
+    assert sorted(index for index, _ in report.errors) == [1, 2]
+    assert db.get_book_count() == 8
+    
+    # 跨區塊的重複ID也只成功一次
+    third = db.get_books_page(None, 1)[0]
+    report = db.delete_books([third.id, third.id], chunk_size=1)
+    assert report.succeeded == [0]
+    assert [index for index, _ in report.errors] == [1]
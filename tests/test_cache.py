@@ -0,0 +1,93 @@
+"""讀取快取測試"""
+
+import threading
+
+from cache import CachedDatabaseManager
+from database import DatabaseManager
+from models import Book
+
+
+def in_new_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_new_thread_sees_external_write(db):
+    cache = CachedDatabaseManager(db, check_interval=0)
+    book_id = db.get_books_page(None, 1)[0].id
+    assert cache.get_book_by_id(book_id).title == "三體"
+    count = cache.get_book_count()
+    
+    # 另一條連線 (例如其他行程) 修改書籍
+    with DatabaseManager(db.db_path) as other:
+        assert other.update_book(Book("死神永生", "劉慈欣", 2010, "已讀", 5, book_id))
+        assert other.add_book(Book("超新星紀元", "劉慈欣", 2003))
+    
+    # 從未讀取過的新執行緒也不會拿到寫入前的快取
+    assert in_new_thread(lambda: cache.get_book_by_id(book_id)).title == "死神永生"
+    assert in_new_thread(cache.get_book_count) == count + 1
+
+
+def test_check_is_throttled(db, monkeypatch):
+    cache = CachedDatabaseManager(db, check_interval=60)
+    book_id = db.get_books_page(None, 1)[0].id
+    cache.get_book_by_id(book_id)
+    
+    executed = []
+    monkeypatch.setattr(cache, "_monitor", _RecordingConnection(cache._monitor, executed))
+    for _ in range(100):
+        cache.get_book_by_id(book_id)
+    assert executed == []
+
+
+class _RecordingConnection:
+    def __init__(self, conn, executed):
+        self.conn = conn
+        self.executed = executed
+    
+    def execute(self, sql):
+        self.executed.append(sql)
+        return self.conn.execute(sql)
+    
+    def close(self):
+        self.conn.close()
+
+
+def test_local_write_keeps_other_books_cached(db):
+    cache = CachedDatabaseManager(db, check_interval=0)
+    first, _, third = db.get_books_page(None, 3)
+    cache.get_books_by_ids([first.id, third.id])
+    
+    assert cache.update_book(Book(third.title, third.author, third.year, "已讀", 1, third.id))
+    
+    # 本行程的寫入只使被修改的書籍失效，其他書籍仍由快取提供
+    assert cache.get_book_by_id(first.id) is not None
+    assert cache.get_book_by_id(third.id).rating == 1
+    stats = cache.get_cache_stats()['books']
+    assert stats['invalidations'] == 1
+    assert stats['hits'] == 1
+
+
+def test_external_write_invalidates_changed_books_only(db):
+    cache = CachedDatabaseManager(db, check_interval=0)
+    first, second = db.get_books_page(None, 2)
+    cache.get_books_by_ids([first.id, second.id])
+    
+    with DatabaseManager(db.db_path) as other:
+        assert other.delete_book(second.id)
+    
+    assert cache.get_book_by_id(second.id) is None
+    assert cache.get_book_by_id(first.id).title == first.title
+    assert cache.get_cache_stats()['books']['invalidations'] == 1
+    
+    # 異動紀錄已被清除 (無法得知修改了哪些書籍) 時清除全部快取
+    cache.get_book_by_id(first.id)
+    with DatabaseManager(db.db_path) as other:
+        assert other.add_book(Book("超新星紀元", "劉慈欣", 2003))
+        assert other.prune_changes(max_age=-3600)
+        assert other.add_book(Book("球狀閃電", "劉慈欣", 2004))
+    cache.get_book_by_id(first.id)
+    assert cache.get_cache_stats()['books']['invalidations'] == 2
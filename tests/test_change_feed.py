@@ -0,0 +1,105 @@
+"""異動紀錄 (get_changes_since) 與 ChangeFeed 測試"""
+
+from change_feed import ChangeFeed
+from database import BookChange, DatabaseManager
+from models import Book
+
+
+def kinds(changes):
+    return sorted((change.kind, change.book_id) for change in changes)
+
+
+def test_changes_since_merges_per_book(db):
+    books = db.get_books_page(None, 3)
+    seq = db.get_change_version()
+    
+    assert db.update_book(Book(books[0].title, books[0].author, books[0].year, "閱讀中", 1, books[0].id))
+    assert db.update_book(Book(books[0].title, books[0].author, books[0].year, "未讀", 2, books[0].id))
+    assert db.delete_book(books[1].id)
+    new_book = Book("超新星紀元", "劉慈欣", 2003)
+    assert db.add_book(new_book)
+    # 新增後又刪除的書籍不產生事件
+    temp = Book("暫存", "某人", 2000)
+    assert db.add_book(temp)
+    assert db.delete_book(temp.id)
+    
+    last_seq, changes = db.get_changes_since(seq)
+    assert last_seq == db.get_change_version()
+    assert kinds(changes) == sorted([
+        (BookChange.UPDATED, books[0].id),
+        (BookChange.DELETED, books[1].id),
+        (BookChange.INSERTED, new_book.id),
+    ])
+    by_id = {change.book_id: change for change in changes}
+    # 多次修改合併為一個事件：原本的狀態取第一筆紀錄，書籍資料取目前的值
+    assert by_id[books[0].id].old_status == books[0].status
+    assert by_id[books[0].id].book.rating == 2
+    assert by_id[books[1].id].old_status == books[1].status
+    
+    assert db.get_changes_since(last_seq) == (last_seq, [])
+
+
+def test_changes_since_resets_over_limit(db):
+    seq = db.get_change_version()
+    for book in db.get_books_page(None, 4):
+        assert db.delete_book(book.id)
+    
+    last_seq, changes = db.get_changes_since(seq, limit=3)
+    assert last_seq == db.get_change_version()
+    assert kinds(changes) == [(BookChange.RESET, None)]
+    
+    # 筆數在限制內時逐筆回傳
+    _, changes = db.get_changes_since(seq, limit=4)
+    assert len(changes) == 4
+
+
+def test_changes_since_resets_after_prune(db):
+    seq = db.get_change_version()
+    book = db.get_books_page(None, 1)[0]
+    assert db.delete_book(book.id)
+    assert db.add_book(Book("超新星紀元", "劉慈欣", 2003))
+    
+    # 讓 seq 之後第一筆 (含) 以前的紀錄過期後清除，seq 之後的紀錄已不完整
+    with db.transaction() as conn:
+        conn.execute("UPDATE book_changes SET changed_at = 0 WHERE seq <= ?", (seq + 1,))
+    assert db.prune_changes(max_age=3600) == seq + 1
+    
+    last_seq, changes = db.get_changes_since(seq)
+    assert last_seq == db.get_change_version()
+    assert kinds(changes) == [(BookChange.RESET, None)]
+    
+    # 全部清除後也是 reset
+    assert db.prune_changes(max_age=-3600) == 1
+    assert kinds(db.get_changes_since(seq)[1]) == [(BookChange.RESET, None)]
+
+
+def test_changes_since_inside_read_snapshot(db):
+    seq = db.get_change_version()
+    assert db.delete_book(db.get_books_page(None, 1)[0].id)
+    
+    with db.read_snapshot() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        _, changes = db.get_changes_since(seq)
+        # 巢狀呼叫沿用外層交易，不會提前結束
+        assert conn.in_transaction
+    assert count == 9
+    assert kinds(changes) == [(BookChange.DELETED, changes[0].book_id)]
+
+
+def test_change_feed_reports_external_writes(db):
+    received = []
+    feed = ChangeFeed(db, received.extend, interval=3600)
+    try:
+        assert feed.poll() == []
+        
+        with DatabaseManager(db.db_path) as other:
+            book = Book("超新星紀元", "劉慈欣", 2003)
+            assert other.add_book(book)
+        
+        changes = feed.poll()
+        assert kinds(changes) == [(BookChange.INSERTED, book.id)]
+        assert changes[0].book.title == "超新星紀元"
+        # 沒有新提交時不再回報
+        assert feed.poll() == []
+    finally:
+        feed.close()
@@ -0,0 +1,123 @@
+"""命令列工具測試"""
+
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import cli
+from conftest import make_library
+from database import DatabaseManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(capsys, *argv):
+    code = cli.main(["--quiet", *argv])
+    captured = capsys.readouterr()
+    return code, captured.out
+
+
+def csv_rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_add_and_stats(tmp_path, capsys):
+    db_path = str(tmp_path / "books.db")
+    code, out = run(capsys, "--db", db_path, "add", "--title", "三體", "--author", "劉慈欣",
+                    "--year", "2008", "--status", "已讀", "--rating", "5")
+    assert code == cli.EXIT_OK
+    book_id = int(out)
+    
+    code, out = run(capsys, "--db", db_path, "add", "--title", "", "--author", "無名", "--year", "2000")
+    assert code == cli.EXIT_ERROR and out == ""
+    
+    code, out = run(capsys, "--db", db_path, "stats", "--json")
+    statistics = json.loads(out)
+    assert statistics["total"] == 1
+    assert statistics["status_counts"]["已讀"] == 1
+    
+    code, out = run(capsys, "--db", db_path, "stats")
+    assert code == cli.EXIT_OK
+    assert out.splitlines()[:2] == ["總書籍數: 1", "未讀: 0"]
+    with DatabaseManager(db_path) as db_manager:
+        assert db_manager.get_book_by_id(book_id).title == "三體"
+
+
+def test_search_formats_and_limit(tmp_path, capsys, monkeypatch):
+    db_path = str(tmp_path / "books.db")
+    make_library(db_path).close()
+    
+    code, out = run(capsys, "--db", db_path, "search", "劉慈欣")
+    rows = csv_rows(out)
+    assert code == cli.EXIT_OK
+    assert rows[0] == ["ID", "書名", "作者", "出版年份", "閱讀狀態", "評分"]
+    assert sorted(row[1] for row in rows[1:]) == ["三體", "流浪地球"]
+    
+    code, out = run(capsys, "--db", db_path, "search", "asimov", "--format", "jsonl")
+    assert sorted(json.loads(line)["title"] for line in out.splitlines()) == ["Foundation", "I, Robot"]
+    
+    # --limit 傳給查詢，而不是讀取全部結果後再截斷
+    limits = []
+    original = DatabaseManager.search_books
+    
+    def search_books(self, *args, **kwargs):
+        limits.append(kwargs.get("limit"))
+        return original(self, *args, **kwargs)
+    
+    monkeypatch.setattr(DatabaseManager, "search_books", search_books)
+    code, out = run(capsys, "--db", db_path, "search", "劉慈欣", "--limit", "1")
+    assert limits == [1]
+    assert len(csv_rows(out)) == 2
+
+
+def test_export_and_import_files(tmp_path, capsys):
+    db_path = str(tmp_path / "books.db")
+    make_library(db_path).close()
+    
+    for extension in ("csv", "jsonl"):
+        path = str(tmp_path / f"books.{extension}")
+        code, _ = run(capsys, "--db", db_path, "export", path)
+        assert code == cli.EXIT_OK
+        
+        copy_path = str(tmp_path / f"copy_{extension}.db")
+        code, _ = run(capsys, "--db", copy_path, "import", path)
+        assert code == cli.EXIT_OK
+        with DatabaseManager(db_path) as source, DatabaseManager(copy_path) as copy:
+            assert ([book.to_dict() for book in copy.get_all_books()] ==
+                    [book.to_dict() for book in source.get_all_books()])
+    
+    code, _ = run(capsys, "--db", db_path, "export", str(tmp_path / "books.unknown"))
+    assert code == cli.EXIT_ERROR
+    code, _ = run(capsys, "--db", db_path, "export", "-", "--format", "sqlite")
+    assert code == cli.EXIT_ERROR
+
+
+def test_import_with_rejects(tmp_path, capsys):
+    source = tmp_path / "books.csv"
+    source.write_text("ID,書名,作者,出版年份,閱讀狀態,評分\n,三體,劉慈欣,2008,已讀,5\n,,無名,2000,未讀,0\n",
+                      encoding="utf-8")
+    db_path = str(tmp_path / "books.db")
+    code, _ = run(capsys, "--db", db_path, "import", str(source))
+    assert code == cli.EXIT_REJECTED
+    assert (tmp_path / "books_rejects.csv").exists()
+    with DatabaseManager(db_path) as db_manager:
+        assert db_manager.get_book_count() == 1
+
+
+def test_pipe_between_processes(tmp_path):
+    db_path = str(tmp_path / "books.db")
+    make_library(db_path).close()
+    copy_path = str(tmp_path / "copy.db")
+    
+    export = subprocess.run([sys.executable, "cli.py", "--quiet", "--db", db_path, "export", "-", "--format", "jsonl"],
+                            cwd=ROOT, capture_output=True, check=True)
+    subprocess.run([sys.executable, "cli.py", "--quiet", "--db", copy_path, "import", "-", "--format", "jsonl"],
+                   cwd=ROOT, input=export.stdout, capture_output=True, check=True)
+    # 資料只寫到標準輸出，執行時間寫到標準錯誤輸出
+    assert len(export.stdout.decode("utf-8").splitlines()) == 10
+    assert b"export:" in export.stderr
+    with DatabaseManager(copy_path) as db_manager:
+        assert db_manager.get_book_count() == 10
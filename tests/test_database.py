@@ -0,0 +1,129 @@
+"""DatabaseManager 測試"""
+
+from database import DatabaseManager
+from models import Book
+
+
+def actual_status_counts(db_manager):
+    return dict(db_manager.get_connection().execute("SELECT status, COUNT(*) FROM books GROUP BY status"))
+
+
+def assert_counters_match(db_manager):
+    assert db_manager.get_status_counts() == actual_status_counts(db_manager)
+    assert db_manager.get_book_count() == sum(actual_status_counts(db_manager).values())
+
+
+def test_status_counters_follow_every_write(db):
+    assert_counters_match(db)
+    
+    book = Book("超新星紀元", "劉慈欣", 2003, "未讀")
+    assert db.add_book(book)
+    assert_counters_match(db)
+    
+    book.status = "閱讀中"
+    assert db.update_book(book)
+    assert_counters_match(db)
+    # 只修改其他欄位不影響計數
+    book.rating = 3
+    assert db.update_book(book)
+    assert_counters_match(db)
+    
+    assert db.delete_book(book.id)
+    assert_counters_match(db)
+    
+    books = [Book(f"批次 {i}", "某人", 2000, ("已讀", "未讀", "閱讀中")[i % 3]) for i in range(30)]
+    books[4] = Book("", "無名", 2000)
+    db.add_books(books, chunk_size=7)
+    assert_counters_match(db)
+    
+    added = [b for b in books if b.id is not None]
+    for changed in added[:10]:
+        changed.status = "已讀"
+    db.update_books(added[:10])
+    assert_counters_match(db)
+    
+    db.upsert_books([Book("新增", "某人", 2000, "閱讀中", 0, 900),
+                     Book(added[10].title, added[10].author, 2000, "閱讀中", 0, added[10].id)])
+    assert_counters_match(db)
+    
+    db.delete_books([b.id for b in added[::2]] + [9999])
+    assert_counters_match(db)
+    
+    # 整個區塊回滾後逐筆重試，計數也一併回滾
+    db.add_books([Book("回滾 1", "某人", 2000, "已讀"), Book(None, "無名", 2000)], validated=True)
+    assert_counters_match(db)
+    
+    # 所有狀態都刪除後不列出數量為 0 的狀態
+    db.delete_books(db.get_book_ids())
+    assert db.get_status_counts() == {} == actual_status_counts(db)
+
+
+def test_status_counters_survive_reopen(tmp_path, db):
+    db.add_book(Book("超新星紀元", "劉慈欣", 2003, "閱讀中"))
+    expected = actual_status_counts(db)
+    db.close()
+    with DatabaseManager(db.db_path) as reopened:
+        assert reopened.get_status_counts() == expected
+        assert reopened.count_books({"status": "閱讀中"}) == expected["閱讀中"]
+
+
+def test_reserved_id_blocks_never_overlap(tmp_path, db):
+    first = db.reserve_id_block(5)
+    assert len(first) == 5 and first.start > max(db.get_book_ids())
+    
+    # 之後以 AUTOINCREMENT 配發的ID在保留範圍之後
+    book = Book("超新星紀元", "劉慈欣", 2003)
+    assert db.add_book(book)
+    assert book.id >= first.stop
+    
+    # 另一個連線 (例如其他行程) 保留的範圍也不重疊
+    with DatabaseManager(db.db_path) as other:
+        second = other.reserve_id_block(3)
+    assert second.start > book.id
+    
+    # 以明確ID新增保留的書籍，之後的批次新增仍不會用到保留的ID
+    report = db.upsert_books([Book(f"保留 {i}", "某人", 2000, "未讀", 0, i) for i in first])
+    assert report.success_count == 5
+    books = [Book(f"批次 {i}", "某人", 2000) for i in range(5)]
+    db.add_books(books)
+    reserved = set(first) | set(second)
+    assert all(b.id not in reserved and b.id >= second.stop for b in books)
+    
+    # 刪除最大的ID後也不會重複使用
+    assert db.delete_book(books[-1].id)
+    again = Book("再新增", "某人", 2001)
+    assert db.add_book(again)
+    assert again.id > books[-1].id
+
+
+def test_reserve_on_empty_database(tmp_path):
+    with DatabaseManager(str(tmp_path / "empty.db")) as db_manager:
+        assert db_manager.reserve_id_block(0) == range(0)
+        block = db_manager.reserve_id_block(3)
+        assert block == range(1, 4)
+        book = Book("三體", "劉慈欣", 2008)
+        assert db_manager.add_book(book)
+        assert book.id == 4
+
+
+def check_query_plans(db_manager):
+    report = db_manager.explain_queries()
+    assert report
+    assert not [entry["name"] for entry in report if entry["plan"][0].startswith("ERROR")]
+    assert db_manager.find_unexpected_scans() == []
+
+
+def test_shipped_queries_use_indexes(tmp_path, db):
+    check_query_plans(db)
+    assert any(entry["name"] == "search_books (FTS)" for entry in db.explain_queries())
+    
+    # 大量資料並更新統計後仍使用索引
+    db.add_books([Book(f"批次 {i}", f"作者 {i % 50}", 1900 + i % 120, "未讀", i % 6) for i in range(3000)])
+    assert db.vacuum()
+    db.get_connection().execute("ANALYZE")
+    check_query_plans(db)
+    
+    with DatabaseManager(str(tmp_path / "empty.db")) as empty:
+        check_query_plans(empty)
+    with DatabaseManager(str(tmp_path / "like.db"), fts_tokenizer=None) as without_fts:
+        check_query_plans(without_fts)
@@ -0,0 +1,142 @@
+"""匯出格式測試"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from database import DatabaseManager
+from exporters import (ColumnarExporter, ColumnarReader, CsvExporter, EXPORTERS, ExportCancelled,
+                       JsonLinesExporter, SqliteSnapshotExporter)
+from importers import CsvImporter, JsonLinesImporter
+from models import Book
+
+
+def library_books(db):
+    return [book.to_dict() for book in db.get_all_books()]
+
+
+@pytest.mark.parametrize("exporter_cls, importer_cls", [
+    (CsvExporter, CsvImporter),
+    (JsonLinesExporter, JsonLinesImporter),
+])
+def test_text_round_trip(tmp_path, db, exporter_cls, importer_cls):
+    path = tmp_path / f"books.{exporter_cls.extension}"
+    assert exporter_cls(db, batch_size=3).export(str(path)) == 10
+    
+    copy = DatabaseManager(str(tmp_path / "copy.db"))
+    try:
+        result = importer_cls(copy).import_file(str(path))
+        assert (result.imported, result.rejected) == (10, 0)
+        assert library_books(copy) == library_books(db)
+    finally:
+        copy.close()
+
+
+def test_columnar_round_trip(tmp_path, db):
+    path = tmp_path / "books.bkcol"
+    assert ColumnarExporter(db, batch_size=3).export(str(path)) == 10
+    
+    # 每批一個資料列群組
+    assert [len(group["id"]) for group in ColumnarReader(str(path))] == [3, 3, 3, 1]
+    assert [book.to_dict() for book in ColumnarReader(str(path)).iter_books()] == library_books(db)
+
+
+def test_truncated_columnar_file_raises_value_error(tmp_path, db):
+    path = tmp_path / "books.bkcol"
+    ColumnarExporter(db, batch_size=3).export(str(path))
+    data = path.read_bytes()
+    
+    truncated = tmp_path / "truncated.bkcol"
+    for size in range(len(data)):
+        truncated.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            list(ColumnarReader(str(truncated)).iter_books())
+    
+    # 壓縮資料損毀
+    corrupted = bytearray(data)
+    corrupted[-8] ^= 0xFF
+    truncated.write_bytes(bytes(corrupted))
+    with pytest.raises(ValueError):
+        list(ColumnarReader(str(truncated)).iter_books())
+
+
+@pytest.mark.parametrize("format_name", sorted(EXPORTERS))
+def test_cancel_leaves_no_files(tmp_path, db, format_name):
+    path = tmp_path / f"books.{EXPORTERS[format_name].extension}"
+    cancel_event = threading.Event()
+    
+    def progress(done, total):
+        cancel_event.set()
+    
+    exporter = EXPORTERS[format_name](db, batch_size=3)
+    exporter.PAGES_PER_STEP = 1
+    with pytest.raises(ExportCancelled):
+        exporter.export(str(path), progress, cancel_event)
+    assert not path.exists()
+    assert not (tmp_path / (path.name + ".part")).exists()
+
+
+def test_cancel_keeps_existing_target(tmp_path, db):
+    path = tmp_path / "books.csv"
+    path.write_text("舊的內容", encoding="utf-8")
+    cancel_event = threading.Event()
+    cancel_event.set()
+    
+    with pytest.raises(ExportCancelled):
+        CsvExporter(db).export(str(path), cancel_event=cancel_event)
+    assert path.read_text(encoding="utf-8") == "舊的內容"
+    assert not (tmp_path / "books.csv.part").exists()
+
+
+def snapshot_titles(path):
+    snapshot = sqlite3.connect(str(path))
+    try:
+        return {row[0] for row in snapshot.execute("SELECT title FROM books")}
+    finally:
+        snapshot.close()
+
+
+def test_snapshot_of_wal_database(tmp_path, db):
+    assert db.get_connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # 已提交但仍在 WAL 檔中 (尚未檢查點) 的資料
+    assert db.add_book(Book("已提交", "某人", 2001))
+    
+    # 另一個連線尚未提交的寫入不會出現在快照中
+    writer = sqlite3.connect(db.db_path)
+    try:
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("INSERT INTO books (title, author, year, status, rating) "
+                       "VALUES ('未提交', '某人', 2002, '未讀', 0)")
+        path = tmp_path / "snapshot.sqlite"
+        assert SqliteSnapshotExporter(db).export(str(path)) == 11
+    finally:
+        writer.rollback()
+        writer.close()
+    
+    titles = snapshot_titles(path)
+    assert "已提交" in titles and "未提交" not in titles
+    assert not (tmp_path / "snapshot.sqlite.part").exists()
+
+
+def test_snapshot_cancelled_from_progress_callback(tmp_path, db):
+    path = tmp_path / "snapshot.sqlite"
+    exporter = SqliteSnapshotExporter(db)
+    exporter.PAGES_PER_STEP = 1
+    cancel_event = threading.Event()
+    reported = []
+    
+    def progress(done, total):
+        reported.append((done, total))
+        if done >= 2:
+            cancel_event.set()
+    
+    with pytest.raises(ExportCancelled):
+        exporter.export(str(path), progress, cancel_event)
+    # 備份在複製完所有頁面之前停止
+    assert reported and reported[-1][0] < reported[-1][1]
+    assert not path.exists()
+    assert not (tmp_path / "snapshot.sqlite.part").exists()
+    
+    # 取消後仍可再次匯出完整快照
+    assert exporter.export(str(path)) == 10
@@ -0,0 +1,79 @@
+"""匯入與拒絕檔測試"""
+
+import csv
+
+from importers import REJECT_HEADERS, CsvImporter, JsonLinesImporter
+
+CSV_LINES = [
+    "ID,書名,作者,出版年份,閱讀狀態,評分",
+    "1,三體,劉慈欣,2008,已讀,5",
+    "2,,無名氏,2000,未讀,0",
+    "3,年份太大,某人,99999999999,未讀,0",
+    "4,評分太高,某人,2000,未讀,1000",
+    "5,狀態錯誤,某人,2000,借出,0",
+    "6,年份不是數字,某人,abc,未讀,0",
+    "7,欄位太少,某人",
+    "8,Dune,Frank Herbert,1965,未讀,",
+]
+
+
+def read_rejects(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_import_writes_invalid_rows_to_reject_file(tmp_path, db):
+    source = tmp_path / "books.csv"
+    source.write_text("\n".join(CSV_LINES) + "\n", encoding="utf-8")
+    count = db.get_book_count()
+    
+    result = CsvImporter(db, batch_size=3).import_file(str(source))
+    
+    assert (result.imported, result.rejected) == (2, 6)
+    assert db.get_book_count() == count + 2
+    rejects = read_rejects(result.reject_path)
+    assert rejects[0] == REJECT_HEADERS
+    # 行號依來源檔排序，並保留原始欄位
+    assert [row[0] for row in rejects[1:]] == ["3", "4", "5", "6", "7", "8"]
+    assert rejects[2][1:7] == ["3", "年份太大", "某人", "99999999999", "未讀", "0"]
+    assert all(row[-1] for row in rejects[1:])
+
+
+def test_csv_without_rejects_creates_no_reject_file(tmp_path, db):
+    source = tmp_path / "books.csv"
+    source.write_text("\n".join(CSV_LINES[:2]) + "\n", encoding="utf-8")
+    result = CsvImporter(db).import_file(str(source))
+    assert (result.imported, result.rejected, result.reject_path) == (1, 0, None)
+    assert not (tmp_path / "books_rejects.csv").exists()
+
+
+def test_dedupe_and_upsert_modes(tmp_path, db):
+    source = tmp_path / "books.csv"
+    existing = db.get_books_page(None, 1)[0]
+    source.write_text("\n".join([
+        CSV_LINES[0],
+        f",{existing.title},{existing.author},{existing.year},已讀,1",
+        ",新書,新作者,2020,未讀,0",
+    ]) + "\n", encoding="utf-8")
+    result = CsvImporter(db, mode="dedupe").import_file(str(source))
+    assert (result.imported, result.skipped) == (1, 1)
+    
+    source.write_text("\n".join([
+        CSV_LINES[0],
+        f"{existing.id},{existing.title},{existing.author},{existing.year},已讀,1",
+    ]) + "\n", encoding="utf-8")
+    CsvImporter(db, mode="upsert").import_file(str(source))
+    assert db.get_book_by_id(existing.id).rating == 1
+
+
+def test_jsonl_import_rejects_malformed_lines(tmp_path, db):
+    source = tmp_path / "books.jsonl"
+    source.write_text("\n".join([
+        '{"title": "三體", "author": "劉慈欣", "year": 2008, "status": "已讀", "rating": 5}',
+        '{"title": "壞掉',
+        '[1, 2]',
+        '{"title": "沒有年份", "author": "某人", "status": "未讀"}',
+    ]) + "\n", encoding="utf-8")
+    result = JsonLinesImporter(db).import_file(str(source))
+    assert (result.imported, result.rejected) == (1, 3)
+    assert [row[0] for row in read_rejects(result.reject_path)[1:]] == ["2", "3", "4"]
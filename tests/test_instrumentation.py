@@ -0,0 +1,123 @@
+"""效能量測測試"""
+
+import logging
+import unicodedata
+
+import pytest
+
+from database import DatabaseManager
+from instrumentation import BUCKET_BOUNDS_MS, Histogram, Instrumentation, error_log_filter, instrumented
+
+logger = logging.getLogger("test_instrumentation")
+logger.addFilter(error_log_filter)
+
+
+def display_width(text):
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+class Service:
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+    
+    @instrumented
+    def ok(self):
+        logger.warning("警告不算失敗")
+        return [1, 2, 3]
+    
+    @instrumented
+    def logged_error(self):
+        logger.error("捕捉例外後只記錄錯誤")
+        return []
+    
+    @instrumented
+    def raises(self):
+        raise RuntimeError("失敗")
+    
+    @instrumented
+    def outer(self):
+        # 巢狀呼叫的錯誤也計入外層
+        self.logged_error()
+        return None
+
+
+def test_instrumented_counts_errors():
+    instrumentation = Instrumentation(slow_threshold=None)
+    service = Service(instrumentation)
+    service.ok()
+    service.ok()
+    service.logged_error()
+    with pytest.raises(RuntimeError):
+        service.raises()
+    service.outer()
+    
+    methods = instrumentation.snapshot()["methods"]
+    assert (methods["ok"]["calls"], methods["ok"]["errors"], methods["ok"]["rows"]) == (2, 0, 6)
+    assert (methods["logged_error"]["calls"], methods["logged_error"]["errors"]) == (2, 2)
+    assert (methods["raises"]["calls"], methods["raises"]["errors"]) == (1, 1)
+    assert (methods["outer"]["calls"], methods["outer"]["errors"]) == (1, 1)
+    
+    # 停用時不記錄
+    instrumentation.enabled = False
+    service.logged_error()
+    assert instrumentation.snapshot()["methods"]["logged_error"]["calls"] == 2
+
+
+def test_database_errors_are_counted(db):
+    db.instrumentation.reset()
+    assert db.get_status_counts()
+    db.get_connection().execute("DROP TABLE book_status_counts")
+    # 方法捕捉 sqlite3.Error 後記錄錯誤並回傳空結果
+    assert db.get_status_counts() == {}
+    stats = db.instrumentation.snapshot()["methods"]["get_status_counts"]
+    assert (stats["calls"], stats["errors"]) == (2, 1)
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for ms in (0.05, 0.1, 0.2, 0.2, 3, 6000):
+        histogram.record(ms / 1000)
+    
+    result = histogram.to_dict()
+    # 區間包含上限
+    assert result["buckets"] == {"<=0.1": 2, "<=0.25": 2, "<=5": 1, f">{BUCKET_BOUNDS_MS[-1]}": 1}
+    assert result["count"] == 6
+    assert result["max_ms"] == 6000
+    assert result["mean_ms"] == pytest.approx((0.05 + 0.1 + 0.2 + 0.2 + 3 + 6000) / 6, abs=0.001)
+    # 百分位數為所在區間的上限，最後一個區間為最大值
+    assert result["p50_ms"] == 0.25
+    assert histogram.percentile(0.8) == 5
+    assert result["p99_ms"] == 6000
+    assert Histogram().to_dict()["p50_ms"] == 0.0
+    
+    # 少於區間上限的最大值不會被高估
+    small = Histogram()
+    small.record(0.0003)
+    assert small.percentile(0.5) == pytest.approx(0.3)
+
+
+def test_format_report(tmp_path):
+    instrumentation = Instrumentation(slow_threshold=0, trace_sql=True)
+    with DatabaseManager(str(tmp_path / "books.db"), instrumentation=instrumentation) as db_manager:
+        instrumentation.reset()
+        db_manager.get_book_count()
+        db_manager.get_status_counts()
+        instrumentation.count("transactions", 2)
+    
+    report = instrumentation.format_report()
+    lines = report.splitlines()
+    assert lines[0].startswith("統計時間: ")
+    assert lines[1] == "計數: transactions=2"
+    header = lines[3]
+    assert header.startswith("方法") and header.rstrip().endswith("最大ms")
+    rows = {line.split()[0]: line for line in lines[4:] if line and not line.startswith(("慢查詢", " "))}
+    assert set(rows) == {"get_book_count", "get_status_counts"}
+    # 中文欄位標題佔兩格，資料列與標題的顯示寬度相同
+    assert all(display_width(row) == display_width(header) for row in rows.values())
+    # get_book_count 讀取計數表時也呼叫 get_status_counts
+    assert rows["get_status_counts"].split()[1:3] == ["2", "0"]
+    
+    # 慢查詢 (門檻為 0) 附上執行的 SQL，最新的在前
+    slow_index = lines.index("慢查詢 (最近 3 筆):")
+    assert "get_status_counts" in lines[slow_index + 1]
+    assert "book_status_counts" in lines[slow_index + 2]
@@ -0,0 +1,66 @@
+"""多館藏測試"""
+
+import hashlib
+import sqlite3
+
+import pytest
+
+from conftest import make_library
+from library_set import RELEVANCE, LibrarySet
+from migrations import LATEST_VERSION
+
+
+def digest(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.fixture
+def shard_paths(tmp_path):
+    paths = []
+    for name, books in (("north", [("三體", "劉慈欣", 2008, "已讀", 5), ("三體II", "劉慈欣", 2008, "未讀", 0)]),
+                        ("south", [("球狀閃電", "劉慈欣", 2004, "已讀", 4), ("Dune", "Frank Herbert", 1965, "未讀", 3)])):
+        make_library(tmp_path / f"{name}.db", books).close()
+        paths.append(tmp_path / f"{name}.db")
+    return paths
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_opening_does_not_modify_shards(shard_paths, use_processes):
+    before = {path: digest(path) for path in shard_paths}
+    with LibrarySet([str(path) for path in shard_paths], use_processes=use_processes) as libraries:
+        assert len(libraries.search_books("劉慈欣")) == 3
+        assert libraries.get_statistics()["total"] == 4
+    assert {path: digest(path) for path in shard_paths} == before
+
+
+def test_shards_are_read_only(shard_paths):
+    with LibrarySet([str(path) for path in shard_paths]) as libraries:
+        with pytest.raises(sqlite3.OperationalError):
+            libraries.libraries["north"].get_connection().execute("DELETE FROM books")
+
+
+def test_rejects_outdated_schema(tmp_path, shard_paths):
+    old = tmp_path / "old.db"
+    conn = sqlite3.connect(old)
+    conn.execute("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, author TEXT, year INTEGER,"
+                 " status TEXT, rating INTEGER)")
+    conn.execute(f"PRAGMA user_version = {LATEST_VERSION - 1}")
+    conn.close()
+    before = digest(old)
+    
+    with pytest.raises(sqlite3.DatabaseError, match="過舊"):
+        LibrarySet([str(shard_paths[0]), str(old)])
+    assert digest(old) == before
+
+
+def test_relevance_keeps_each_shard_ranking(shard_paths):
+    with LibrarySet([str(path) for path in shard_paths]) as libraries:
+        merged = libraries.search_books("劉慈欣")
+        explicit = libraries.search_books("劉慈欣", order_by=RELEVANCE)
+        assert [(name, book.id) for name, book in merged] == [(name, book.id) for name, book in explicit]
+        for name, db_manager in libraries.libraries.items():
+            ranked = [book.id for book in db_manager.search_books("劉慈欣")]
+            assert [book.id for library, book in merged if library == name] == ranked
+        
+        by_title = libraries.search_books("劉慈欣", order_by="title")
+        assert [book.title for _, book in by_title] == sorted(book.title for _, book in by_title)
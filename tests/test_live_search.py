@@ -0,0 +1,56 @@
+"""即時搜尋測試"""
+
+import queue
+
+import pytest
+
+from conftest import make_library
+from database import DatabaseManager
+from live_search import LiveSearch
+
+BOOKS = [("Abort Mission", "Ann Lee", 2001, "未讀", 0), ("Bob's Garden", "Carl Ray", 2002, "未讀", 0),
+         ("Robotics", "Dana Fox", 2003, "未讀", 0)]
+
+
+def search_all(db_manager, keywords):
+    results = queue.Queue()
+    live_search = LiveSearch(db_manager, lambda keyword, books: results.put((keyword, books)))
+    try:
+        found = {}
+        for keyword in keywords:
+            live_search.submit(keyword)
+            done_keyword, books = results.get(timeout=10)
+            assert done_keyword == keyword
+            found[keyword] = sorted(book.title for book in books)
+        return found
+    finally:
+        live_search.close()
+
+
+@pytest.mark.parametrize("tokenizer", ["trigram", "unicode61"])
+def test_narrowing_matches_fresh_search(tmp_path, tokenizer):
+    db_manager = make_library(tmp_path / "books.db", BOOKS)
+    db_manager.close()
+    with DatabaseManager(str(tmp_path / "books.db"), fts_tokenizer=tokenizer) as db_manager:
+        keywords = ["bo", "abo", "abor", "ob"]
+        found = search_all(db_manager, keywords)
+        for keyword in keywords:
+            assert found[keyword] == sorted(book.title for book in db_manager.search_books(keyword))
+
+
+def test_failed_search_is_not_refined(tmp_path):
+    db_manager = make_library(tmp_path / "books.db", BOOKS)
+    original = db_manager.search_books
+    calls = []
+    
+    def flaky_search(keyword, **kwargs):
+        calls.append(keyword)
+        # 第一次搜尋失敗 (DatabaseManager 記錄錯誤並回傳空串列)
+        return [] if len(calls) == 1 else original(keyword, **kwargs)
+    
+    db_manager.search_books = flaky_search
+    found = search_all(db_manager, ["bo", "bob"])
+    assert found["bo"] == []
+    assert found["bob"] == ["Bob's Garden"]
+    assert calls == ["bo", "bob"]
+    db_manager.close()
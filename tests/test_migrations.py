@@ -0,0 +1,87 @@
+"""資料庫結構遷移與資料回填測試"""
+
+import sqlite3
+
+import pytest
+
+from database import DatabaseManager
+from migrations import LATEST_VERSION, apply_schema, get_schema_version, pending_backfills, run_backfills
+
+LEGACY_ROWS = [(i, f"書名{i}", f"作者{i % 3}", 1990 + i, ("未讀", "閱讀中", "已讀")[i % 3], i % 6)
+               for i in range(1, 12)]
+
+
+@pytest.fixture
+def legacy_path(tmp_path):
+    """最初版本建立的資料庫 (只有 books 表格，結構版本 0)"""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            status TEXT DEFAULT '未讀',
+            rating INTEGER DEFAULT 0
+        )
+    ''')
+    conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?)", LEGACY_ROWS)
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_migrates_legacy_database(legacy_path):
+    with DatabaseManager(legacy_path) as db_manager:
+        conn = db_manager.get_connection()
+        assert get_schema_version(conn) == LATEST_VERSION
+        assert pending_backfills(conn) == []
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE created_at IS NULL").fetchone()[0] == 0
+        
+        books = db_manager.get_all_books()
+        assert [(b.id, b.title, b.author, b.year, b.status, b.rating) for b in books] == LEGACY_ROWS
+        assert db_manager.get_status_counts() == {"未讀": 3, "閱讀中": 4, "已讀": 4}
+        assert [book.id for book in db_manager.search_books("書名10")] == [10]
+
+
+def test_reopening_applies_nothing(legacy_path):
+    DatabaseManager(legacy_path).close()
+    conn = sqlite3.connect(legacy_path, isolation_level=None)
+    try:
+        assert apply_schema(conn) == []
+    finally:
+        conn.close()
+
+
+def test_deferred_backfill(legacy_path):
+    with DatabaseManager(legacy_path, defer_backfill=True) as db_manager:
+        conn = db_manager.get_connection()
+        assert pending_backfills(conn)
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE created_at IS NULL").fetchone()[0] == len(LEGACY_ROWS)
+        
+        assert db_manager.run_pending_backfills(chunk_size=4) == len(LEGACY_ROWS)
+        assert pending_backfills(conn) == []
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE created_at IS NULL").fetchone()[0] == 0
+
+
+def test_interrupted_backfill_resumes(legacy_path):
+    DatabaseManager(legacy_path, defer_backfill=True).close()
+    conn = sqlite3.connect(legacy_path, isolation_level=None)
+    
+    def stop_after_first_chunk(description, done, total):
+        if done:
+            raise KeyboardInterrupt
+    
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            run_backfills(conn, stop_after_first_chunk, chunk_size=4)
+        # 第一批已提交，進度已記錄
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE created_at IS NOT NULL").fetchone()[0] == 4
+        assert pending_backfills(conn)
+        
+        assert run_backfills(conn, chunk_size=4) == len(LEGACY_ROWS) - 4
+        assert pending_backfills(conn) == []
+        assert conn.execute("SELECT COUNT(*) FROM books WHERE created_at IS NULL").fetchone()[0] == 0
+    finally:
+        conn.close()
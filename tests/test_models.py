@@ -0,0 +1,46 @@
+"""書籍模型與整批驗證測試"""
+
+from array import array
+
+from models import ERROR_RATING, ERROR_YEAR, Book, BookBatch, validate_batch
+
+VALID_ROW = (1, "三體", "劉慈欣", 2008, "已讀", 5)
+
+
+def test_batch_keeps_arrays_for_valid_rows():
+    batch = BookBatch.from_rows([VALID_ROW, (2, "Dune", "Frank Herbert", 1965, "未讀", 0)])
+    assert isinstance(batch.years, array) and isinstance(batch.ratings, array)
+    assert validate_batch(batch) == (bytearray(2), ["", ""])
+
+
+def test_batch_with_unpackable_values_reports_per_row_errors():
+    rows = [VALID_ROW,
+            (2, "大數年份", "某人", 10 ** 12, "未讀", 0),
+            (3, "沒有評分", "某人", 2000, "未讀", None),
+            (4, "評分溢位", "某人", 2000, "未讀", 1000)]
+    batch = BookBatch.from_rows(rows)
+    
+    assert len(batch) == 4
+    assert batch.row(1)[3] == 10 ** 12 and batch.row(2)[5] is None
+    mask, messages = validate_batch(batch)
+    assert list(mask) == [0, 1, 1, 1]
+    assert messages == ["", ERROR_YEAR, ERROR_RATING, ERROR_RATING]
+    # 與逐本呼叫 Book.validate 的結果相同
+    assert messages == [Book.from_row(row).validate()[1] for row in rows]
+
+
+def test_failed_pack_does_not_leave_partial_rows():
+    batch = BookBatch.from_rows([VALID_ROW])
+    batch.extend_rows([(2, "a", "b", 2000, "未讀", 3), (3, "c", "d", 2000, "未讀", None)])
+    assert list(batch.ratings) == [5, 3, None]
+
+
+def test_search_batch_with_out_of_range_database_values(db):
+    # 其他工具直接寫入資料庫的資料可能不符合驗證規則
+    db.get_connection().execute(
+        "INSERT INTO books (title, author, year, status, rating) VALUES ('壞資料', '劉慈欣', ?, '未讀', NULL)",
+        (10 ** 12,))
+    batch = db.search_books("劉慈欣", as_batch=True)
+    assert len(batch) == 3
+    mask, _ = validate_batch(batch)
+    assert sum(mask) == 1
@@ -0,0 +1,46 @@
+"""keyset 分頁測試"""
+
+import pytest
+
+from conftest import make_library
+from database import PAGE_ORDER_COLUMNS, DatabaseManager
+from library_set import LibrarySet, row_sort_key
+
+
+def expected_order(db_manager, order_by):
+    rows = [(book.id, book.title, book.author, book.year, book.status, book.rating)
+            for book in db_manager.get_all_books()]
+    return [row[0] for row in sorted(rows, key=row_sort_key(order_by))]
+
+
+@pytest.mark.parametrize("order_by", PAGE_ORDER_COLUMNS)
+def test_iter_books_matches_sorted_order(db, order_by):
+    ids = [book.id for book in db.iter_books(batch_size=3, order_by=order_by)]
+    assert ids == expected_order(db, order_by)
+
+
+@pytest.mark.parametrize("order_by", ["author", "title", "year", "rating"])
+def test_page_continues_after_cursor_book_is_deleted(db, order_by):
+    expected = expected_order(db, order_by)
+    first = db.get_books_page(None, 3, order_by)
+    last = first[-1]
+    assert db.delete_book(last.id)
+    
+    second = db.get_books_page(last.id, 3, order_by, after_value=getattr(last, order_by))
+    assert [book.id for book in second] == expected[3:6]
+
+
+def test_library_set_cursor_survives_deleted_book(tmp_path):
+    make_library(tmp_path / "a.db").close()
+    make_library(tmp_path / "b.db").close()
+    with LibrarySet([str(tmp_path / "a.db"), str(tmp_path / "b.db")]) as libraries:
+        first, cursor = libraries.get_books_page(None, 4, "author")
+        name, last = first[-1]
+        with DatabaseManager(str(tmp_path / f"{name}.db")) as writer:
+            assert writer.delete_book(last.id)
+        
+        seen = [(name, book.id) for name, book in first]
+        while cursor is not None:
+            page, cursor = libraries.get_books_page(cursor, 4, "author")
+            seen.extend((name, book.id) for name, book in page)
+        assert len(seen) == len(set(seen)) == 20
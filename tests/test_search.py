@@ -0,0 +1,103 @@
+"""全文搜尋索引測試"""
+
+import database
+from conftest import make_library
+from database import DatabaseManager
+from models import Book
+
+
+def titles(db_manager, keyword):
+    return sorted(book.title for book in db_manager.search_books(keyword))
+
+
+def fts_sql(db_manager):
+    row = db_manager.get_connection().execute("SELECT sql FROM sqlite_master WHERE name = 'books_fts'").fetchone()
+    return row and row[0]
+
+
+def check_fts_index(db_manager):
+    # 索引與 books 表格不一致時拋出 sqlite3.DatabaseError
+    db_manager.get_connection().execute("INSERT INTO books_fts (books_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_trigram_matches_substrings(db):
+    assert db.fts_enabled
+    assert db._fts_query("年孤寂") is not None
+    assert titles(db, "年孤寂") == ["百年孤寂"]
+    # 字詞中間的子字串、不分大小寫
+    assert titles(db, "euroman") == ["Neuromancer"]
+    assert titles(db, "DUNE") == ["Dune", "dune messiah"]
+    assert titles(db, "asimov") == ["Foundation", "I, Robot"]
+    # 少於三個字元時改用 LIKE，結果仍為子字串比對
+    assert db._fts_query("孤寂") is None
+    assert titles(db, "孤寂") == ["百年孤寂"]
+
+
+def test_like_fallback_without_fts(tmp_path):
+    with DatabaseManager(str(tmp_path / "books.db"), fts_tokenizer=None) as db_manager:
+        db_manager.add_book(Book("百年孤寂", "馬奎斯", 1967))
+        db_manager.add_book(Book("Neuromancer", "William Gibson", 1984))
+        assert not db_manager.fts_enabled
+        assert fts_sql(db_manager) is None
+        assert titles(db_manager, "年孤寂") == ["百年孤寂"]
+        assert titles(db_manager, "euroman") == ["Neuromancer"]
+        assert not db_manager.rebuild_search_index()
+
+
+def test_like_fallback_when_fts5_unavailable(tmp_path, monkeypatch):
+    # 建立全文索引失敗 (例如 SQLite 未編譯 FTS5) 時改用 LIKE
+    monkeypatch.setitem(database.FTS_TOKENIZERS, "trigram", "no_such_tokenizer")
+    db_manager = make_library(tmp_path / "books.db")
+    try:
+        assert not db_manager.fts_enabled
+        assert fts_sql(db_manager) is None
+        assert titles(db_manager, "年孤寂") == ["百年孤寂"]
+        assert db_manager.add_book(Book("超新星紀元", "劉慈欣", 2003))
+        assert titles(db_manager, "劉慈欣") == ["三體", "流浪地球", "超新星紀元"]
+    finally:
+        db_manager.close()
+
+
+def test_tokenizer_change_rebuilds_index(tmp_path):
+    make_library(tmp_path / "books.db").close()
+    
+    with DatabaseManager(str(tmp_path / "books.db"), fts_tokenizer="unicode61") as db_manager:
+        assert db_manager.fts_enabled
+        assert "unicode61" in fts_sql(db_manager)
+        check_fts_index(db_manager)
+        # unicode61 以詞首比對
+        assert titles(db_manager, "Neuro") == ["Neuromancer"]
+        assert titles(db_manager, "euroman") == []
+        assert not db_manager.is_substring_search("Neuro")
+    
+    with DatabaseManager(str(tmp_path / "books.db")) as db_manager:
+        assert "trigram" in fts_sql(db_manager)
+        check_fts_index(db_manager)
+        assert titles(db_manager, "euroman") == ["Neuromancer"]
+
+
+def test_triggers_keep_index_in_sync(db):
+    book = db.search_books("Neuromancer")[0]
+    book.title = "Count Zero"
+    assert db.update_book(book)
+    assert titles(db, "Neuromancer") == []
+    assert titles(db, "Count Zero") == ["Count Zero"]
+    assert titles(db, "William Gibson") == ["Count Zero"]
+    
+    assert db.delete_book(book.id)
+    assert titles(db, "Count Zero") == []
+    assert titles(db, "William Gibson") == []
+    check_fts_index(db)
+    
+    assert db.rebuild_search_index()
+    check_fts_index(db)
+    assert titles(db, "劉慈欣") == ["三體", "流浪地球"]
+
+
+def test_search_limit(db):
+    # 全文索引與 LIKE (少於三個字元) 兩種查詢都在 SQL 中限制筆數
+    for keyword in ("asimov", "as"):
+        found = db.search_books(keyword)
+        assert len(found) > 1
+        assert [book.id for book in db.search_books(keyword, limit=1)] == [found[0].id]
+        assert len(db.search_books(keyword, limit=1, as_batch=True)) == 1
@@ -0,0 +1,104 @@
+"""HTTP/JSON 伺服器測試 (在背景執行緒啟動伺服器，以 http.client 發送請求)"""
+
+import asyncio
+import http.client
+import json
+import threading
+from urllib.parse import urlencode
+
+import pytest
+
+from server import BookServer
+
+
+@pytest.fixture
+def server(db):
+    loop = asyncio.new_event_loop()
+    book_server = BookServer(db, port=0, readers=2)
+    loop.run_until_complete(book_server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield book_server
+    asyncio.run_coroutine_threadsafe(book_server.close(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def request(server, method, path, body=None):
+    conn = http.client.HTTPConnection(server.host, server.port, timeout=10)
+    try:
+        payload = None if body is None else json.dumps(body)
+        conn.request(method, path, payload, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, (json.loads(data) if data else None)
+    finally:
+        conn.close()
+
+
+VALID = {"title": "三體", "author": "劉慈欣", "year": 2008, "status": "已讀", "rating": 5}
+
+
+def test_create_book(server, db):
+    status, data = request(server, "POST", "/books", VALID)
+    assert status == 201
+    assert db.get_book_by_id(data["id"]).title == "三體"
+
+
+@pytest.mark.parametrize("field, value", [
+    ("title", None),
+    ("author", 123),
+    ("status", ["x"]),
+    ("year", 2008.9),
+    ("year", True),
+    ("rating", 4.5),
+    ("rating", None),
+])
+def test_create_book_rejects_wrong_types(server, db, field, value):
+    count = db.get_book_count()
+    status, data = request(server, "POST", "/books", dict(VALID, **{field: value}))
+    assert status == 400
+    assert field in data["error"]
+    assert db.get_book_count() == count
+
+
+def test_create_book_requires_year(server):
+    body = dict(VALID)
+    del body["year"]
+    status, data = request(server, "POST", "/books", body)
+    assert status == 400
+    assert "year" in data["error"]
+
+
+@pytest.mark.parametrize("field, value", [("title", "  "), ("status", "借出"), ("rating", 6), ("year", 3000)])
+def test_create_book_rejects_invalid_values(server, field, value):
+    status, _ = request(server, "POST", "/books", dict(VALID, **{field: value}))
+    assert status == 422
+
+
+def test_delete_book(server, db):
+    book_id = db.get_books_page(None, 1)[0].id
+    assert request(server, "DELETE", f"/books/{book_id}")[0] == 204
+    assert request(server, "DELETE", f"/books/{book_id}")[0] == 404
+
+
+def test_delete_book_database_error_is_500(server, db, monkeypatch):
+    book_id = db.get_books_page(None, 1)[0].id
+    monkeypatch.setattr(db, "delete_book", lambda _: False)
+    assert request(server, "DELETE", f"/books/{book_id}")[0] == 500
+
+
+def test_list_books_cursor_includes_sort_value(server, db):
+    status, first = request(server, "GET", "/books?limit=3&order_by=author")
+    assert status == 200
+    last = first["books"][-1]
+    assert first["next_after_value"] == last["author"]
+    db.delete_book(last["id"])
+    
+    query = urlencode({"limit": 3, "order_by": "author",
+                       "after_id": first["next_after_id"], "after_value": first["next_after_value"]})
+    status, second = request(server, "GET", f"/books?{query}")
+    assert status == 200
+    expected = [book.id for book in db.iter_books(order_by="author")][2:5]
+    assert [book["id"] for book in second["books"]] == expected